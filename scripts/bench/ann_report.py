@@ -0,0 +1,127 @@
+"""
+Informe recall-vs-latencia de los tipos de índice ANN frente al índice exacto (flat).
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src uv run python scripts/bench/ann_report.py            # vectores del índice actual
+    PYTHONPATH=src uv run python scripts/bench/ann_report.py --synthetic 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+
+import faiss
+import numpy as np
+
+from doc_rag.adapters.vectorstore.faiss_store import FaissStore, IndexSpec
+from doc_rag.core.settings import SETTINGS
+from doc_rag.services.index_files import IndexGenerations, shard_files
+
+SWEEPS: dict[str, tuple[str, list[int]]] = {
+    "flat": ("-", [0]),
+    "ivf": ("nprobe", [1, 4, 8, 16, 32, 64]),
+    "ivfpq": ("nprobe", [1, 4, 8, 16, 32, 64]),
+    "hnsw": ("efSearch", [16, 32, 64, 128, 256]),
+}
+
+
+def corpus_vectors() -> np.ndarray:
+    """
+    Vectores del índice publicado (flat; primer shard) o, si no es exacto, re-embebidos
+    desde chunks.jsonl.
+    """
+    files = shard_files(IndexGenerations(SETTINGS.index_dir).current() or SETTINGS.index_dir)[0]
+    store = FaissStore.load(files.index)
+    if store.kind == "flat":
+        inner = faiss.downcast_index(store.index.index)
+        return inner.reconstruct_n(0, inner.ntotal)
+
+    import json
+
+    from doc_rag.services.embedding import Embedder
+
+    with files.chunks.open(encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f]
+    return Embedder.from_settings(SETTINGS).encode(texts)
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    # Datos agrupados (como los embeddings reales), no uniformes
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(1, n // 500), dim)).astype("float32")
+    x = centers[rng.integers(0, len(centers), n)] + 0.35 * rng.standard_normal((n, dim))
+    x = x.astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--synthetic", type=int, default=0, help="N vectores sintéticos")
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--k", type=int, default=SETTINGS.retrieve_candidates)
+    args = ap.parse_args()
+
+    x = synthetic_vectors(args.synthetic, args.dim) if args.synthetic else corpus_vectors()
+    n, dim = x.shape
+    rng = np.random.default_rng(1)
+    q = x[rng.choice(n, size=min(args.queries, n), replace=False)]
+    q = q + 0.05 * rng.standard_normal(q.shape).astype("float32")
+    faiss.normalize_L2(q)
+    ids = np.arange(n, dtype="int64")
+    k = min(args.k, n)
+
+    print(f"corpus={n} dim={dim} queries={len(q)} k={k}\n")
+    print("| índice | parámetro | recall@k | ms/consulta (media) | p95 ms | build s | MB |")
+    print("|---|---|---|---|---|---|---|")
+
+    truth: np.ndarray | None = None
+    for kind, (param, values) in SWEEPS.items():
+        spec = IndexSpec(
+            kind=kind,
+            nlist=SETTINGS.ivf_nlist,
+            hnsw_m=SETTINGS.hnsw_m,
+            hnsw_ef_construction=SETTINGS.hnsw_ef_construction,
+            pq_m=SETTINGS.pq_m,
+            pq_nbits=SETTINGS.pq_nbits,
+            train_size=SETTINGS.ann_train_size,
+        )
+        t0 = time.perf_counter()
+        store = FaissStore(dim, spec=spec)
+        for start in range(0, n, 8192):
+            store.add(x[start : start + 8192], ids[start : start + 8192])
+        store.finalize()
+        build_s = time.perf_counter() - t0
+        size_mb = faiss.serialize_index(store.index).nbytes / 1e6
+
+        for v in values:
+            lat: list[float] = []
+            found: list[np.ndarray] = []
+            for row in q:
+                t = time.perf_counter()
+                _, got = store.search(
+                    row,
+                    k,
+                    nprobe=v if param == "nprobe" else None,
+                    ef_search=v if param == "efSearch" else None,
+                )
+                lat.append((time.perf_counter() - t) * 1000)
+                found.append(got)
+            found_arr = np.stack(found)
+            if truth is None:
+                truth = found_arr  # flat va primero: es la referencia exacta
+            recall = np.mean(
+                [len(np.intersect1d(a, b)) / k for a, b in zip(found_arr, truth, strict=True)]
+            )
+            label = store.kind if store.kind == kind else f"{kind}→{store.kind}"
+            setting = f"{param}={v}" if param != "-" else "-"
+            print(
+                f"| {label} | {setting} | {recall:.3f} | {np.mean(lat):.3f} | "
+                f"{np.percentile(lat, 95):.3f} | {build_s:.1f} | {size_mb:.1f} |"
+            )
+
+
+if __name__ == "__main__":
+    main()
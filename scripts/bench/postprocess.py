@@ -0,0 +1,160 @@
+"""
+Post-proceso de candidatos de ``Retriever.search`` (RRF, prioridad de sección, top-k y
+deduplicación por ancla): versión con arrays NumPy frente a la anterior con dicts.
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src uv run python scripts/bench/postprocess.py
+    PYTHONPATH=src uv run python scripts/bench/postprocess.py --pools 40 400 4000 --top-k 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+from doc_rag.services.retriever import (
+    _Hits,
+    _select,
+)
+
+SECTIONS = ["abstract", "introduction", "methods", "results", "discussion", None]
+PREFERRED = ("results", "discussion")
+
+
+def synthetic_store(path: Path, n: int, seed: int = 0) -> ChunkStore:
+    rng = np.random.default_rng(seed)
+    records = []
+    for i in range(n):
+        doc = i // 50
+        records.append(
+            {
+                "id": i,
+                "doc_id": f"{doc:064x}",
+                "source_filename": f"paper{doc % 200}.pdf",  # nombres repetidos
+                "page": int(rng.integers(1, 20)),
+                "char_start": (i % 50) * 900,
+                "char_end": (i % 50) * 900 + 1100,
+                "section": SECTIONS[int(rng.integers(0, len(SECTIONS)))],
+                "text": f"chunk {i}",
+            }
+        )
+    ChunkStore.write(path, records)
+    return ChunkStore(path)
+
+
+def legacy(
+    chunks: ChunkStore,
+    dense_ids: np.ndarray,
+    dense_scores: np.ndarray,
+    lex_rows: np.ndarray,
+    lex_scores: np.ndarray,
+    top_k: int,
+    rrf_k: int = 60,
+) -> list[int]:
+    """Camino anterior: dicts por candidato, ``sort`` con lambdas y dedup con un set."""
+    dense = {int(i): float(sc) for sc, i in zip(dense_scores, dense_ids, strict=False) if i >= 0}
+    lexical = {int(chunks.ids[r]): float(sc) for sc, r in zip(lex_scores, lex_rows, strict=True)}
+    fused: dict[int, float] = {}
+    for ranking in (list(dense), list(lexical)):
+        for rank, idx in enumerate(ranking, start=1):
+            fused[idx] = fused.get(idx, 0.0) + 1.0 / (rrf_k + rank)
+    pool = sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+    candidates: list[dict[str, Any]] = []
+    for idx, first in pool:
+        rec = chunks.get(idx)
+        if not rec:
+            continue
+        c = {**rec, "score_dense": dense.get(idx), "score_first": first}
+        c["score_lexical"] = lexical.get(idx)
+        candidates.append(c)
+    for c in candidates:
+        c["score"] = c.pop("score_first")
+
+    candidates.sort(key=lambda x: x["score"], reverse=True)
+    pref = set(PREFERRED)
+    candidates.sort(
+        key=lambda x: (1 if (x.get("section") or "") in pref else 0, x["score"]), reverse=True
+    )
+    seen = set()
+    final: list[int] = []
+    for c in candidates:
+        key = (c["source_filename"], c["anchor"])
+        if key in seen:
+            continue
+        seen.add(key)
+        final.append(c["id"])
+        if len(final) >= top_k:
+            break
+    return final
+
+
+def vectorised(
+    chunks: ChunkStore,
+    dense_ids: np.ndarray,
+    dense_scores: np.ndarray,
+    lex_rows: np.ndarray,
+    lex_scores: np.ndarray,
+    top_k: int,
+    rrf_k: int = 60,
+) -> list[int]:
+    """Camino actual de ``Retriever.search`` (sin modelos)."""
+    # un único shard: la clave de cada candidato es su fila
+    hits = _Hits(
+        dense=chunks.rows_of(dense_ids),
+        dense_scores=dense_scores,
+        lexical=lex_rows,
+        lexical_scores=lex_scores,
+    )
+    pool = hits.pool(rrf_k, limit=len(dense_ids) + len(lex_rows))
+    mask = np.array([s in PREFERRED for s in chunks.sections] + [False])
+    prio = mask[chunks.cols["section"][pool.rows]].astype(np.int8)
+    picked = _select(chunks.anchor_keys(pool.rows), pool.score, prio, top_k)
+    return [int(i) for i in chunks.ids[pool.rows[picked]]]
+
+
+def timed(fn: Callable[[], object], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--pools", type=int, nargs="+", default=[40, 400, 4000])
+    ap.add_argument("--chunks", type=int, default=200_000)
+    ap.add_argument("--top-k", type=int, default=5)
+    ap.add_argument("--repeat", type=int, default=20)
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(1)
+    with tempfile.TemporaryDirectory() as tmp:
+        chunks = synthetic_store(Path(tmp) / "chunks.bin", args.chunks)
+        print(f"chunks={len(chunks)} top_k={args.top_k}\n")
+        print("| pool (denso + BM25) | dicts ms | arrays ms | speedup | mismo top-k |")
+        print("|---|---|---|---|---|")
+        for n in args.pools:
+            dense_ids = rng.choice(len(chunks), size=n, replace=False).astype(np.int64)
+            dense_scores = np.sort(rng.random(n).astype(np.float32))[::-1]
+            lex_rows = rng.choice(len(chunks), size=n, replace=False).astype(np.int64)
+            lex_scores = np.sort(rng.random(n).astype(np.float32) * 10)[::-1]
+            call = (chunks, dense_ids, dense_scores, lex_rows, lex_scores, args.top_k)
+
+            same = legacy(*call) == vectorised(*call)
+            t_old = timed(lambda call=call: legacy(*call), args.repeat)
+            t_new = timed(lambda call=call: vectorised(*call), args.repeat)
+            print(f"| {n} | {t_old:.3f} | {t_new:.3f} | {t_old / t_new:.1f}x | {same} |")
+
+
+if __name__ == "__main__":
+    main()
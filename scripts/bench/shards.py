@@ -0,0 +1,90 @@
+"""
+Búsqueda densa sobre un índice único frente a N shards consultados en paralelo (como
+``Retriever.search`` con ``DOC_RAG_INDEX_SHARDS``): latencia por consulta y resultados.
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src uv run python scripts/bench/shards.py
+    PYTHONPATH=src uv run python scripts/bench/shards.py --n 1000000 --shards 1 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+
+from doc_rag.adapters.vectorstore.faiss_store import FaissStore, IndexSpec
+from doc_rag.services.index_files import SHARD_ID_BITS
+
+
+def synthetic_vectors(n: int, dim: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(x)
+    return x
+
+
+def build(x: np.ndarray, n_shards: int) -> list[FaissStore]:
+    stores = []
+    for shard, part in enumerate(np.array_split(np.arange(len(x)), n_shards)):
+        store = FaissStore(x.shape[1], spec=IndexSpec(kind="flat"))
+        store.add(x[part], part.astype("int64") + (shard << SHARD_ID_BITS))
+        stores.append(store)
+    return stores
+
+
+def search(
+    stores: list[FaissStore], pool: ThreadPoolExecutor, q: np.ndarray, k: int
+) -> tuple[np.ndarray, np.ndarray]:
+    """Cada shard en un hilo; se fusionan los ``k`` mejores por score."""
+    if len(stores) == 1:
+        return stores[0].search_many(q, k)
+    parts = list(pool.map(lambda s: s.search_many(q, k), stores))
+    scores = np.concatenate([p[0] for p in parts], axis=1)
+    ids = np.concatenate([p[1] for p in parts], axis=1)
+    order = np.argsort(-scores, axis=1, kind="stable")[:, :k]
+    return np.take_along_axis(scores, order, axis=1), np.take_along_axis(ids, order, axis=1)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--queries", type=int, default=50)
+    ap.add_argument("--k", type=int, default=40)
+    ap.add_argument("--threads", type=int, default=min(4, os.cpu_count() or 1))
+    args = ap.parse_args()
+
+    # una consulta cada vez (el caso de /query); FAISS en un hilo para ver el reparto
+    faiss.omp_set_num_threads(1)
+    x = synthetic_vectors(args.n, args.dim)
+    queries = synthetic_vectors(args.queries, args.dim, seed=1)
+    print(f"corpus={args.n} dim={args.dim} k={args.k} hilos={args.threads}\n")
+    print("| shards | ms/consulta (media) | p95 ms | mismo top-k |")
+    print("|---|---|---|---|")
+
+    reference: list[np.ndarray] = []
+    with ThreadPoolExecutor(max_workers=args.threads) as pool:
+        for n_shards in args.shards:
+            stores = build(x, n_shards)
+            lat: list[float] = []
+            found: list[np.ndarray] = []
+            for q in queries:
+                t0 = time.perf_counter()
+                _, ids = search(stores, pool, q[None, :], args.k)
+                lat.append((time.perf_counter() - t0) * 1000)
+                # ids globales: fila del corpus sin el prefijo del shard
+                found.append(ids[0] & ((1 << SHARD_ID_BITS) - 1))
+            if not reference:
+                reference = found
+            same = all(np.array_equal(a, b) for a, b in zip(found, reference, strict=True))
+            print(f"| {n_shards} | {np.mean(lat):.3f} | {np.percentile(lat, 95):.3f} | {same} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""
+Memoria de N workers sobre el mismo índice (FAISS + chunks + BM25): cada worker carga su
+copia después del fork (como ``uvicorn --workers N``) frente a índice abierto con mmap en
+el proceso padre antes del fork (como ``python -m doc_rag.serve``). Cada worker hace
+consultas y informa de su memoria (``/proc/<pid>/smaps_rollup``). Solo Linux. Con un solo
+worker las páginas mapeadas cuentan como privadas: la cifra comparable es el PSS total.
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src uv run python scripts/bench/workers.py
+    PYTHONPATH=src uv run python scripts/bench/workers.py --n 500000 --workers 2 4 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+from doc_rag.adapters.vectorstore.faiss_store import FaissStore, IndexSpec
+from doc_rag.services.bm25 import BM25Index
+from doc_rag.services.memory import process_memory
+
+WORDS = [f"term{i}" for i in range(5000)]
+
+
+def build(root: Path, n: int, dim: int, seed: int = 0) -> None:
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype("float32")
+    faiss.normalize_L2(x)
+    store = FaissStore(dim, spec=IndexSpec(kind="flat"))
+    store.add(x, np.arange(n, dtype="int64"))
+    store.save(root / "index.faiss")
+    words = rng.integers(0, len(WORDS), size=(n, 60))
+    records = (
+        {
+            "id": i,
+            "doc_id": f"{i // 50:064x}",
+            "source_filename": f"paper{i // 50}.pdf",
+            "page": 1,
+            "char_start": 0,
+            "char_end": 0,
+            "section": None,
+            "text": " ".join(WORDS[w] for w in words[i]),
+        }
+        for i in range(n)
+    )
+    ChunkStore.write(root / "chunks.bin", records)
+    BM25Index.build(ChunkStore(root / "chunks.bin")).save(root / "bm25.npz")
+
+
+def load(root: Path, mmap: bool) -> tuple[FaissStore, ChunkStore, BM25Index]:
+    return (
+        FaissStore.load(root / "index.faiss", mmap=mmap),
+        ChunkStore(root / "chunks.bin"),
+        BM25Index.load(root / "bm25.npz", mmap=mmap),
+    )
+
+
+def work(index: tuple[FaissStore, ChunkStore, BM25Index], queries: int, dim: int) -> None:
+    store, chunks, bm25 = index
+    rng = np.random.default_rng(os.getpid())
+    for _ in range(queries):
+        q = rng.standard_normal((1, dim)).astype("float32")
+        faiss.normalize_L2(q)
+        _, ids = store.search_many(q, 20)
+        _, rows = bm25.search(" ".join(rng.choice(WORDS, 4)), 20)
+        for row in [*chunks.rows_of(ids[0]), *rows]:
+            chunks.text(int(row))
+
+
+def run(root: Path, workers: int, preload: bool, queries: int, dim: int) -> list[dict]:
+    index = load(root, mmap=True) if preload else None
+    gc.collect()
+    gc.freeze()
+    pipes = []
+    for _ in range(workers):
+        r, w = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(r)
+            mine = index if index is not None else load(root, mmap=False)
+            work(mine, queries, dim)
+            os.write(w, json.dumps(process_memory()).encode())  # con ``mine`` aún vivo
+            os._exit(0)
+        os.close(w)
+        pipes.append((pid, r))
+    out = []
+    for pid, r in pipes:
+        with os.fdopen(r) as f:
+            out.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    gc.unfreeze()
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--n", type=int, default=200_000)
+    ap.add_argument("--dim", type=int, default=384)
+    ap.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    ap.add_argument("--queries", type=int, default=50)
+    args = ap.parse_args()
+
+    if process_memory() is None:
+        raise SystemExit("Necesita /proc/<pid>/smaps_rollup (Linux).")
+    faiss.omp_set_num_threads(1)
+    mb = 1 / (1 << 20)
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp)
+        build(root, args.n, args.dim)
+        size = sum(p.stat().st_size for p in root.iterdir()) * mb
+        print(f"corpus={args.n} dim={args.dim} índice en disco={size:.0f} MB\n")
+        print("| workers | modo | privada MB/worker | compartida MB/worker | PSS total MB |")
+        print("|---|---|---|---|---|")
+        for n in args.workers:
+            for preload, label in ((False, "copia por worker"), (True, "mmap antes del fork")):
+                mem = run(root, n, preload, args.queries, args.dim)
+                private = np.mean([m["private_bytes"] for m in mem]) * mb
+                shared = np.mean([m["shared_bytes"] for m in mem]) * mb
+                pss = sum(m["pss_bytes"] for m in mem) * mb
+                print(f"| {n} | {label} | {private:.0f} | {shared:.0f} | {pss:.0f} |")
+
+
+if __name__ == "__main__":
+    main()
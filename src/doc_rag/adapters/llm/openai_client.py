@@ -1,9 +1,10 @@
 from __future__ import annotations
 
 import os
+from collections.abc import AsyncIterator
 from typing import Any
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 
 
 def _extract_text_fallback(resp: Any) -> str:
@@ -29,40 +30,67 @@ def _extract_text_fallback(resp: Any) -> str:
         return ""
 
 
-class OpenAIAnswerer:
-    def __init__(self, model: str):
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError("Falta OPENAI_API_KEY en el entorno.")
-        self.client = OpenAI(api_key=api_key)
-        self.model = model
+def api_key() -> str:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError("Falta OPENAI_API_KEY en el entorno.")
+    return api_key
+
+
+def _build_prompt(question: str, context_blocks: list[str], prompt_style: str) -> tuple[str, str]:
+    """Devuelve ``(instructions, input)`` para la Responses API."""
+    base = (
+        "Responda en español de España y con tono formal. "
+        "Use únicamente la información del contexto. "
+        "Si falta información, indíquelo. "
+        "Incluya referencias a las citas tal como aparecen (entre corchetes)."
+    )
 
-    def answer(self, question: str, context_blocks: list[str], prompt_style: str = "about") -> str:
-        base = (
-            "Responda en español de España y con tono formal. "
-            "Use únicamente la información del contexto. "
-            "Si falta información, indíquelo. "
-            "Incluya referencias a las citas tal como aparecen (entre corchetes)."
+    if prompt_style == "objectives_conclusions":
+        style = (
+            "Estructure la respuesta en dos apartados:\n"
+            "1) Objetivos (lista con viñetas)\n"
+            "2) Conclusiones (lista con viñetas)\n"
+            "Cada viñeta debe incluir al menos una cita."
         )
+    else:
+        style = "Responda directamente a la pregunta. Incluya citas en las frases relevantes."
+
+    instructions = f"{base}\n{style}"
+
+    context = "\n\n".join(context_blocks)
+    return instructions, f"CONTEXTO:\n{context}\n\nPREGUNTA:\n{question}"
 
-        if prompt_style == "objectives_conclusions":
-            style = (
-                "Estructure la respuesta en dos apartados:\n"
-                "1) Objetivos (lista con viñetas)\n"
-                "2) Conclusiones (lista con viñetas)\n"
-                "Cada viñeta debe incluir al menos una cita."
-            )
-        else:
-            style = "Responda directamente a la pregunta. Incluya citas en las frases relevantes."
 
-        instructions = f"{base}\n{style}"
+def _answer_text(resp: Any) -> str:
+    text = _extract_text_fallback(resp)
+    return text.strip() or "No se pudo generar respuesta con OpenAI."
 
-        context = "\n\n".join(context_blocks)
 
-        resp = self.client.responses.create(
-            model=self.model,
-            instructions=instructions,
-            input=f"CONTEXTO:\n{context}\n\nPREGUNTA:\n{question}",
+class AsyncOpenAIAnswerer:
+    """Respuestas con la Responses API sin bloquear el event loop mientras responde."""
+
+    def __init__(self, model: str, client: AsyncOpenAI | None = None):
+        self.client = client or AsyncOpenAI(api_key=api_key())
+        self.model = model
+
+    async def answer(
+        self, question: str, context_blocks: list[str], prompt_style: str = "about"
+    ) -> str:
+        instructions, prompt = _build_prompt(question, context_blocks, prompt_style)
+        resp = await self.client.responses.create(
+            model=self.model, instructions=instructions, input=prompt
+        )
+        return _answer_text(resp)
+
+    async def stream(
+        self, question: str, context_blocks: list[str], prompt_style: str = "about"
+    ) -> AsyncIterator[str]:
+        """Fragmentos de texto de la respuesta según los va generando el modelo."""
+        instructions, prompt = _build_prompt(question, context_blocks, prompt_style)
+        events = await self.client.responses.create(
+            model=self.model, instructions=instructions, input=prompt, stream=True
         )
-        text = _extract_text_fallback(resp)
-        return text.strip() or "No se pudo generar respuesta con OpenAI."
+        async for event in events:
+            if event.type == "response.output_text.delta" and event.delta:
+                yield event.delta
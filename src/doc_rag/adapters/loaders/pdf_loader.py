@@ -13,6 +13,11 @@ class PageText:
     text: str
 
 
+def count_pdf_pages(path: Path) -> int:
+    """Número de páginas (solo lee la estructura del PDF, no extrae texto)."""
+    return len(PdfReader(str(path)).pages)
+
+
 def load_pdf_pages(path: Path) -> Iterable[PageText]:
     reader = PdfReader(str(path))
     for i, page in enumerate(reader.pages, start=1):
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import json
+import mmap
+import os
+import struct
+from collections.abc import Iterable, Iterator, MutableMapping
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+
+_MAGIC = b"DRCHUNK1"
+_HEADER = struct.Struct("<8sQ")  # magic, longitud de la cabecera JSON
+
+# Columnas de ancho fijo, una fila por chunk y ordenadas por id
+CHUNK_DTYPE = np.dtype(
+    [
+        ("id", "<i8"),
+        ("doc", "<i4"),  # índice en la tabla de documentos
+        ("page", "<i4"),  # -1 = sin página (Markdown)
+        ("char_start", "<i4"),
+        ("char_end", "<i4"),
+        ("section", "<i4"),  # índice en la tabla de secciones, -1 = sin sección
+        ("text_off", "<i8"),  # tabla de offsets sobre el blob de texto (UTF-8)
+        ("text_len", "<i4"),
+    ]
+)
+
+
+def format_anchor(page: int | None, char_start: int, char_end: int) -> str:
+    if page is None:
+        return f"md:c{char_start}-{char_end}"
+    return f"p{page}:c{char_start}-{char_end}"
+
+
+class ChunkView(MutableMapping[str, Any]):
+    """
+    Vista ligera de una fila del ``ChunkStore`` con acceso tipo dict. Los campos se leen
+    de las columnas al pedirlos y el texto se decodifica (una vez) solo si se usa. Las
+    claves que se asignan (scores de la búsqueda) se guardan aparte; los campos del
+    chunk son de solo lectura. ``to_dict`` materializa el resultado final.
+    """
+
+    __slots__ = ("_extra", "_store", "_text", "row")
+
+    FIELDS = (
+        "id",
+        "doc_id",
+        "source_filename",
+        "page",
+        "char_start",
+        "char_end",
+        "section",
+        "anchor",
+        "text",
+    )
+
+    def __init__(self, store: ChunkStore, row: int):
+        self._store = store
+        self.row = row
+        self._extra: dict[str, Any] = {}
+        self._text: str | None = None
+
+    def _field(self, key: str) -> Any:
+        store, c = self._store, self._store.cols[self.row]
+        if key == "text":
+            if self._text is None:
+                self._text = store.text(self.row)
+            return self._text
+        if key == "id":
+            return int(c["id"])
+        if key == "doc_id":
+            return store.doc_ids[c["doc"]]
+        if key == "source_filename":
+            return store.filenames[c["doc"]]
+        if key == "page":
+            return int(c["page"]) if c["page"] >= 0 else None
+        if key in ("char_start", "char_end"):
+            return int(c[key])
+        if key == "section":
+            return store.sections[c["section"]] if c["section"] >= 0 else None
+        if key == "anchor":
+            page = int(c["page"]) if c["page"] >= 0 else None
+            return format_anchor(page, int(c["char_start"]), int(c["char_end"]))
+        raise KeyError(key)
+
+    @property
+    def store(self) -> ChunkStore:
+        return self._store
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self._extra:
+            return self._extra[key]
+        return self._field(key)
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if key in self.FIELDS:
+            raise KeyError(f"Campo de solo lectura: {key}")
+        self._extra[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        del self._extra[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self.FIELDS
+        yield from self._extra
+
+    def __len__(self) -> int:
+        return len(self.FIELDS) + len(self._extra)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {**{k: self._field(k) for k in self.FIELDS}, **self._extra}
+
+
+class ChunkStore:
+    """
+    Almacén compacto de chunks en un único fichero, abierto con mmap:
+
+        [magic | long. cabecera][cabecera JSON: documentos, secciones][columnas][texto]
+
+    Abrirlo no parsea los chunks: las columnas son una vista NumPy del fichero y el
+    texto se decodifica solo cuando se pide. Varios procesos comparten las páginas.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        with path.open("rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, header_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"Formato de chunks no reconocido: {path}")
+        header = json.loads(self._mm[_HEADER.size : _HEADER.size + header_len])
+
+        self.doc_ids: list[str] = header["doc_ids"]
+        self.filenames: list[str] = header["filenames"]
+        self.sections: list[str] = header["sections"]
+        self._text_base = int(header["text_offset"])
+        self.cols = np.frombuffer(
+            self._mm, dtype=CHUNK_DTYPE, count=int(header["n"]), offset=int(header["cols_offset"])
+        )
+        # tramos de filas [inicio, fin) de cada documento (sus ids son contiguos)
+        self._doc_segments: list[list[list[int]]] = header["doc_segments"]
+        self._docs_by_id: dict[str, list[int]] = {}
+        self._docs_by_filename: dict[str, list[int]] = {}
+        for i, (d, fn) in enumerate(zip(self.doc_ids, self.filenames, strict=True)):
+            self._docs_by_id.setdefault(d, []).append(i)
+            self._docs_by_filename.setdefault(fn, []).append(i)
+        # fichero (internado) de cada documento, para deduplicar por (fichero, ancla)
+        names = {fn: i for i, fn in enumerate(dict.fromkeys(self.filenames))}
+        self._doc_filename = np.array([names[fn] for fn in self.filenames], dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.cols)
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self.cols["id"]
+
+    def row(self, chunk_id: int) -> int:
+        """Posición de ``chunk_id`` en las columnas, o -1."""
+        ids = self.cols["id"]
+        pos = int(np.searchsorted(ids, chunk_id))
+        if pos < len(ids) and ids[pos] == chunk_id:
+            return pos
+        return -1
+
+    def rows_of(self, chunk_ids: np.ndarray) -> np.ndarray:
+        """Como ``row`` para un array de ids (-1 donde no existe)."""
+        ids = self.cols["id"]
+        chunk_ids = np.asarray(chunk_ids, dtype=np.int64)
+        if len(ids) == 0:
+            return np.full(len(chunk_ids), -1, dtype=np.int64)
+        pos = np.searchsorted(ids, chunk_ids).clip(max=len(ids) - 1)
+        return np.where(ids[pos] == chunk_ids, pos, -1).astype(np.int64)
+
+    def anchor_keys(self, rows: np.ndarray) -> np.ndarray:
+        """Una fila ``(fichero, página, inicio, fin)`` por chunk: iguales = misma cita."""
+        c = self.cols[rows]
+        return np.stack(
+            [
+                self._doc_filename[c["doc"]] if len(self._doc_filename) else c["doc"],
+                c["page"],
+                c["char_start"],
+                c["char_end"],
+            ],
+            axis=1,
+        ).astype(np.int64)
+
+    def rows_for(self, doc_id: str | None = None, source_filename: str | None = None) -> np.ndarray:
+        """Filas (ordenadas) de los chunks que cumplen los filtros, sin recorrer el resto."""
+        docs: set[int] | None = None
+        if doc_id:
+            docs = set(self._docs_by_id.get(doc_id, ()))
+        if source_filename:
+            by_name = set(self._docs_by_filename.get(source_filename, ()))
+            docs = by_name if docs is None else docs & by_name
+        if docs is None:
+            return np.arange(len(self.cols))
+        rows = [
+            np.arange(start, stop) for d in sorted(docs) for start, stop in self._doc_segments[d]
+        ]
+        if not rows:
+            return np.empty(0, dtype="int64")
+        return np.sort(np.concatenate(rows))
+
+    def text(self, row: int) -> str:
+        start = self._text_base + int(self.cols["text_off"][row])
+        return self._mm[start : start + int(self.cols["text_len"][row])].decode("utf-8")
+
+    def view(self, row: int) -> ChunkView:
+        return ChunkView(self, row)
+
+    def get(self, chunk_id: int) -> dict[str, Any] | None:
+        row = self.row(chunk_id)
+        if row < 0:
+            return None
+        return self.view(row).to_dict()
+
+    @staticmethod
+    def write(path: Path, records: Iterable[dict[str, Any]]) -> int:
+        """
+        Escribe ``records`` (dicts como los de ``chunks.jsonl``) en formato compacto.
+        El texto se vuelca a disco según llega; en memoria solo quedan las columnas.
+        Sustituye el fichero de forma atómica.
+        """
+        docs: dict[tuple[str, str], int] = {}
+        sections: dict[str, int] = {}
+        rows: list[tuple] = []
+
+        blob_tmp = path.with_suffix(".text.tmp")
+        off = 0
+        with blob_tmp.open("wb") as blob:
+            for rec in records:
+                data = rec["text"].encode("utf-8")
+                blob.write(data)
+                doc = docs.setdefault((rec["doc_id"], rec["source_filename"]), len(docs))
+                sec = rec.get("section")
+                rows.append(
+                    (
+                        int(rec["id"]),
+                        doc,
+                        -1 if rec.get("page") is None else int(rec["page"]),
+                        int(rec["char_start"]),
+                        int(rec["char_end"]),
+                        -1 if sec is None else sections.setdefault(sec, len(sections)),
+                        off,
+                        len(data),
+                    )
+                )
+                off += len(data)
+
+        cols = np.array(rows, dtype=CHUNK_DTYPE)
+        cols.sort(order="id")
+
+        doc_segments: list[list[list[int]]] = [[] for _ in docs]
+        bounds = np.flatnonzero(np.diff(cols["doc"])) + 1
+        starts = np.concatenate([[0], bounds]) if len(cols) else np.empty(0, dtype=int)
+        stops = np.concatenate([bounds, [len(cols)]]) if len(cols) else np.empty(0, dtype=int)
+        for start, stop in zip(starts.tolist(), stops.tolist(), strict=True):
+            doc_segments[int(cols["doc"][start])].append([start, stop])
+
+        header: dict[str, Any] = {
+            "n": len(cols),
+            "doc_ids": [d for d, _ in docs],
+            "filenames": [f for _, f in docs],
+            "sections": list(sections),
+            "doc_segments": doc_segments,
+            "cols_offset": 0,
+            "text_offset": 0,
+        }
+        # Los offsets dependen de la longitud de la cabecera: se itera hasta que cuadran
+        while True:
+            raw = json.dumps(header, ensure_ascii=False).encode("utf-8")
+            cols_offset = -(-(_HEADER.size + len(raw)) // 8) * 8  # alineado a 8 bytes
+            if header["cols_offset"] == cols_offset:
+                break
+            header["cols_offset"] = cols_offset
+            header["text_offset"] = cols_offset + cols.nbytes
+        raw = raw.ljust(cols_offset - _HEADER.size)
+
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f, blob_tmp.open("rb") as blob:
+            f.write(_HEADER.pack(_MAGIC, len(raw)))
+            f.write(raw)
+            f.write(cols.tobytes())
+            while block := blob.read(1024 * 1024):
+                f.write(block)
+        blob_tmp.unlink()
+        os.replace(tmp, path)
+        return len(cols)
+
+    @staticmethod
+    def write_from_jsonl(path: Path, jsonl_path: Path) -> int:
+        def records() -> Iterable[dict[str, Any]]:
+            with jsonl_path.open("r", encoding="utf-8") as f:
+                for line in f:
+                    yield json.loads(line)
+
+        return ChunkStore.write(path, records())
@@ -1,36 +1,320 @@
 from __future__ import annotations
 
+import os
+from dataclasses import dataclass
 from pathlib import Path
 
 import faiss
 import numpy as np
 
+INDEX_KINDS = ("flat", "ivf", "hnsw", "ivfpq")
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Tipo de índice FAISS y sus parámetros de construcción."""
+
+    kind: str = "flat"  # flat | ivf | hnsw | ivfpq
+    nlist: int = 1024  # ivf / ivfpq: máximo de listas (se ajusta al tamaño del corpus)
+    hnsw_m: int = 32
+    hnsw_ef_construction: int = 200
+    pq_m: int = 48  # ivfpq: subcuantizadores (divisor de la dimensión)
+    pq_nbits: int = 8
+    train_size: int = 65536  # vectores que se acumulan para entrenar ivf / ivfpq
+
+    def __post_init__(self) -> None:
+        if self.kind not in INDEX_KINDS:
+            raise ValueError(f"Tipo de índice no soportado: {self.kind!r} (use {INDEX_KINDS})")
+
+    @property
+    def needs_training(self) -> bool:
+        return self.kind in ("ivf", "ivfpq")
+
+
+def _add_direct_map(index: faiss.Index) -> None:
+    # ivf / ivfpq: mapa id -> posición en su lista, para reconstruir vectores por id
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.set_direct_map_type(faiss.DirectMap.Hashtable)
+
+
+def _direct_map(index: faiss.Index | None) -> faiss.IndexIVF | None:
+    """El IVF de ``index`` si tiene mapa de ids."""
+    ivf = faiss.try_extract_index_ivf(index) if index is not None else None
+    if ivf is None or ivf.direct_map.type == faiss.DirectMap.NoMap:
+        return None
+    return ivf
+
+
+def _as_queries(query_vecs: np.ndarray) -> np.ndarray:
+    if query_vecs.ndim == 1:
+        query_vecs = query_vecs.reshape(1, -1)
+    if query_vecs.dtype != np.float32:
+        query_vecs = query_vecs.astype("float32")
+    return query_vecs
+
 
 class FaissStore:
-    def __init__(self, dim: int):
-        self.index = faiss.IndexFlatIP(dim)  # coseno si vectores normalizados
+    def __init__(self, dim: int, index: faiss.Index | None = None, spec: IndexSpec | None = None):
+        self.dim = dim
+        self.spec = spec or IndexSpec()
+        # ivf / ivfpq: el índice se crea al entrenar; hasta entonces se acumulan vectores
+        self._pending: list[tuple[np.ndarray, np.ndarray]] = []
+        self._pending_n = 0
+        self._kind: str | None = None
+        if index is None and not self.spec.needs_training:
+            index = self._build_untrained()
+        self.index: faiss.Index | None = index
+
+    def _build_untrained(self) -> faiss.Index:
+        if self.spec.kind == "hnsw":
+            hnsw = faiss.IndexHNSWFlat(self.dim, self.spec.hnsw_m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = self.spec.hnsw_ef_construction
+            return faiss.IndexIDMap2(hnsw)
+        # IDMap2: ids explícitos (los de los chunks) y borrado con remove_ids
+        return faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))  # coseno si vectores normalizados
+
+    def _train(self) -> None:
+        x = np.concatenate([v for v, _ in self._pending]) if self._pending else None
+        ids = np.concatenate([i for _, i in self._pending]) if self._pending else None
+        self._pending, self._pending_n = [], 0
+
+        n = 0 if x is None else len(x)
+        nlist = min(self.spec.nlist, n // 39)  # FAISS pide ~39 puntos por centroide
+        if self.spec.kind == "ivfpq":
+            m = max(d for d in range(1, self.spec.pq_m + 1) if self.dim % d == 0)
+            key = f"IVF{nlist},PQ{m}x{self.spec.pq_nbits}"
+            too_small = n < 2**self.spec.pq_nbits
+        else:
+            key = f"IVF{nlist},Flat"
+            too_small = False
+
+        if nlist < 1 or too_small:
+            # Corpus demasiado pequeño para entrenar: búsqueda exacta
+            index = faiss.IndexIDMap2(faiss.IndexFlatIP(self.dim))
+        else:
+            index = faiss.index_factory(self.dim, key, faiss.METRIC_INNER_PRODUCT)
+            index.train(x)
+            _add_direct_map(index)
+        if x is not None:
+            index.add_with_ids(x, ids)
+        self.index = index
+
+    def untrain(self) -> None:
+        """
+        ivf / ivfpq que se quedó en flat por falta de corpus: sus vectores vuelven a la
+        cola de entrenamiento, así que con lo que se añada se entrena el tipo pedido (o se
+        repite la búsqueda exacta si aún no llega). No hace falta volver a embeber.
+        """
+        if not self.spec.needs_training or self.index is None or self.kind != "flat":
+            return
+        ids = faiss.vector_to_array(self.index.id_map)
+        x = self.index.index.reconstruct_n(0, self.index.ntotal)
+        self.index, self._kind = None, None
+        self._pending = [(x, ids)] if len(ids) else []
+        self._pending_n = len(ids)
+        if self._pending_n >= self.spec.train_size:
+            self._train()
+
+    def ensure_direct_map(self) -> None:
+        """ivf / ivfpq guardados sin mapa de ids (índices anteriores): se añade al ampliarlos."""
+        if self.index is not None:
+            _add_direct_map(self.index)
 
     @property
     def ntotal(self) -> int:
-        return self.index.ntotal
+        return (self.index.ntotal if self.index is not None else 0) + self._pending_n
 
-    def add(self, vectors: np.ndarray) -> None:
+    @property
+    def is_trained(self) -> bool:
+        return self.index is not None
+
+    @property
+    def supports_ids(self) -> bool:
+        return self.index is None or isinstance(self.index, faiss.IndexIDMap | faiss.IndexIVF)
+
+    @property
+    def supports_remove(self) -> bool:
+        # HNSW no admite borrado: hay que reconstruir
+        return self.supports_ids and self.kind != "hnsw"
+
+    @property
+    def kind(self) -> str:
+        """Tipo efectivo del índice (``flat`` si no se pudo entrenar el solicitado)."""
+        if self.index is None:
+            return self.spec.kind
+        if self._kind is None:
+            inner = self.index
+            if isinstance(inner, faiss.IndexIDMap):
+                inner = faiss.downcast_index(inner.index)
+            if isinstance(inner, faiss.IndexHNSW):
+                self._kind = "hnsw"
+            elif isinstance(inner, faiss.IndexIVFPQ):
+                self._kind = "ivfpq"
+            elif isinstance(inner, faiss.IndexIVF):
+                self._kind = "ivf"
+            else:
+                self._kind = "flat"
+        return self._kind
+
+    def add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
         if vectors.dtype != np.float32:
             vectors = vectors.astype("float32")
-        self.index.add(vectors)
-
-    def search(self, query_vec: np.ndarray, top_k: int) -> tuple[np.ndarray, np.ndarray]:
-        if query_vec.ndim == 1:
-            query_vec = query_vec.reshape(1, -1)
-        if query_vec.dtype != np.float32:
-            query_vec = query_vec.astype("float32")
-        scores, ids = self.index.search(query_vec, top_k)
+        ids = np.asarray(ids, dtype="int64")
+        if self.index is None:
+            self._pending.append((vectors, ids))
+            self._pending_n += len(vectors)
+            if self._pending_n >= self.spec.train_size:
+                self._train()
+            return
+        self.index.add_with_ids(vectors, ids)
+
+    def remove(self, ids: np.ndarray) -> int:
+        ids = np.asarray(ids, dtype="int64")
+        if ids.size == 0:
+            return 0
+        if self.index is None:
+            return self._remove_pending(ids, keep_listed=False)
+        if _direct_map(self.index) is not None:
+            # con mapa de ids, FAISS solo borra con una lista explícita
+            ids = np.ascontiguousarray(ids)
+            return int(self.index.remove_ids(faiss.IDSelectorArray(len(ids), faiss.swig_ptr(ids))))
+        return int(self.index.remove_ids(faiss.IDSelectorBatch(ids)))
+
+    def remove_except(self, ids: np.ndarray) -> int:
+        """Elimina todos los vectores cuyo id no esté en ``ids``."""
+        ids = np.asarray(ids, dtype="int64")
+        if self.index is None:
+            return self._remove_pending(ids, keep_listed=True)
+        ivf = _direct_map(self.index)
+        if ivf is not None:
+            stored = np.concatenate(
+                [
+                    faiss.rev_swig_ptr(ivf.invlists.get_ids(i), ivf.invlists.list_size(i))
+                    for i in range(ivf.nlist)
+                ]
+                + [np.empty(0, dtype="int64")]
+            )
+            return self.remove(stored[~np.isin(stored, ids)])
+        return int(self.index.remove_ids(faiss.IDSelectorNot(faiss.IDSelectorBatch(ids))))
+
+    def _remove_pending(self, ids: np.ndarray, keep_listed: bool) -> int:
+        before = self._pending_n
+        kept = []
+        for v, i in self._pending:
+            mask = np.isin(i, ids, invert=not keep_listed)
+            kept.append((v[mask], i[mask]))
+        self._pending = kept
+        self._pending_n = sum(len(i) for _, i in kept)
+        return before - self._pending_n
+
+    def search(
+        self,
+        query_vec: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        scores, ids = self.search_many(query_vec, top_k, nprobe=nprobe, ef_search=ef_search)
         return scores[0], ids[0]
 
+    def search_many(
+        self,
+        query_vecs: np.ndarray,
+        top_k: int,
+        nprobe: int | None = None,
+        ef_search: int | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """Una única búsqueda FAISS para todas las filas de ``query_vecs``: ``(scores, ids)`` 2D."""
+        query_vecs = _as_queries(query_vecs)
+        return self.index.search(  # type: ignore[union-attr]
+            query_vecs, top_k, params=self._search_params(nprobe, ef_search)
+        )
+
+    def search_subset_many(
+        self, query_vecs: np.ndarray, top_k: int, ids: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Búsqueda restringida a ``ids`` (p. ej. los chunks de un documento), sin post-filtrado:
+        devuelve ``min(top_k, len(ids))`` resultados por consulta.
+
+        Producto escalar exacto sobre los vectores del subconjunto, con coste proporcional
+        a su tamaño: flat / hnsw los reconstruyen por id (``IndexIDMap2``) e ivf / ivfpq por
+        su mapa de ids (en ivfpq, los vectores decodificados). ivf / ivfpq sin mapa
+        (índices anteriores, hasta el próximo reindexado): selector de ids recorriendo
+        todas las listas, porque con pocas se perderían resultados del subconjunto.
+        """
+        query_vecs = _as_queries(query_vecs)
+        ids = np.asarray(ids, dtype="int64")
+        k = min(top_k, len(ids))
+        if k == 0:
+            n = len(query_vecs)
+            return np.empty((n, 0), dtype="float32"), np.empty((n, 0), dtype="int64")
+
+        if self.kind in ("flat", "hnsw") or _direct_map(self.index) is not None:
+            vecs = self.index.reconstruct_batch(ids)  # type: ignore[union-attr]
+            scores = query_vecs @ vecs.T
+            if k < len(ids):
+                top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            else:
+                top = np.broadcast_to(np.arange(len(ids)), scores.shape)
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1, kind="stable")
+            top = np.take_along_axis(top, order, axis=1)
+            return np.take_along_axis(top_scores, order, axis=1), ids[top]
+
+        if ids[-1] - ids[0] + 1 == len(ids):
+            sel = faiss.IDSelectorRange(int(ids[0]), int(ids[-1]) + 1)  # ids contiguos
+        else:
+            sel = faiss.IDSelectorBatch(ids)
+        nlist = faiss.extract_index_ivf(self.index).nlist
+        params = faiss.SearchParametersIVF(nprobe=nlist, sel=sel)
+        return self.index.search(query_vecs, k, params=params)  # type: ignore[union-attr]
+
+    def _search_params(
+        self, nprobe: int | None, ef_search: int | None
+    ) -> faiss.SearchParameters | None:
+        # Parámetros por consulta (no se modifica el índice compartido)
+        kind = self.kind
+        if nprobe is not None and kind in ("ivf", "ivfpq"):
+            return faiss.SearchParametersIVF(nprobe=nprobe)
+        if ef_search is not None and kind == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=ef_search)
+        return None
+
+    def finalize(self) -> None:
+        """Entrena con lo acumulado si el corpus no llegó a ``train_size``."""
+        if self.index is None:
+            self._train()
+
     def save(self, path: Path) -> None:
+        self.finalize()
         path.parent.mkdir(parents=True, exist_ok=True)
-        faiss.write_index(self.index, str(path))
+        # fichero nuevo + rename: quien tenga el índice anterior mapeado sigue leyéndolo
+        tmp = path.with_suffix(".tmp")
+        faiss.write_index(self.index, str(tmp))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, spec: IndexSpec | None = None, mmap: bool = False) -> FaissStore:
+        """
+        Con ``mmap=True`` el índice se abre en solo lectura mapeado en memoria: carga en
+        tiempo casi constante y los procesos comparten páginas. No admite escrituras.
+        """
+        if not mmap:
+            index = faiss.read_index(str(path))
+            return cls(index.d, index, spec)
 
-    @staticmethod
-    def load(path: Path) -> faiss.Index:
-        return faiss.read_index(str(path))
+        ro = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY
+        # MMAP_IFC: códigos de índices flat; las listas IVF solo admiten IO_FLAG_MMAP
+        error = RuntimeError(f"No se pudo leer el índice {path}")
+        for flags in (ro | getattr(faiss, "IO_FLAG_MMAP_IFC", 0), ro, 0):
+            try:
+                index = faiss.read_index(str(path), flags)
+                break
+            except RuntimeError as e:
+                error = e
+        else:
+            # fichero ausente o ilegible con cualquier modo: el error de la última lectura
+            raise error
+        return cls(index.d, index, spec)
@@ -0,0 +1,9 @@
+from __future__ import annotations
+
+
+class InvalidRequest(ValueError):
+    """Parámetros de la petición no válidos (la API responde 400)."""
+
+
+class IndexNotFound(InvalidRequest):
+    """La colección pedida aún no tiene índice publicado."""
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+from typing import Annotated
+
 from pydantic import BaseModel, Field
 
 
@@ -7,11 +9,29 @@ class UploadResponse(BaseModel):
     doc_id: str
     stored_filename: str
     original_filename: str
+    duplicate: bool = False  # mismo contenido ya subido: no se guarda otra copia
+    collection: str = "default"
 
 
 class ReindexResponse(BaseModel):
     indexed_documents: int
     indexed_chunks: int
+    added_documents: int = 0
+    removed_documents: int = 0
+    embedded_chunks: int = 0
+
+
+class ReindexJobResponse(BaseModel):
+    job_id: str
+    status: str  # queued | running | done | failed
+    full: bool
+    collection: str = "default"
+    created_at: float
+    started_at: float | None = None
+    finished_at: float | None = None
+    error: str | None = None
+    reload_error: str | None = None  # índice publicado, pero el worker no lo pudo cargar
+    result: ReindexResponse | None = None
 
 
 class QueryRequest(BaseModel):
@@ -21,6 +41,7 @@ class QueryRequest(BaseModel):
     use_rerank: bool | None = None
     doc_id: str | None = None
     source_filename: str | None = None
+    collections: list[str] | None = None  # None = solo la colección "default"
 
 
 class Citation(BaseModel):
@@ -36,3 +57,17 @@ class Citation(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     citations: list[Citation]
+
+
+class QueryBatchRequest(BaseModel):
+    questions: list[Annotated[str, Field(min_length=1)]] = Field(min_length=1)
+    top_k: int | None = None
+    use_openai: bool | None = None
+    use_rerank: bool | None = None
+    doc_id: str | None = None
+    source_filename: str | None = None
+    collections: list[str] | None = None  # None = solo la colección "default"
+
+
+class QueryBatchResponse(BaseModel):
+    results: list[QueryResponse]  # mismo orden que ``questions``
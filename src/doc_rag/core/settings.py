@@ -1,11 +1,17 @@
 from __future__ import annotations
 
 import os
-from dataclasses import dataclass
+import re
+from dataclasses import dataclass, replace
 from pathlib import Path
 
 import platform
 
+from doc_rag.core.errors import InvalidRequest
+
+DEFAULT_COLLECTION = "default"
+_COLLECTION_RE = re.compile(r"[a-z0-9][a-z0-9_-]{0,63}")
+
 
 @dataclass(frozen=True)
 class Settings:
@@ -13,6 +19,8 @@ class Settings:
     data_dir: Path = Path(os.getenv("DOC_RAG_DATA_DIR", "data"))
     uploads_dir: Path = Path(os.getenv("DOC_RAG_UPLOADS_DIR", "data/uploads"))
     index_dir: Path = Path(os.getenv("DOC_RAG_INDEX_DIR", "data/index"))
+    # Colección a la que apuntan uploads_dir / index_dir (ver ``for_collection``)
+    collection: str = DEFAULT_COLLECTION
 
     # Límites
     max_upload_mb: int = int(os.getenv("DOC_RAG_MAX_UPLOAD_MB", "20"))
@@ -22,15 +30,51 @@ class Settings:
         "DOC_RAG_EMBEDDING_MODEL",
         "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
     )
+    # Backend de inferencia para embedder y re-rank: torch | onnx (ONNX Runtime, CPU)
+    inference_backend: str = os.getenv("DOC_RAG_INFERENCE_BACKEND", "torch")
+    onnx_quantize: bool = os.getenv("DOC_RAG_ONNX_QUANTIZE", "true").lower() == "true"
+    onnx_quantization_config: str = os.getenv("DOC_RAG_ONNX_QUANTIZATION_CONFIG", "avx2")
+    onnx_threads: int = int(os.getenv("DOC_RAG_ONNX_THREADS", "0"))  # 0 = por defecto
+    embed_cache: bool = os.getenv("DOC_RAG_EMBED_CACHE", "true").lower() == "true"
+    embed_cache_max_entries: int = int(os.getenv("DOC_RAG_EMBED_CACHE_MAX_ENTRIES", "200000"))
     chunk_size: int = int(os.getenv("DOC_RAG_CHUNK_SIZE", "1100"))
     chunk_overlap: int = int(os.getenv("DOC_RAG_CHUNK_OVERLAP", "180"))
+    # structured: títulos/párrafos/frases con offsets sobre el texto original | fixed: ventanas
+    chunker: str = os.getenv("DOC_RAG_CHUNKER", "structured").lower()
     top_k: int = int(os.getenv("DOC_RAG_TOP_K", "5"))
 
+    # Indexado
+    index_workers: int = int(os.getenv("DOC_RAG_INDEX_WORKERS", str(min(4, os.cpu_count() or 1))))
+    embed_batch_size: int = int(os.getenv("DOC_RAG_EMBED_BATCH_SIZE", "256"))
+    index_checkpoint_chunks: int = int(os.getenv("DOC_RAG_INDEX_CHECKPOINT_CHUNKS", "4096"))
+    # Shards por colección (cada documento va a uno según su doc_id)
+    index_shards: int = int(os.getenv("DOC_RAG_INDEX_SHARDS", "1"))
+
+    # Tipo de índice vectorial: flat (exacto) | ivf | hnsw | ivfpq
+    index_type: str = os.getenv("DOC_RAG_INDEX_TYPE", "flat").lower()
+    ivf_nlist: int = int(os.getenv("DOC_RAG_IVF_NLIST", "1024"))
+    hnsw_m: int = int(os.getenv("DOC_RAG_HNSW_M", "32"))
+    hnsw_ef_construction: int = int(os.getenv("DOC_RAG_HNSW_EF_CONSTRUCTION", "200"))
+    pq_m: int = int(os.getenv("DOC_RAG_PQ_M", "48"))
+    pq_nbits: int = int(os.getenv("DOC_RAG_PQ_NBITS", "8"))
+    ann_train_size: int = int(os.getenv("DOC_RAG_ANN_TRAIN_SIZE", "65536"))
+
     # OpenAI (opcional)
     use_openai: bool = os.getenv("RAG_USE_OPENAI", "false").lower() == "true"
     openai_model: str = os.getenv(
         "OPENAI_MODEL", "gpt-4.1"
     )  # prioriza calidad :contentReference[oaicite:1]{index=1}
+    # Cliente HTTP compartido (keep-alive) para la API de OpenAI
+    openai_max_connections: int = int(os.getenv("RAG_OPENAI_MAX_CONNECTIONS", "20"))
+    openai_keepalive_s: float = float(os.getenv("RAG_OPENAI_KEEPALIVE_S", "60"))
+    openai_timeout_s: float = float(os.getenv("RAG_OPENAI_TIMEOUT_S", "120"))
+
+    # Carga de modelos (y del índice) al arrancar el backend
+    warm_models: bool = os.getenv("RAG_WARM_MODELS", "true").lower() == "true"
+    # Workers de ``python -m doc_rag.serve`` (comparten modelos e índice cargados antes del fork)
+    workers: int = int(os.getenv("RAG_WORKERS", "1"))
+    # Cada cuántos segundos se mira si otro proceso ha publicado una generación (0 = nunca)
+    reload_check_s: float = float(os.getenv("RAG_RELOAD_CHECK_S", "2"))
 
     # Re-rank (CrossEncoder)
     use_rerank: bool = os.getenv("RAG_USE_RERANK", "true").lower() == "true"
@@ -43,12 +87,72 @@ class Settings:
         "mps" if platform.system() == "Darwin" else "cpu",
     )
     retrieve_candidates: int = int(os.getenv("RAG_RETRIEVE_CANDIDATES", "40"))
+    # Cascada: poda por margen denso (0 = off), primera pasada truncada (0 = off), caché
+    rerank_dense_margin: float = float(os.getenv("RAG_RERANK_DENSE_MARGIN", "0"))
+    rerank_first_pass_chars: int = int(os.getenv("RAG_RERANK_FIRST_PASS_CHARS", "0"))
+    rerank_first_pass_keep: int = int(os.getenv("RAG_RERANK_FIRST_PASS_KEEP", "16"))
+    rerank_cache_size: int = int(os.getenv("RAG_RERANK_CACHE_SIZE", "50000"))
+
+    # /query/batch
+    max_batch_questions: int = int(os.getenv("RAG_MAX_BATCH_QUESTIONS", "256"))
+
+    # Hilos dedicados a las llamadas a modelos (embedder, FAISS, CrossEncoder)
+    inference_threads: int = int(
+        os.getenv("RAG_INFERENCE_THREADS", str(min(4, os.cpu_count() or 1)))
+    )
+
+    # Hilos para repartir una consulta entre shards (colecciones x shards)
+    search_threads: int = int(os.getenv("RAG_SEARCH_THREADS", str(min(4, os.cpu_count() or 1))))
+
+    # Micro-batching de encode / re-rank entre consultas concurrentes
+    inference_batching: bool = os.getenv("RAG_INFERENCE_BATCHING", "true").lower() == "true"
+    batch_max_wait_ms: float = float(os.getenv("RAG_BATCH_MAX_WAIT_MS", "5"))
+    embed_max_batch: int = int(os.getenv("RAG_EMBED_MAX_BATCH", "64"))
+    rerank_max_batch: int = int(os.getenv("RAG_RERANK_MAX_BATCH", "256"))
+
+    # Cachés de consulta en memoria (vector de la pregunta / respuesta completa)
+    query_cache: bool = os.getenv("RAG_QUERY_CACHE", "true").lower() == "true"
+    query_cache_ttl_s: float = float(os.getenv("RAG_QUERY_CACHE_TTL_S", "3600"))
+    query_vector_cache_size: int = int(os.getenv("RAG_QUERY_VECTOR_CACHE_SIZE", "4096"))
+    query_result_cache_size: int = int(os.getenv("RAG_QUERY_RESULT_CACHE_SIZE", "1024"))
+
+    # Híbrido léxico (BM25) + denso, fusionados con reciprocal-rank fusion
+    use_hybrid: bool = os.getenv("RAG_USE_HYBRID", "true").lower() == "true"
+    hybrid_candidates: int = int(os.getenv("RAG_HYBRID_CANDIDATES", "20"))
+    rrf_k: int = int(os.getenv("RAG_RRF_K", "60"))
+    bm25_k1: float = float(os.getenv("RAG_BM25_K1", "1.2"))
+    bm25_b: float = float(os.getenv("RAG_BM25_B", "0.75"))
+
+    # Búsqueda ANN (por consulta)
+    ivf_nprobe: int = int(os.getenv("RAG_IVF_NPROBE", "16"))
+    hnsw_ef_search: int = int(os.getenv("RAG_HNSW_EF_SEARCH", "64"))
 
     # Contexto adyacente (para OpenAI)
     adjacent_context: bool = os.getenv("RAG_ADJACENT_CONTEXT", "true").lower() == "true"
     adjacent_n: int = int(os.getenv("RAG_ADJACENT_N", "1"))
     adjacent_same_page: bool = os.getenv("RAG_ADJACENT_SAME_PAGE", "true").lower() == "true"
-    adjacent_max_blocks: int = int(os.getenv("RAG_ADJACENT_MAX_BLOCKS", "12"))
+
+    # Empaquetado del contexto por presupuesto de tokens (estimados por caracteres)
+    context_token_budget: int = int(os.getenv("RAG_CONTEXT_TOKEN_BUDGET", "3000"))
+    context_chars_per_token: float = float(os.getenv("RAG_CONTEXT_CHARS_PER_TOKEN", "4"))
+
+    def for_collection(self, name: str) -> Settings:
+        """
+        Ajustes de una colección con nombre: sus subidas y su índice van en
+        ``<uploads_dir>/collections/<name>`` y ``<index_dir>/collections/<name>``. La
+        colección ``default`` son los directorios de siempre.
+        """
+        if name == self.collection:
+            return self
+        if not _COLLECTION_RE.fullmatch(name):
+            raise InvalidRequest(f"Nombre de colección no válido: {name!r}")
+        uploads_dir, index_dir = self.uploads_dir, self.index_dir
+        if self.collection != DEFAULT_COLLECTION:
+            uploads_dir, index_dir = uploads_dir.parent.parent, index_dir.parent.parent
+        if name != DEFAULT_COLLECTION:
+            uploads_dir = uploads_dir / "collections" / name
+            index_dir = index_dir / "collections" / name
+        return replace(self, collection=name, uploads_dir=uploads_dir, index_dir=index_dir)
 
 
 SETTINGS = Settings()
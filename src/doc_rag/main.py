@@ -1,24 +1,61 @@
 from __future__ import annotations
 
-import hashlib
+import asyncio
+import json
+import os
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
 from pathlib import Path
+from typing import TYPE_CHECKING, Any
 
 from fastapi import FastAPI, File, HTTPException, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 
 from doc_rag.core.models import (
     Citation,
+    QueryBatchRequest,
+    QueryBatchResponse,
     QueryRequest,
     QueryResponse,
+    ReindexJobResponse,
     ReindexResponse,
     UploadResponse,
 )
-from doc_rag.core.settings import SETTINGS
-from doc_rag.services.indexer import rebuild_global_index, list_uploads, sha256_file
+from doc_rag.core.errors import InvalidRequest
+from doc_rag.core.settings import DEFAULT_COLLECTION, SETTINGS
+from doc_rag.services.context import pack_context
+from doc_rag.services.executors import Executors
+from doc_rag.services.catalog import DocumentCatalog, collection_names
+from doc_rag.services.jobs import ReindexJob, ReindexJobs
+from doc_rag.services.memory import process_memory
+from doc_rag.services.query_cache import LRUCache, normalize_question
+from doc_rag.services.registry import REGISTRY
 from doc_rag.services.retriever import Retriever
-from doc_rag.services.intent import infer_intent
+from doc_rag.services.uploads import ALLOWED_SUFFIXES, UploadTooLarge, store_upload
+from doc_rag.services.intent import IntentPlan, infer_intent
 
-app = FastAPI(title="Doc RAG Assistant", version="0.1.0")
+if TYPE_CHECKING:
+    from doc_rag.adapters.llm.openai_client import AsyncOpenAIAnswerer
+
+executors = Executors(SETTINGS.inference_threads)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    if SETTINGS.warm_models:
+        # modelos e índice cargados antes de aceptar la primera consulta (con
+        # ``doc_rag.serve`` el índice ya viene cargado del proceso padre)
+        await asyncio.to_thread(REGISTRY.warm, SETTINGS)
+        await asyncio.to_thread(retriever.warm)
+    yield
+    executors.shutdown()
+    retriever.close()
+    await REGISTRY.aclose()
+
+
+app = FastAPI(title="Doc RAG Assistant", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -29,6 +66,18 @@ app.add_middleware(
 )
 
 retriever = Retriever(SETTINGS)
+catalog = DocumentCatalog.from_settings(SETTINGS)
+# el reindexado corre en segundo plano; al terminar, su hilo carga la generación nueva y
+# la pone en servicio sin parar las consultas (el estado se guarda en disco para que
+# cualquier worker pueda consultarlo)
+reindex_jobs = ReindexJobs(
+    SETTINGS, executors.indexing, on_done=retriever.reload, state_dir=SETTINGS.data_dir / "jobs"
+)
+# respuestas completas de /query, válidas mientras no cambie ``retriever.generation``
+query_results: LRUCache[QueryResponse] = LRUCache(
+    SETTINGS.query_result_cache_size if SETTINGS.query_cache else 0,
+    ttl_s=SETTINGS.query_cache_ttl_s,
+)
 
 
 @app.get("/health")
@@ -36,154 +85,365 @@ def health():
     return {"status": "ok"}
 
 
+@app.get("/stats")
+def stats():
+    # con varios workers, cada respuesta es la del worker que atiende la petición
+    return {
+        **retriever.stats(),
+        "query_result_cache": query_results.stats(),
+        "process": {"pid": os.getpid(), "memory": process_memory()},
+    }
+
+
+def _catalog(collection: str) -> DocumentCatalog:
+    if collection == DEFAULT_COLLECTION:
+        return catalog
+    try:
+        return DocumentCatalog.from_settings(SETTINGS.for_collection(collection))
+    except InvalidRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/collections")
+def list_collections():
+    return collection_names(SETTINGS)
+
+
 @app.get("/documents")
-def documents():
-    items = []
-    for p in list_uploads(SETTINGS.uploads_dir):
-        items.append(
-            {
-                "doc_id": sha256_file(p),
-                "source_filename": p.name,
-                "size_bytes": p.stat().st_size,
-            }
-        )
-    return items
+def documents(collection: str = DEFAULT_COLLECTION):
+    # un stat por fichero: el sha256 sale del catálogo
+    return [
+        {
+            "doc_id": e.doc_id,
+            "source_filename": e.source_filename,
+            "size_bytes": e.size_bytes,
+            "mtime_ns": e.mtime_ns,
+            "pages": e.pages,
+            "chunks": e.chunks,
+        }
+        for e in _catalog(collection).sync()
+    ]
 
 
 @app.post("/documents/upload", response_model=UploadResponse)
-async def upload_document(file: UploadFile = File(...)):
+async def upload_document(file: UploadFile = File(...), collection: str = DEFAULT_COLLECTION):
     suffix = Path(file.filename or "").suffix.lower()
-    if suffix not in {".pdf", ".md", ".markdown"}:
+    if suffix not in ALLOWED_SUFFIXES:
         raise HTTPException(status_code=400, detail="Formato no permitido. Use PDF o Markdown.")
 
-    content = await file.read()
     max_bytes = SETTINGS.max_upload_mb * 1024 * 1024
-    if len(content) > max_bytes:
+    if file.size is not None and file.size > max_bytes:
         raise HTTPException(status_code=413, detail=f"Máximo {SETTINGS.max_upload_mb} MB.")
 
-    doc_id = hashlib.sha256(content).hexdigest()
-    safe_name = (Path(file.filename).name if file.filename else f"{doc_id}{suffix}").replace(
-        " ", "_"
-    )
-    stored_filename = f"{doc_id[:12]}_{safe_name}"
-    stored_path = SETTINGS.uploads_dir / stored_filename
-    stored_path.write_bytes(content)
+    # copia por bloques (con sha256 incremental) fuera del event loop
+    target = _catalog(collection)
+    try:
+        stored = await asyncio.to_thread(store_upload, file.file, file.filename, target, max_bytes)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail=f"Máximo {SETTINGS.max_upload_mb} MB.")
 
     return UploadResponse(
-        doc_id=doc_id, stored_filename=stored_filename, original_filename=safe_name
+        doc_id=stored.doc_id,
+        stored_filename=stored.stored_filename,
+        original_filename=stored.original_filename,
+        duplicate=stored.duplicate,
+        collection=collection,
     )
 
 
-@app.post("/documents/reindex", response_model=ReindexResponse)
-def reindex():
-    docs, chunks = rebuild_global_index(SETTINGS)
-    # fuerza recarga en el siguiente query
-    retriever._index = None
-    retriever._chunks_by_id.clear()
-    return ReindexResponse(indexed_documents=docs, indexed_chunks=chunks)
+def _job_response(job: ReindexJob) -> ReindexJobResponse:
+    result = None
+    if job.stats is not None:
+        result = ReindexResponse(
+            indexed_documents=job.stats.documents,
+            indexed_chunks=job.stats.chunks,
+            added_documents=job.stats.added_documents,
+            removed_documents=job.stats.removed_documents,
+            embedded_chunks=job.stats.embedded_chunks,
+        )
+    return ReindexJobResponse(
+        job_id=job.job_id,
+        status=job.status,
+        full=job.full,
+        collection=job.collection,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        error=job.error,
+        reload_error=job.reload_error,
+        result=result,
+    )
 
 
-def _build_context_blocks(results: list[dict], max_blocks: int = 5) -> list[str]:
-    blocks: list[str] = []
-    for r in results[:max_blocks]:
-        cite = f"[{r['source_filename']} | {r['anchor']}]"
-        blocks.append(f"{cite}\n{r['text']}")
-    return blocks
+@app.post("/documents/reindex", response_model=ReindexJobResponse, status_code=202)
+def reindex(full: bool = False, collection: str = DEFAULT_COLLECTION):
+    try:
+        return _job_response(reindex_jobs.submit(full=full, collection=collection))
+    except InvalidRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
-def _build_context_blocks_with_neighbors(
-    results: list[dict],
-    max_blocks: int = 12,
-    neighbor_n: int = 1,
-    same_page: bool = True,
-) -> list[str]:
-    blocks: list[str] = []
-    seen: set[tuple[str, str]] = set()
+@app.get("/documents/reindex/{job_id}", response_model=ReindexJobResponse)
+def reindex_status(job_id: str):
+    job = reindex_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Trabajo de reindexado no encontrado.")
+    return _job_response(job)
 
-    def add(rec: dict) -> None:
-        key = (rec["source_filename"], rec["anchor"])
-        if key in seen:
-            return
-        seen.add(key)
-        cite = f"[{rec['source_filename']} | {rec['anchor']}]"
-        blocks.append(f"{cite}\n{rec['text']}")
 
+def _citations(results: list[dict]) -> list[Citation]:
+    citations: list[Citation] = []
     for r in results:
-        # vecinos previos
-        for nb in retriever.neighbors(int(r["id"]), n=neighbor_n, same_page=same_page):
-            add(nb)
-        # chunk principal
-        add(r)
+        snippet = r["text"][:350] + ("…" if len(r["text"]) > 350 else "")
+        citations.append(
+            Citation(
+                doc_id=r["doc_id"],
+                source_filename=r["source_filename"],
+                page=r.get("page"),
+                anchor=r["anchor"],
+                score=float(r["score"]),
+                section=r.get("section"),
+                snippet=snippet,
+            )
+        )
+    return citations
+
+
+def _answerer() -> AsyncOpenAIAnswerer:
+    from doc_rag.adapters.llm.openai_client import AsyncOpenAIAnswerer
+
+    # cliente compartido: reutiliza las conexiones keep-alive entre peticiones
+    return AsyncOpenAIAnswerer(model=SETTINGS.openai_model, client=REGISTRY.async_openai(SETTINGS))
+
+
+def _context_blocks(results: list[dict]) -> list[str]:
+    # los vecinos se leen del mmap y pueden cargar una generación: se llama fuera del
+    # event loop (``executors.run_inference``)
+    neighbors = None
+    if SETTINGS.adjacent_context:
+
+        def neighbors(r: dict) -> list[dict]:
+            return retriever.neighbors(
+                int(r["id"]),
+                n=SETTINGS.adjacent_n,
+                same_page=SETTINGS.adjacent_same_page,
+                collection=r.get("collection", DEFAULT_COLLECTION),
+            )
+
+    spans = pack_context(
+        results,
+        budget_tokens=SETTINGS.context_token_budget,
+        neighbors=neighbors,
+        chars_per_token=SETTINGS.context_chars_per_token,
+    )
+    return [s.block() for s in spans]
+
+
+async def _llm_answer(question: str, results: list[dict], plan: IntentPlan) -> str | None:
+    """Respuesta de OpenAI, o ``None`` si no está disponible (se usará el modo extractivo)."""
+    try:
+        answerer = _answerer()
+        context_blocks = await executors.run_inference(_context_blocks, results)
+        return await answerer.answer(question, context_blocks, prompt_style=plan.prompt_style)
+    except Exception:
+        return None
 
-        if len(blocks) >= max_blocks:
-            break
 
-    return blocks[:max_blocks]
+def _extractive_answer(results: list[dict]) -> str:
+    if not results:
+        return "No se han encontrado fragmentos relevantes en el índice."
+    lines = ["He encontrado estos fragmentos relevantes:"]
+    for r in results[: min(3, len(results))]:
+        lines.append(f"- [{r['source_filename']} | {r['anchor']}] {r['text']}")
+    return "\n".join(lines)
+
+
+async def _answer(question: str, results: list[dict], plan: IntentPlan, use_openai: bool) -> str:
+    answer = await _llm_answer(question, results, plan) if use_openai else None
+    # si OpenAI falla, pasa a modo extractivo
+    return answer if answer is not None else _extractive_answer(results)
+
+
+@dataclass(frozen=True)
+class _QueryOptions:
+    top_k: int
+    use_openai: bool
+    use_rerank: bool
+    plan: IntentPlan
+    generation: int
+    cache_key: tuple
+
+    @classmethod
+    def from_request(cls, req: QueryRequest) -> _QueryOptions:
+        top_k = req.top_k or SETTINGS.top_k
+        use_openai = req.use_openai if req.use_openai is not None else SETTINGS.use_openai
+        use_rerank = req.use_rerank if req.use_rerank is not None else SETTINGS.use_rerank
+        plan = infer_intent(req.question)
+        # la generación se toma antes de buscar: si entra un reindexado a mitad, la
+        # respuesta se guarda con la generación antigua y no se servirá
+        return cls(
+            top_k=top_k,
+            use_openai=use_openai,
+            use_rerank=use_rerank,
+            plan=plan,
+            generation=retriever.generation,
+            cache_key=(
+                normalize_question(req.question),
+                req.doc_id,
+                req.source_filename,
+                tuple(req.collections or ()),
+                top_k,
+                use_rerank,
+                use_openai,
+                plan,
+            ),
+        )
+
+
+async def _search(req: QueryRequest, opts: _QueryOptions) -> list[dict]:
+    try:
+        return await executors.run_inference(
+            retriever.search,
+            req.question,
+            top_k=opts.top_k,
+            use_rerank=opts.use_rerank,
+            doc_id=req.doc_id,
+            source_filename=req.source_filename,
+            preferred_sections=opts.plan.preferred_sections,
+            collections=req.collections,
+        )
+    except InvalidRequest as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _cache_response(opts: _QueryOptions, resp: QueryResponse, from_llm: bool) -> None:
+    # una respuesta extractiva por fallo de OpenAI no se guarda: el fallo puede ser pasajero
+    if from_llm or not opts.use_openai:
+        query_results.put(opts.cache_key, resp, opts.generation, size=len(resp.model_dump_json()))
+
+
+def _cached(req: QueryRequest, opts: _QueryOptions) -> QueryResponse | None:
+    # con varios workers, otro puede haber publicado un índice nuevo: antes de servir de la
+    # caché se comprueba (como mucho cada RAG_RELOAD_CHECK_S) y, si ha cambiado, se busca
+    if not retriever.is_current(req.collections):
+        return None
+    return query_results.get(opts.cache_key, opts.generation)
 
 
 @app.post("/query", response_model=QueryResponse)
-def query(req: QueryRequest):
+async def query(req: QueryRequest):
+    opts = _QueryOptions.from_request(req)
+    cached = _cached(req, opts)
+    if cached is not None:
+        return cached
+
+    results = await _search(req, opts)
+    answer = None
+    if opts.use_openai:
+        answer = await _llm_answer(req.question, results, opts.plan)
+    resp = QueryResponse(
+        answer=answer if answer is not None else _extractive_answer(results),
+        citations=_citations(results),
+    )
+    _cache_response(opts, resp, from_llm=answer is not None)
+    return resp
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.post("/query/stream")
+async def query_stream(req: QueryRequest):
+    """
+    Server-sent events: ``citations`` en cuanto termina la búsqueda, ``token`` por cada
+    fragmento de la respuesta y ``done`` con la respuesta completa (``mode``: ``openai``,
+    ``extractive`` o ``cached``). Si OpenAI falla a mitad se envía ``error`` antes de ``done``.
+    """
+    opts = _QueryOptions.from_request(req)
+    cached = _cached(req, opts)
+    results = [] if cached is not None else await _search(req, opts)
+
+    async def events() -> AsyncIterator[str]:
+        if cached is not None:
+            yield _sse("citations", [c.model_dump() for c in cached.citations])
+            yield _sse("token", {"text": cached.answer})
+            yield _sse("done", {"answer": cached.answer, "mode": "cached"})
+            return
+
+        citations = _citations(results)
+        yield _sse("citations", [c.model_dump() for c in citations])
+
+        parts: list[str] = []
+        if opts.use_openai:
+            try:
+                answerer = _answerer()
+                context_blocks = await executors.run_inference(_context_blocks, results)
+                async for delta in answerer.stream(
+                    req.question, context_blocks, prompt_style=opts.plan.prompt_style
+                ):
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+            except Exception as e:
+                if parts:
+                    # ya se ha enviado parte de la respuesta: se corta aquí
+                    yield _sse("error", {"detail": f"{type(e).__name__}: {e}"})
+                    yield _sse("done", {"answer": "".join(parts), "mode": "openai"})
+                    return
+                parts = []
+
+        if parts:
+            answer, mode = "".join(parts).strip(), "openai"
+        else:
+            # sin OpenAI (o ha fallado antes del primer token): modo extractivo
+            answer, mode = _extractive_answer(results), "extractive"
+            yield _sse("token", {"text": answer})
+        _cache_response(opts, QueryResponse(answer=answer, citations=citations), mode == "openai")
+        yield _sse("done", {"answer": answer, "mode": mode})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.post("/query/batch", response_model=QueryBatchResponse)
+async def query_batch(req: QueryBatchRequest):
+    if len(req.questions) > SETTINGS.max_batch_questions:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Máximo {SETTINGS.max_batch_questions} preguntas por lote.",
+        )
     top_k = req.top_k or SETTINGS.top_k
     use_openai = req.use_openai if req.use_openai is not None else SETTINGS.use_openai
     use_rerank = req.use_rerank if req.use_rerank is not None else SETTINGS.use_rerank
-    plan = infer_intent(req.question)
+    plans = [infer_intent(q) for q in req.questions]
 
     try:
-        results = retriever.search(
-            req.question,
+        batch = await executors.run_inference(
+            retriever.search_many,
+            req.questions,
             top_k=top_k,
             use_rerank=use_rerank,
             doc_id=req.doc_id,
             source_filename=req.source_filename,
-            preferred_sections=plan.preferred_sections,
+            preferred_sections=[p.preferred_sections for p in plans],
+            collections=req.collections,
         )
-    except FileNotFoundError as e:
+    except InvalidRequest as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-    citations: list[Citation] = []
-    for r in results:
-        snippet = r["text"][:350] + ("…" if len(r["text"]) > 350 else "")
-        citations.append(
-            Citation(
-                doc_id=r["doc_id"],
-                source_filename=r["source_filename"],
-                page=r.get("page"),
-                anchor=r["anchor"],
-                score=float(r["score"]),
-                section=r.get("section"),
-                snippet=snippet,
-            )
+    # las respuestas del LLM se piden en paralelo
+    answers = await asyncio.gather(
+        *(
+            _answer(q, results, plan, use_openai)
+            for q, results, plan in zip(req.questions, batch, plans, strict=True)
         )
-
-    # Respuesta
-    if use_openai:
-        try:
-            from doc_rag.adapters.llm.openai_client import OpenAIAnswerer
-
-            answerer = OpenAIAnswerer(model=SETTINGS.openai_model)
-            if SETTINGS.adjacent_context:
-                context_blocks = _build_context_blocks_with_neighbors(
-                    results,
-                    max_blocks=SETTINGS.adjacent_max_blocks,
-                    neighbor_n=SETTINGS.adjacent_n,
-                    same_page=SETTINGS.adjacent_same_page,
-                )
-            else:
-                context_blocks = _build_context_blocks(results, max_blocks=top_k)
-
-            answer = answerer.answer(req.question, context_blocks, prompt_style=plan.prompt_style)
-            return QueryResponse(answer=answer, citations=citations)
-        except Exception:
-            # pasa a modo extractivo
-            pass
-
-    # Modo extractivo (sin LLM)
-    if not results:
-        answer = "No se han encontrado fragmentos relevantes en el índice."
-    else:
-        lines = ["He encontrado estos fragmentos relevantes:"]
-        for r in results[: min(3, len(results))]:
-            lines.append(f"- [{r['source_filename']} | {r['anchor']}] {r['text']}")
-        answer = "\n".join(lines)
-
-    return QueryResponse(answer=answer, citations=citations)
+    )
+    return QueryBatchResponse(
+        results=[
+            QueryResponse(answer=answer, citations=_citations(results))
+            for answer, results in zip(answers, batch, strict=True)
+        ]
+    )
@@ -0,0 +1,202 @@
+"""
+Backend con varios workers que comparten modelos e índice.
+
+``uvicorn --workers N`` arranca N intérpretes que importan ``doc_rag.main`` por su cuenta:
+N copias del SentenceTransformer, del CrossEncoder y del índice. Aquí se cargan una vez en
+el proceso padre y los workers se crean con ``fork``, así que heredan esas páginas sin
+copiarlas (copy-on-write). El índice (FAISS, chunks y BM25) se abre con mmap: también las
+generaciones que se carguen después comparten la caché de páginas del sistema.
+
+``/stats`` devuelve, para el worker que atiende, su pid y su memoria (``private_bytes`` es
+lo que cuesta ese worker por sí solo).
+
+Uso (desde la raíz del repo):
+    PYTHONPATH=src python -m doc_rag.serve --workers 4 --port 8000
+"""
+
+from __future__ import annotations
+
+import argparse
+import gc
+import logging
+import os
+import signal
+import socket
+import time
+from collections.abc import Callable
+from typing import TYPE_CHECKING
+
+from doc_rag.core.settings import SETTINGS, Settings
+from doc_rag.services.backends import InferenceBackend
+from doc_rag.services.catalog import collection_names
+from doc_rag.services.embedding_cache import flush_embedding_caches
+from doc_rag.services.memory import process_memory
+from doc_rag.services.registry import REGISTRY
+
+if TYPE_CHECKING:
+    import uvicorn
+
+logger = logging.getLogger("uvicorn.error")
+
+# un worker que muere antes de esto al arrancar no se repone (error de configuración)
+MIN_UPTIME_S = 5.0
+
+
+def preload(settings: Settings) -> None:
+    """
+    Carga en el proceso padre lo que compartirán los workers: modelos e índice de todas
+    las colecciones. Sin pasada de prueba (la hace cada worker al arrancar): los pools de
+    hilos de inferencia no sobreviven al fork. ``gc.freeze`` saca lo cargado de las pasadas
+    del recolector, que si no escribiría en sus cabeceras y copiaría sus páginas en cada
+    worker.
+    """
+    from doc_rag.main import retriever
+
+    if settings.use_rerank:
+        REGISTRY.reranker(settings)
+    retriever.warm(collection_names(settings))
+    gc.collect()
+    gc.freeze()
+
+
+def refresh() -> None:
+    """
+    En el padre: sigue a las generaciones que publican los workers, para que los que se
+    repongan nazcan con la vigente y para no retener en disco (mapeadas) las ya borradas.
+    Se hace en el hilo principal: el padre no debe tener hilos al hacer ``fork``.
+    """
+    from doc_rag.main import retriever
+
+    if retriever.refresh():
+        gc.collect()
+        gc.freeze()
+
+
+class Supervisor:
+    """
+    Proceso padre: crea ``workers`` hijos con ``fork`` sobre un mismo socket, repone los
+    que terminan y, con SIGINT/SIGTERM, los para (a cada hijo le reenvía la señal). Entre
+    tanto llama a ``on_idle`` cada ``interval_s`` segundos.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        sock: socket.socket,
+        workers: int,
+        on_idle: Callable[[], None] | None = None,
+        interval_s: float = 1.0,
+    ):
+        self.config = config
+        self.sock = sock
+        self.workers = max(1, workers)
+        self.on_idle = on_idle
+        self.interval_s = interval_s
+        self.children: dict[int, float] = {}  # pid -> arranque
+        self.stopping = False
+        self.failed = False
+
+    def run(self) -> int:
+        signal.signal(signal.SIGINT, self._stop)
+        signal.signal(signal.SIGTERM, self._stop)
+        for _ in range(self.workers):
+            self._spawn()
+        while self.children:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                time.sleep(self.interval_s)
+                if self.on_idle is not None and not self.stopping:
+                    self.on_idle()
+                continue
+            started = self.children.pop(pid, None)
+            if started is None or self.stopping:
+                continue
+            code = os.waitstatus_to_exitcode(status)
+            if time.monotonic() - started < MIN_UPTIME_S:
+                logger.error("El worker %d ha fallado al arrancar (código %d).", pid, code)
+                self.failed = True
+                self._stop(signal.SIGTERM, None)
+                continue
+            logger.warning("El worker %d ha terminado (código %d); se arranca otro.", pid, code)
+            self._spawn()
+        return 1 if self.failed else 0
+
+    def _spawn(self) -> None:
+        # sin señales entre el fork y el cambio de manejadores del hijo: con las del padre
+        # el hijo reenviaría la señal a sus hermanos
+        signals = {signal.SIGINT, signal.SIGTERM}
+        signal.pthread_sigmask(signal.SIG_BLOCK, signals)
+        pid = os.fork()
+        if pid:
+            self.children[pid] = time.monotonic()
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+            return
+        code = 0
+        try:
+            self.children.clear()
+            os.setpgid(0, 0)  # Ctrl+C llega solo al padre, que lo reenvía una vez
+            for signum in signals:
+                signal.signal(signum, signal.SIG_DFL)
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, signals)
+            self._serve()
+        except SystemExit as e:
+            code = e.code if isinstance(e.code, int) else 1
+        except Exception:
+            logger.exception("Error en el worker %d.", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _serve(self) -> None:
+        import uvicorn
+
+        # desde aquí, el mismo proceso que con ``uvicorn doc_rag.main:app``
+        uvicorn.Server(self.config).run(sockets=[self.sock])
+        # ``os._exit`` no pasa por ``atexit``
+        flush_embedding_caches()
+
+    def _stop(self, signum: int, frame: object) -> None:
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=SETTINGS.workers)
+    ap.add_argument("--log-level", default="info")
+    args = ap.parse_args()
+
+    import uvicorn
+
+    config = uvicorn.Config(
+        "doc_rag.main:app", host=args.host, port=args.port, log_level=args.log_level
+    )
+    on_idle = None
+    if InferenceBackend.from_settings(SETTINGS).kind == "torch":
+        preload(SETTINGS)
+        on_idle = refresh
+        memory = process_memory()
+        if memory is not None:
+            logger.info("Precargado en el proceso padre: %d MB.", memory["rss_bytes"] >> 20)
+    else:
+        # las sesiones de ONNX Runtime crean sus hilos al construirse y no sobreviven al
+        # fork: cada worker carga sus modelos (el índice se sigue compartiendo por mmap)
+        logger.info("Backend %s: modelos cargados en cada worker.", SETTINGS.inference_backend)
+
+    sock = config.bind_socket()
+    interval_s = SETTINGS.reload_check_s if SETTINGS.reload_check_s > 0 else 1.0
+    supervisor = Supervisor(config, sock, args.workers, on_idle=on_idle, interval_s=interval_s)
+    raise SystemExit(supervisor.run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+from __future__ import annotations
+
+import functools
+import importlib.util
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any
+
+from doc_rag.core.settings import Settings
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+BACKENDS = ("torch", "onnx")
+QUANTIZATION_CONFIGS = ("arm64", "avx2", "avx512", "avx512_vnni")
+
+_EXPORT_LOCK = threading.Lock()
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class InferenceBackend:
+    """
+    Cómo se ejecutan los modelos de sentence-transformers.
+
+    ``torch``: modelos originales en PyTorch (fp32). ``onnx``: se exportan una vez a
+    ``models_dir`` (opcionalmente con cuantización dinámica int8) y se ejecutan con
+    ONNX Runtime, con ``threads`` hilos intra-op (0 = por defecto de ONNX Runtime).
+    """
+
+    kind: str = "torch"
+    quantize: bool = False
+    quantization_config: str = "avx2"
+    threads: int = 0
+    models_dir: Path = Path("data/models")
+
+    def __post_init__(self) -> None:
+        if self.kind not in BACKENDS:
+            raise ValueError(f"Backend de inferencia no soportado: {self.kind!r} (use {BACKENDS})")
+        if self.quantization_config not in QUANTIZATION_CONFIGS:
+            raise ValueError(
+                f"Cuantización no soportada: {self.quantization_config!r} "
+                f"(use {QUANTIZATION_CONFIGS})"
+            )
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> InferenceBackend:
+        """Sin el extra ``onnx`` instalado, ``onnx`` se queda en ``torch`` (con un aviso)."""
+        kind = settings.inference_backend
+        if kind == "onnx" and not onnx_available():
+            kind = "torch"
+        return cls(
+            kind=kind,
+            quantize=settings.onnx_quantize,
+            quantization_config=settings.onnx_quantization_config,
+            threads=settings.onnx_threads,
+            models_dir=settings.data_dir / "models",
+        )
+
+    @property
+    def tag(self) -> str:
+        """Identifica la variante numérica (p. ej. para no mezclar cachés de embeddings)."""
+        if self.kind == "torch":
+            return "torch"
+        return f"onnx-qint8-{self.quantization_config}" if self.quantize else "onnx"
+
+    def sentence_transformer(self, model_name: str) -> SentenceTransformer:
+        from sentence_transformers import SentenceTransformer
+
+        if self.kind == "torch":
+            return SentenceTransformer(model_name)
+        path, file_name = self._export(model_name, SentenceTransformer)
+        return SentenceTransformer(
+            str(path), backend="onnx", model_kwargs=self._onnx_kwargs(file_name)
+        )
+
+    def cross_encoder(self, model_name: str, device: str = "cpu") -> CrossEncoder:
+        from sentence_transformers import CrossEncoder
+
+        if self.kind == "torch":
+            return CrossEncoder(model_name, device=device)
+        path, file_name = self._export(model_name, CrossEncoder)
+        return CrossEncoder(str(path), backend="onnx", model_kwargs=self._onnx_kwargs(file_name))
+
+    def _export(self, model_name: str, model_cls: type) -> tuple[Path, str]:
+        """Exporta (una vez) el modelo a ONNX en ``models_dir``; devuelve ruta y fichero."""
+        path = self.models_dir / "onnx" / re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+        file_name = (
+            f"onnx/model_qint8_{self.quantization_config}.onnx"
+            if self.quantize
+            else "onnx/model.onnx"
+        )
+        with _EXPORT_LOCK:
+            if not (path / "onnx" / "model.onnx").exists():
+                model = model_cls(model_name, backend="onnx")  # exporta desde PyTorch
+                model.save_pretrained(str(path))
+            if not (path / file_name).exists():
+                from sentence_transformers import export_dynamic_quantized_onnx_model
+
+                model = model_cls(str(path), backend="onnx")
+                export_dynamic_quantized_onnx_model(model, self.quantization_config, str(path))
+        return path, file_name
+
+    def _onnx_kwargs(self, file_name: str) -> dict[str, Any]:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if self.threads > 0:
+            options.intra_op_num_threads = self.threads
+        return {
+            "file_name": file_name,
+            "provider": "CPUExecutionProvider",
+            "session_options": options,
+        }
+
+
+@functools.cache
+def onnx_available() -> bool:
+    """Si están instalados ONNX Runtime y optimum (``uv sync --extra onnx``)."""
+    missing = [m for m in ("onnxruntime", "optimum") if importlib.util.find_spec(m) is None]
+    if missing:
+        logger.warning(
+            "Backend onnx sin %s instalado (uv sync --extra onnx): se usa torch.",
+            ", ".join(missing),
+        )
+    return not missing
@@ -0,0 +1,179 @@
+from __future__ import annotations
+
+import os
+import re
+import struct
+import zipfile
+from array import array
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+
+# Conserva términos compuestos tal cual: "IL-6", "BRCA1", "eq.3", "p53"
+_TOKEN_RE = re.compile(r"\w+(?:[-.]\w+)*")
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN_RE.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Índice invertido BM25 sobre las filas del ``ChunkStore`` (misma numeración).
+
+    Postings en formato CSR: ``indptr[t]:indptr[t + 1]`` delimita las filas (int32) y
+    frecuencias (uint16) del término ``t``. El vocabulario se guarda como un único
+    blob UTF-8 separado por saltos de línea.
+    """
+
+    def __init__(
+        self,
+        vocab: dict[str, int],
+        indptr: np.ndarray,
+        rows: np.ndarray,
+        tfs: np.ndarray,
+        doc_len: np.ndarray,
+    ):
+        self.vocab = vocab
+        self.indptr = indptr
+        self.rows = rows
+        self.tfs = tfs
+        self.doc_len = doc_len
+        self.avgdl = float(doc_len.mean()) if len(doc_len) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.doc_len)
+
+    @classmethod
+    def build(cls, chunks: ChunkStore) -> BM25Index:
+        postings: dict[str, tuple[array, array]] = {}
+        doc_len = np.zeros(len(chunks), dtype=np.float32)
+        for row in range(len(chunks)):
+            tokens = tokenize(chunks.text(row))
+            doc_len[row] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                entry = postings.get(term)
+                if entry is None:
+                    entry = postings[term] = (array("i"), array("H"))
+                entry[0].append(row)
+                entry[1].append(min(tf, 0xFFFF))
+
+        terms = sorted(postings)
+        indptr = np.zeros(len(terms) + 1, dtype=np.int64)
+        np.cumsum([len(postings[t][0]) for t in terms], out=indptr[1:])
+        rows = np.empty(int(indptr[-1]), dtype=np.int32)
+        tfs = np.empty(int(indptr[-1]), dtype=np.uint16)
+        for i, t in enumerate(terms):
+            r, f = postings.pop(t)
+            rows[indptr[i] : indptr[i + 1]] = np.frombuffer(r, dtype=np.int32)
+            tfs[indptr[i] : indptr[i + 1]] = np.frombuffer(f, dtype=np.uint16)
+        return cls({t: i for i, t in enumerate(terms)}, indptr, rows, tfs, doc_len)
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        k1: float = 1.2,
+        b: float = 0.75,
+        rows: np.ndarray | None = None,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Devuelve ``(scores, filas)`` de los ``top_k`` mejores. Con ``rows`` solo se
+        puntúan esas filas (filtro por documento).
+        """
+        n = len(self.doc_len)
+        tids = {self.vocab[t] for t in tokenize(query) if t in self.vocab}
+        if not tids or n == 0:
+            return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+
+        hit_rows: list[np.ndarray] = []
+        weights: list[np.ndarray] = []
+        for t in tids:
+            start, stop = int(self.indptr[t]), int(self.indptr[t + 1])
+            r = self.rows[start:stop]
+            tf = self.tfs[start:stop].astype(np.float32)
+            df = stop - start
+            idf = np.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            norm = k1 * (1.0 - b + b * self.doc_len[r] / self.avgdl)
+            hit_rows.append(r)
+            weights.append(idf * tf * (k1 + 1.0) / (tf + norm))
+
+        scores = np.bincount(
+            np.concatenate(hit_rows), weights=np.concatenate(weights), minlength=n
+        ).astype(np.float32)
+        if rows is not None:
+            mask = np.zeros(n, dtype=bool)
+            mask[rows] = True
+            scores[~mask] = 0.0
+
+        cand = np.flatnonzero(scores > 0)
+        if len(cand) > top_k:
+            cand = cand[np.argpartition(-scores[cand], top_k - 1)[:top_k]]
+        cand = cand[np.argsort(-scores[cand], kind="stable")]
+        return scores[cand], cand.astype(np.int64)
+
+    def save(self, path: Path) -> None:
+        vocab_blob = "\n".join(sorted(self.vocab, key=self.vocab.__getitem__)).encode("utf-8")
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            vocab=np.frombuffer(vocab_blob, dtype=np.uint8),
+            indptr=self.indptr,
+            rows=self.rows,
+            tfs=self.tfs,
+            doc_len=self.doc_len,
+        )
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = False) -> BM25Index:
+        """
+        Con ``mmap=True`` los postings se mapean del ``.npz`` (solo lectura) en lugar de
+        copiarse: los procesos que abren el mismo índice comparten sus páginas.
+        """
+        arrays = _map_npz(path) if mmap else None
+        if arrays is None:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        blob = arrays["vocab"].tobytes().decode("utf-8")
+        terms = blob.split("\n") if blob else []
+        return cls(
+            {t: i for i, t in enumerate(terms)},
+            arrays["indptr"],
+            arrays["rows"],
+            arrays["tfs"],
+            arrays["doc_len"],
+        )
+
+
+def _map_npz(path: Path) -> dict[str, np.ndarray] | None:
+    """
+    Arrays de un ``.npz`` sin comprimir (como los de ``np.savez``) mapeados en memoria:
+    cada miembro es un ``.npy`` guardado tal cual dentro del zip, así que basta con su
+    offset. ``None`` si algún miembro no se puede mapear (comprimido, objetos, Fortran).
+    """
+    arrays: dict[str, np.ndarray] = {}
+    with zipfile.ZipFile(path) as zf, path.open("rb") as f:
+        for info in zf.infolist():
+            if info.compress_type != zipfile.ZIP_STORED or not info.filename.endswith(".npy"):
+                return None
+            # cabecera local del zip: 30 bytes + nombre + campo extra
+            f.seek(info.header_offset + 26)
+            name_len, extra_len = struct.unpack("<HH", f.read(4))
+            f.seek(info.header_offset + 30 + name_len + extra_len)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+            if fortran or dtype.hasobject:
+                return None
+            name = info.filename[: -len(".npy")]
+            if int(np.prod(shape)) == 0:
+                arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                arrays[name] = np.memmap(path, dtype=dtype, mode="r", offset=f.tell(), shape=shape)
+    return arrays
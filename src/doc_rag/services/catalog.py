@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+from doc_rag.adapters.loaders.pdf_loader import count_pdf_pages
+from doc_rag.core.settings import DEFAULT_COLLECTION, Settings
+from doc_rag.services.locks import file_lock
+
+CATALOG_VERSION = 1
+UPLOAD_SUFFIXES = {".pdf", ".md", ".markdown"}
+
+# lectura-modificación-escritura del catálogo serializada dentro del proceso (y entre
+# workers con ``file_lock``)
+_LOCK = threading.Lock()
+
+
+def sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def list_uploads(uploads_dir: Path) -> list[Path]:
+    if not uploads_dir.is_dir():
+        return []  # colección aún sin subidas
+    return sorted(
+        [p for p in uploads_dir.iterdir() if p.is_file() and p.suffix.lower() in UPLOAD_SUFFIXES]
+    )
+
+
+@dataclass
+class CatalogEntry:
+    doc_id: str
+    source_filename: str  # nombre en el directorio de subidas
+    size_bytes: int
+    mtime_ns: int
+    pages: int | None = None  # PDF; None en Markdown
+    chunks: int | None = None  # None = aún sin indexar
+
+
+class DocumentCatalog:
+    """
+    Catálogo persistente de los documentos subidos (``catalog.json``), por nombre de
+    fichero. Una entrada es válida mientras el fichero conserve tamaño y mtime, así que
+    listar cuesta un ``stat`` por documento: solo se calcula el sha256 (y el número de
+    páginas) de ficheros nuevos o modificados fuera de la API.
+    """
+
+    def __init__(self, path: Path, uploads_dir: Path):
+        self.path = path
+        self.uploads_dir = uploads_dir
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> DocumentCatalog:
+        if settings.collection == DEFAULT_COLLECTION:
+            return cls(settings.data_dir / "catalog.json", settings.uploads_dir)
+        path = settings.data_dir / "collections" / f"{settings.collection}.catalog.json"
+        return cls(path, settings.uploads_dir)
+
+    def sync(self) -> list[CatalogEntry]:
+        """Entradas de los ficheros actuales (en orden de nombre), actualizando el catálogo."""
+        with self._locked():
+            entries = self._load()
+            current: dict[str, CatalogEntry] = {}
+            for p in list_uploads(self.uploads_dir):
+                st = p.stat()
+                entry = entries.get(p.name)
+                if entry is None or (entry.size_bytes, entry.mtime_ns) != (
+                    st.st_size,
+                    st.st_mtime_ns,
+                ):
+                    entry = _describe(p, sha256_file(p))
+                current[p.name] = entry
+            if current != entries:
+                self._save(current)
+            return list(current.values())
+
+    def record(self, path: Path, doc_id: str) -> CatalogEntry:
+        """Registra un fichero recién guardado cuyo sha256 ya se conoce."""
+        entry = _describe(path, doc_id)
+        with self._locked():
+            entries = self._load()
+            entries[path.name] = entry
+            self._save(entries)
+        return entry
+
+    def find(self, doc_id: str) -> CatalogEntry | None:
+        return next((e for e in self.sync() if e.doc_id == doc_id), None)
+
+    def set_chunk_counts(self, chunks_by_doc: dict[str, int]) -> None:
+        """Tras reindexar: nº de chunks por doc_id (``None`` si no está en el índice)."""
+        with self._locked():
+            entries = self._load()
+            for entry in entries.values():
+                entry.chunks = chunks_by_doc.get(entry.doc_id)
+            self._save(entries)
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with _LOCK, file_lock(self.path.with_suffix(".lock")):
+            yield
+
+    def _load(self) -> dict[str, CatalogEntry]:
+        if not self.path.exists():
+            return {}
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("version") != CATALOG_VERSION:
+            return {}
+        return {name: CatalogEntry(**e) for name, e in data["documents"].items()}
+
+    def _save(self, entries: dict[str, CatalogEntry]) -> None:
+        data = {
+            "version": CATALOG_VERSION,
+            "documents": {name: asdict(e) for name, e in entries.items()},
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(self.path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+
+def _describe(path: Path, doc_id: str) -> CatalogEntry:
+    st = path.stat()
+    pages = None
+    if path.suffix.lower() == ".pdf":
+        try:
+            pages = count_pdf_pages(path)
+        except Exception:
+            pages = None  # PDF ilegible: se verá al indexar
+    return CatalogEntry(
+        doc_id=doc_id,
+        source_filename=path.name,
+        size_bytes=st.st_size,
+        mtime_ns=st.st_mtime_ns,
+        pages=pages,
+    )
+
+
+def collection_names(settings: Settings) -> list[str]:
+    """Colecciones con subidas o con índice (``default`` siempre está)."""
+    base = settings.for_collection(DEFAULT_COLLECTION)
+    names = {DEFAULT_COLLECTION}
+    for root in (base.uploads_dir / "collections", base.index_dir / "collections"):
+        if root.is_dir():
+            names.update(p.name for p in root.iterdir() if p.is_dir())
+    return sorted(names)
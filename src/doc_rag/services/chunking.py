@@ -1,20 +1,25 @@
 from __future__ import annotations
 
+import re
 from dataclasses import dataclass
 
+CHUNKERS = ("structured", "fixed")
+
 
 @dataclass(frozen=True)
 class Chunk:
     text: str
     char_start: int
     char_end: int
+    section: str | None = None
 
 
 def chunk_text(text: str, chunk_size: int, overlap: int) -> list[Chunk]:
-    if chunk_size <= 0:
-        raise ValueError("chunk_size debe ser > 0")
-    if overlap < 0 or overlap >= chunk_size:
-        raise ValueError("overlap debe cumplir 0 <= overlap < chunk_size")
+    """
+    Ventanas fijas de ``chunk_size`` caracteres sobre el texto con los espacios
+    colapsados; los offsets se refieren a ese texto normalizado.
+    """
+    _check_params(chunk_size, overlap)
 
     clean = " ".join(text.split())
     n = len(clean)
@@ -32,3 +37,187 @@ def chunk_text(text: str, chunk_size: int, overlap: int) -> list[Chunk]:
             break
         start = max(0, end - overlap)
     return chunks
+
+
+def _check_params(chunk_size: int, overlap: int) -> None:
+    if chunk_size <= 0:
+        raise ValueError("chunk_size debe ser > 0")
+    if overlap < 0 or overlap >= chunk_size:
+        raise ValueError("overlap debe cumplir 0 <= overlap < chunk_size")
+
+
+# Líneas de título: Markdown (``## Métodos``) o, en texto plano/PDF, numeradas
+# (``2.1 Results``) o con un nombre de sección conocido en solitario.
+_MD_HEADING_RE = re.compile(r"[ \t]{0,3}#{1,6}[ \t]+(?P<title>[^\n]*?)[ \t#]*$")
+_NUMBERED_HEADING_RE = re.compile(
+    r"(?:\d{1,2}(?:\.\d{1,2})*\.?|[IVX]{1,5}\.)[ \t]+(?P<title>[A-ZÁÉÍÓÚÑ][^\n\d.:;,]{1,60})"
+)
+_KNOWN_HEADING_RE = re.compile(
+    r"(?P<title>abstract|resumen|introduction|introducción|background|related\s+work|"
+    r"(?:materials?\s+and\s+)?methods?|methodology|results?(?:\s+and\s+discussion)?|"
+    r"discussion|conclusions?|acknowledge?ments?)[ \t]*:?",
+    re.IGNORECASE,
+)
+_LINE_RE = re.compile(r"[^\n]+")
+_SENTENCE_END_RE = re.compile(r"[.!?…][\"'»”)\]]*\s+(?=[^\sa-záéíóúñ])")
+
+
+@dataclass(frozen=True)
+class _Unit:
+    """Fragmento indivisible (título, párrafo o frase) como offsets sobre el texto."""
+
+    start: int
+    end: int
+    section: str | None
+    heading: bool = False
+
+
+def heading_title(line: str) -> str | None:
+    """Título de sección si ``line`` (una línea, sin salto) parece un encabezado."""
+    line = line.strip()
+    if not line or len(line) > 80:
+        return None
+    m = _MD_HEADING_RE.fullmatch(line)
+    if m is None:
+        m = _NUMBERED_HEADING_RE.fullmatch(line) or _KNOWN_HEADING_RE.fullmatch(line)
+        if m is None or len(m.group("title").split()) > 8:
+            return None
+    return " ".join(m.group("title").split()) or None
+
+
+def chunk_structured(
+    text: str, chunk_size: int, overlap: int, section: str | None = None
+) -> list[Chunk]:
+    """
+    Trocea respetando la estructura: títulos, párrafos y, si un párrafo no cabe en
+    ``chunk_size``, frases (y, en último caso, palabras). Cada chunk lleva el título de
+    la sección de su contenido (``section`` es la sección vigente al inicio del texto)
+    y sus offsets se refieren a ``text`` tal cual: ``text[char_start:char_end]`` es el
+    texto del chunk. El solape se hace con frases/párrafos completos del chunk anterior
+    hasta ``overlap`` caracteres, sin cruzar un título.
+
+    Un título nunca forma un chunk por sí solo: va delante de la primera unidad de
+    contenido que le sigue si caben juntos y, si no, solo queda como ``section``.
+
+    Un solo recorrido sobre ``text`` trabajando con offsets: el único copiado es el del
+    propio texto de cada chunk.
+    """
+    return split_structured(text, chunk_size, overlap, section)[0]
+
+
+def split_structured(
+    text: str, chunk_size: int, overlap: int, section: str | None = None
+) -> tuple[list[Chunk], str | None]:
+    """``chunk_structured`` y la sección vigente al final de ``text`` (para la página siguiente)."""
+    _check_params(chunk_size, overlap)
+    units = _units(text, chunk_size, section)
+    chunks: list[Chunk] = []
+    i = 0
+    while i < len(units):
+        h = i
+        while h < len(units) and units[h].heading:
+            h += 1
+        if h == len(units):
+            break  # títulos al final: solo cuentan como sección de lo que sigue
+        # de los títulos seguidos, los últimos que quepan con el contenido
+        while i < h and units[h].end - units[i].start > chunk_size:
+            i += 1
+        start = units[i].start
+        j = h + 1
+        while j < len(units) and not units[j].heading and units[j].end - start <= chunk_size:
+            j += 1
+        end = units[j - 1].end
+        chunks.append(
+            Chunk(text=text[start:end], char_start=start, char_end=end, section=units[h].section)
+        )
+        if j == len(units) or overlap == 0 or units[j].heading:
+            i = j
+            continue
+        # el siguiente chunk repite las últimas unidades que quepan en ``overlap`` (y que
+        # dejen sitio a la unidad nueva ``j``); nunca vuelve al inicio del chunk actual
+        k = j
+        while (
+            k - 1 > i
+            and not units[k - 1].heading
+            and end - units[k - 1].start <= overlap
+            and units[j].end - units[k - 1].start <= chunk_size
+        ):
+            k -= 1
+        i = k
+    return chunks, units[-1].section if units else section
+
+
+def _units(text: str, chunk_size: int, section: str | None) -> list[_Unit]:
+    """Títulos y párrafos (partidos en frases/palabras si exceden ``chunk_size``)."""
+    units: list[_Unit] = []
+    para_start = para_end = -1
+    last_line_end = 0
+
+    def flush() -> None:
+        if para_start >= 0:
+            _split(text, para_start, para_end, chunk_size, section, units)
+
+    for m in _LINE_RE.finditer(text):
+        s, e = m.span()
+        # recorta espacios de la línea sin copiarla
+        while s < e and text[s].isspace():
+            s += 1
+        while e > s and text[e - 1].isspace():
+            e -= 1
+        if s == e:
+            continue
+        blank_before = text.count("\n", last_line_end, m.start()) > 1
+        last_line_end = m.end()
+        title = heading_title(text[s:e]) if e - s <= min(80, chunk_size) else None
+        if title is not None:
+            flush()
+            para_start = -1
+            section = title
+            units.append(_Unit(s, e, section, heading=True))
+            continue
+        if para_start >= 0 and blank_before:
+            flush()
+            para_start = -1
+        if para_start < 0:
+            para_start = s
+        para_end = e
+    flush()
+    return units
+
+
+def _split(
+    text: str, start: int, end: int, chunk_size: int, section: str | None, out: list[_Unit]
+) -> None:
+    if end - start <= chunk_size:
+        out.append(_Unit(start, end, section))
+        return
+    pos = start
+    for m in _SENTENCE_END_RE.finditer(text, start, end):
+        sent_end = m.start() + len(m.group().rstrip())
+        _split_words(text, pos, sent_end, chunk_size, section, out)
+        pos = m.end()
+    if pos < end:
+        _split_words(text, pos, end, chunk_size, section, out)
+
+
+def _split_words(
+    text: str, start: int, end: int, chunk_size: int, section: str | None, out: list[_Unit]
+) -> None:
+    """Frase demasiado larga: corte en el último espacio antes de ``chunk_size``."""
+    while end - start > chunk_size:
+        window_end = start + chunk_size + 1
+        cut = max(text.rfind(" ", start + 1, window_end), text.rfind("\n", start + 1, window_end))
+        if cut <= start:
+            cut = start + chunk_size  # una "palabra" más larga que el chunk
+            out.append(_Unit(start, cut, section))
+            start = cut
+        else:
+            unit_end = cut
+            while text[unit_end - 1].isspace():
+                unit_end -= 1
+            out.append(_Unit(start, unit_end, section))
+            start = cut + 1
+        while start < end and text[start].isspace():
+            start += 1
+    if start < end:
+        out.append(_Unit(start, end, section))
@@ -0,0 +1,149 @@
+from __future__ import annotations
+
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any
+
+from doc_rag.adapters.vectorstore.chunk_store import format_anchor
+
+
+@dataclass
+class ContextSpan:
+    """Tramo contiguo de un documento (misma página) formado por uno o más chunks."""
+
+    doc_id: str
+    source_filename: str
+    page: int | None
+    char_start: int
+    char_end: int
+    text: str
+    rank: int  # posición del mejor resultado que contiene (orden de score)
+    chunk_ids: list[int] = field(default_factory=list)
+
+    @property
+    def anchor(self) -> str:
+        return format_anchor(self.page, self.char_start, self.char_end)
+
+    def block(self) -> str:
+        return f"[{self.source_filename} | {self.anchor}]\n{self.text}"
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    return int(len(text) / chars_per_token) + 1
+
+
+def merge_text(left: ContextSpan, right: ContextSpan) -> str | None:
+    """
+    Texto de ``left`` seguido de ``right`` sin repetir el solape, o ``None`` si no son
+    contiguos. Con el chunker estructurado el texto es el tramo exacto de la página;
+    con ``fixed`` los offsets son sobre el texto normalizado y cada chunk puede haber
+    perdido un espacio en cada borde (``strip``): se reconstruye el texto en bruto de
+    ambos y se aceptan las variantes que coinciden sobre el solape. Si quedan varias
+    con distinto resultado (p. ej. chunks justo adyacentes), no se fusionan.
+    """
+    overlap = left.char_end - right.char_start
+    if overlap < 0:
+        return None
+    if right.char_end <= left.char_end:
+        return left.text  # ``right`` está contenido en ``left``
+
+    offset = right.char_start - left.char_start
+    found: set[str] = set()
+    for lead_l, trail_l in _stripped_edges(left):
+        raw_l = " " * lead_l + left.text + " " * trail_l
+        for lead_r, trail_r in _stripped_edges(right):
+            raw_r = " " * lead_r + right.text + " " * trail_r
+            seam = len(raw_l)
+            merged = raw_l + raw_r[overlap:]
+            if raw_l[offset:] == raw_r[:overlap] and merged[seam - 1 : seam + 1] != "  ":
+                found.add(merged.strip())
+    return found.pop() if len(found) == 1 else None
+
+
+def _stripped_edges(span: ContextSpan) -> list[tuple[int, int]]:
+    """Espacios (inicio, fin) que pudo perder el texto respecto a su rango de offsets."""
+    missing = (span.char_end - span.char_start) - len(span.text)
+    if missing == 1:
+        return [(1, 0), (0, 1)]
+    if missing == 2:
+        return [(1, 1)]
+    return [(0, 0)]
+
+
+def pack_context(
+    results: list[dict[str, Any]],
+    budget_tokens: int,
+    neighbors: Callable[[dict[str, Any]], list[dict[str, Any]]] | None = None,
+    chars_per_token: float = 4.0,
+) -> list[ContextSpan]:
+    """
+    Empaqueta ``results`` (ordenados por score) y, si se indica, sus vecinos en tramos
+    contiguos por documento y página: los chunks solapados o adyacentes se fusionan y
+    el solape solo se cuenta una vez. Se llena ``budget_tokens`` en orden de score; el
+    primer resultado entra siempre. Devuelve los tramos en orden de su mejor resultado.
+    """
+    spans: list[ContextSpan] = []
+    used = 0
+    for rank, r in enumerate(results):
+        group = [r]
+        if neighbors is not None:
+            # primero el propio resultado y después los vecinos, del más cercano al más lejano
+            group += sorted(neighbors(r), key=lambda nb: abs(int(nb["id"]) - int(r["id"])))
+        for i, rec in enumerate(group):
+            candidate = ContextSpan(
+                doc_id=rec["doc_id"],
+                source_filename=rec["source_filename"],
+                page=rec.get("page"),
+                char_start=int(rec["char_start"]),
+                char_end=int(rec["char_end"]),
+                text=rec["text"],
+                rank=rank,
+                chunk_ids=[int(rec["id"])],
+            )
+            merged, replaced = _merge_into(spans, candidate)
+            cost = estimate_tokens(merged.text, chars_per_token) - sum(
+                estimate_tokens(s.text, chars_per_token) for s in replaced
+            )
+            if used + cost > budget_tokens and spans:
+                if i == 0:
+                    break  # si no cabe el resultado, tampoco sus vecinos
+                continue
+            spans = [s for s in spans if all(s is not x for x in replaced)]
+            spans.append(merged)
+            used += cost
+
+    spans.sort(key=lambda s: (s.rank, s.char_start))
+    return spans
+
+
+def _merge_into(
+    spans: list[ContextSpan], span: ContextSpan
+) -> tuple[ContextSpan, list[ContextSpan]]:
+    """Fusiona ``span`` con los tramos contiguos; devuelve el resultado y los que sustituye."""
+    same = [
+        s
+        for s in spans
+        if s.doc_id == span.doc_id
+        and s.page == span.page
+        and s.char_start <= span.char_end
+        and span.char_start <= s.char_end
+    ]
+    merged = span
+    replaced: list[ContextSpan] = []
+    for s in sorted(same, key=lambda s: s.char_start):
+        left, right = (s, merged) if s.char_start <= merged.char_start else (merged, s)
+        text = merge_text(left, right)
+        if text is None:
+            continue
+        merged = ContextSpan(
+            doc_id=span.doc_id,
+            source_filename=span.source_filename,
+            page=span.page,
+            char_start=left.char_start,
+            char_end=max(left.char_end, right.char_end),
+            text=text,
+            rank=min(left.rank, right.rank),
+            chunk_ids=sorted(set(left.chunk_ids) | set(right.chunk_ids)),
+        )
+        replaced.append(s)
+    return merged, replaced
@@ -1,15 +1,56 @@
 from __future__ import annotations
 
 import numpy as np
-from sentence_transformers import SentenceTransformer
+from doc_rag.core.settings import Settings
+from doc_rag.services.backends import InferenceBackend
+from doc_rag.services.embedding_cache import EmbeddingCache, open_embedding_cache
 
 
 class Embedder:
-    def __init__(self, model_name: str):
-        self.model = SentenceTransformer(model_name)
+    def __init__(
+        self,
+        model_name: str,
+        cache: EmbeddingCache | None = None,
+        backend: InferenceBackend | None = None,
+    ):
+        self.model_name = model_name
+        self.backend = backend or InferenceBackend()
+        self.model = self.backend.sentence_transformer(model_name)
         self.dim = self.model.get_sentence_embedding_dimension()
+        self.cache = cache
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> Embedder:
+        backend = InferenceBackend.from_settings(settings)
+        embedder = cls(settings.embedding_model, backend=backend)
+        if settings.embed_cache:
+            # ONNX / int8 dan vectores ligeramente distintos: caché propia por variante
+            cache_name = settings.embedding_model
+            if backend.kind != "torch":
+                cache_name = f"{cache_name}@{backend.tag}"
+            embedder.cache = open_embedding_cache(
+                settings.data_dir / "cache" / "embeddings",
+                cache_name,
+                embedder.dim,
+                settings.embed_cache_max_entries,
+            )
+        return embedder
 
     def encode(self, texts: list[str]) -> np.ndarray:
+        if self.cache is None or not texts:
+            return self._encode(texts)
+
+        # Solo se calculan los textos que no están en caché
+        keys = [self.cache.key(t) for t in texts]
+        vecs, hit = self.cache.get_many(keys)
+        miss = np.flatnonzero(~hit)
+        if miss.size:
+            computed = self._encode([texts[i] for i in miss])
+            vecs[miss] = computed
+            self.cache.put_many([keys[i] for i in miss], computed)
+        return vecs
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
         vecs = self.model.encode(
             texts,
             convert_to_numpy=True,
@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import atexit
+import hashlib
+import re
+import threading
+from pathlib import Path
+
+import numpy as np
+
+from doc_rag.services.locks import file_lock
+
+_KEY_BYTES = 16
+
+
+class EmbeddingCache:
+    """
+    Caché persistente de embeddings para un modelo concreto.
+
+    Los vectores viven en un fichero float32 mapeado en memoria (``vectors.f32``) y cada
+    ranura guarda el hash del texto que contiene (``keys.bin``), así que la caché se
+    reconstruye al abrir sin ficheros de índice adicionales. El tamaño está acotado a
+    ``max_entries``; al llenarse se expulsan las entradas menos usadas recientemente.
+
+    La recencia de cada ranura (``lru.i64``) también está mapeada, con un reloj común en
+    su última posición: todos los procesos que abren la caché (workers, indexador) ven
+    el mismo orden de uso y ninguno expulsa las entradas recientes de otro.
+    """
+
+    def __init__(self, root: Path, dim: int, max_entries: int, flush_every: int = 1024):
+        self.root = root
+        self.dim = dim
+        self.max_entries = max(1, max_entries)
+        self.flush_every = flush_every
+        self._lock = threading.Lock()
+        self._dirty = 0
+        self.hits = 0
+        self.misses = 0
+
+        root.mkdir(parents=True, exist_ok=True)
+        keys_path = root / "keys.bin"
+        vecs_path = root / "vectors.f32"
+        lru_path = root / "lru.i64"
+
+        expected = self.max_entries * _KEY_BYTES
+        fresh = not keys_path.exists() or keys_path.stat().st_size != expected
+        mode = "w+" if fresh else "r+"
+        self._keys = np.memmap(
+            keys_path, dtype=np.uint8, mode=mode, shape=(self.max_entries, _KEY_BYTES)
+        )
+        self._vecs = np.memmap(
+            vecs_path, dtype=np.float32, mode=mode, shape=(self.max_entries, dim)
+        )
+
+        lru_fresh = (
+            fresh or not lru_path.exists() or lru_path.stat().st_size != (self.max_entries + 1) * 8
+        )
+        self._recency = np.memmap(
+            lru_path,
+            dtype=np.int64,
+            mode="w+" if lru_fresh else "r+",
+            shape=(self.max_entries + 1,),
+        )
+        self._last_used = self._recency[:-1]
+        self._clock = self._recency[-1:]
+        (root / "lru.npy").unlink(missing_ok=True)  # formato anterior, por proceso
+
+        used = self._keys.any(axis=1)
+        self._slots: dict[bytes, int] = {
+            self._keys[i].tobytes(): int(i) for i in np.flatnonzero(used)
+        }
+        self._free: list[int] = np.flatnonzero(~used)[::-1].tolist()
+
+        atexit.register(self.flush)
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=_KEY_BYTES).digest()
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def get_many(self, keys: list[bytes]) -> tuple[np.ndarray, np.ndarray]:
+        """Devuelve ``(vectores, aciertos)``; las filas sin acierto quedan a cero."""
+        out = np.zeros((len(keys), self.dim), dtype=np.float32)
+        hit = np.zeros(len(keys), dtype=bool)
+        with self._lock:
+            tick = self._tick()
+            for i, k in enumerate(keys):
+                slot = self._slots.get(k)
+                if slot is None:
+                    continue
+                # sin cerrojo entre procesos: la clave se mira antes y después de copiar el
+                # vector, por si otro proceso reutiliza la ranura mientras tanto (quien
+                # escribe pone la clave a cero antes de tocar el vector)
+                vec = self._vecs[slot].copy() if self._keys[slot].tobytes() == k else None
+                if vec is None or self._keys[slot].tobytes() != k:
+                    del self._slots[k]
+                    continue
+                out[i] = vec
+                hit[i] = True
+                self._last_used[slot] = tick
+            n_hits = int(hit.sum())
+            self.hits += n_hits
+            self.misses += len(keys) - n_hits
+        return out, hit
+
+    def put_many(self, keys: list[bytes], vectors: np.ndarray) -> None:
+        # varios procesos (workers, indexador) escriben en los mismos ficheros mapeados
+        with self._lock, file_lock(self.root / "write.lock"):
+            tick = self._tick()
+            for k, vec in zip(keys, vectors, strict=True):
+                if k in self._slots:
+                    continue
+                slot = self._take_slot()
+                # la ranura se invalida antes de escribir el vector: si el proceso muere a
+                # medias queda vacía, nunca con la clave de un texto y el vector de otro
+                self._keys[slot] = 0
+                self._vecs[slot] = vec
+                self._keys[slot] = np.frombuffer(k, dtype=np.uint8)
+                self._slots[k] = slot
+                self._last_used[slot] = tick
+                self._dirty += 1
+            if self._dirty >= self.flush_every:
+                self._flush_locked()
+
+    def flush(self) -> None:
+        with self._lock:
+            self._flush_locked()
+
+    def _tick(self) -> int:
+        # reloj común: un incremento perdido entre procesos solo empata dos usos
+        tick = int(self._clock[0]) + 1
+        self._clock[0] = tick
+        return tick
+
+    def _take_slot(self) -> int:
+        while True:
+            if not self._free:
+                self._evict(max(1, self.max_entries // 64))
+            slot = self._free.pop()
+            if not self._keys[slot].any():
+                return slot
+            # libre al abrir, pero otro proceso la ha ocupado después: se adopta su entrada
+            self._slots.setdefault(self._keys[slot].tobytes(), slot)
+
+    def _evict(self, n: int) -> None:
+        victims = np.argpartition(self._last_used, n - 1)[:n]
+        for slot in victims.tolist():
+            k = self._keys[slot].tobytes()
+            if self._slots.get(k) == slot:
+                del self._slots[k]
+            self._keys[slot] = 0
+            self._last_used[slot] = 0
+            self._free.append(slot)
+
+    def _flush_locked(self) -> None:
+        if not self._dirty:
+            return
+        self._keys.flush()
+        self._vecs.flush()
+        self._recency.flush()
+        self._dirty = 0
+
+
+_CACHES: dict[Path, EmbeddingCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def open_embedding_cache(
+    cache_dir: Path, model_name: str, dim: int, max_entries: int
+) -> EmbeddingCache:
+    """Devuelve la caché del modelo, compartida por todo el proceso."""
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)
+    root = cache_dir / f"{slug}-{dim}"
+    with _CACHES_LOCK:
+        cache = _CACHES.get(root)
+        if cache is None:
+            cache = EmbeddingCache(root, dim, max_entries)
+            _CACHES[root] = cache
+        return cache
+
+
+def flush_embedding_caches() -> None:
+    """Vuelca todas las cachés abiertas (lo que hace ``atexit`` al salir normalmente)."""
+    with _CACHES_LOCK:
+        caches = list(_CACHES.values())
+    for cache in caches:
+        cache.flush()
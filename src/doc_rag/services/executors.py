@@ -0,0 +1,31 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+T = TypeVar("T")
+
+
+class Executors:
+    """
+    Ejecutores dedicados del backend. Las llamadas a modelos (embedder, FAISS,
+    CrossEncoder) van a ``inference`` y el reindexado a ``indexing`` (un único hilo):
+    ninguna ocupa el event loop ni el threadpool por defecto de FastAPI.
+    """
+
+    def __init__(self, inference_threads: int):
+        self.inference = ThreadPoolExecutor(
+            max_workers=max(1, inference_threads), thread_name_prefix="doc-rag-inference"
+        )
+        self.indexing = ThreadPoolExecutor(max_workers=1, thread_name_prefix="doc-rag-index")
+
+    async def run_inference(self, fn: Callable[..., T], /, *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.inference, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self) -> None:
+        self.inference.shutdown(wait=False, cancel_futures=True)
+        self.indexing.shutdown(wait=False, cancel_futures=True)
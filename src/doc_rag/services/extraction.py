@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import multiprocessing
+import re
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from doc_rag.adapters.loaders.md_loader import load_markdown
+from doc_rag.adapters.loaders.pdf_loader import load_pdf_pages
+from doc_rag.core.settings import Settings
+from doc_rag.services.chunking import (
+    CHUNKERS,
+    Chunk,
+    chunk_structured,
+    chunk_text,
+    split_structured,
+)
+
+# Este módulo no importa modelos (torch/sentence-transformers) para que los procesos
+# de extracción arranquen rápido y ligeros.
+
+
+@dataclass(frozen=True)
+class ChunkRecord:
+    id: int
+    doc_id: str
+    source_filename: str
+    page: int | None
+    char_start: int
+    char_end: int
+    section: str | None
+    text: str
+
+    def anchor(self) -> str:
+        if self.page is None:
+            return f"md:c{self.char_start}-{self.char_end}"
+        return f"p{self.page}:c{self.char_start}-{self.char_end}"
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "doc_id": self.doc_id,
+            "source_filename": self.source_filename,
+            "page": self.page,
+            "char_start": self.char_start,
+            "char_end": self.char_end,
+            "section": self.section,
+            "anchor": self.anchor(),
+            "text": self.text,
+        }
+
+
+def chunk_file(
+    file_path: Path, doc_id: str, settings: Settings, first_id: int = 0
+) -> list[ChunkRecord]:
+    source_filename = file_path.name
+    return [
+        ChunkRecord(
+            id=first_id + i,
+            doc_id=doc_id,
+            source_filename=source_filename,
+            page=page,
+            char_start=ch.char_start,
+            char_end=ch.char_end,
+            section=ch.section,
+            text=ch.text,
+        )
+        for i, (page, ch) in enumerate(_document_chunks(file_path, settings))
+    ]
+
+
+def _document_chunks(file_path: Path, settings: Settings) -> Iterator[tuple[int | None, Chunk]]:
+    """Chunks del documento con su página (``None`` en Markdown), según ``settings.chunker``."""
+    if settings.chunker not in CHUNKERS:
+        raise ValueError(f"Chunker no soportado: {settings.chunker!r} (use {CHUNKERS})")
+    structured = settings.chunker == "structured"
+
+    if file_path.suffix.lower() != ".pdf":
+        text = load_markdown(file_path)
+        if structured:
+            chunks = chunk_structured(text, settings.chunk_size, settings.chunk_overlap)
+        else:
+            chunks = chunk_text(text, settings.chunk_size, settings.chunk_overlap)
+        for ch in chunks:
+            yield None, ch
+        return
+
+    section: str | None = None  # el estructurado arrastra la sección entre páginas
+    for page in load_pdf_pages(file_path):
+        if references_start(page.text):
+            break
+        if structured:
+            chunks, section = split_structured(
+                page.text, settings.chunk_size, settings.chunk_overlap, section
+            )
+        else:
+            page_section = guess_section(page.text)
+            chunks = [
+                replace(ch, section=page_section)
+                for ch in chunk_text(page.text, settings.chunk_size, settings.chunk_overlap)
+            ]
+        for ch in chunks:
+            yield page.page_number, ch
+
+
+def iter_document_chunks(
+    documents: list[tuple[str, Path]],
+    settings: Settings,
+    first_id: int,
+    workers: int = 1,
+) -> Iterator[tuple[tuple[str, Path], list[ChunkRecord]]]:
+    """
+    Extrae y trocea ``documents`` (pares ``(doc_id, path)``) y los devuelve en el mismo
+    orden, con ids de chunk consecutivos desde ``first_id``.
+
+    Con ``workers > 1`` la extracción (pypdf) y el chunking se reparten en un pool de
+    procesos. Los ids se asignan aquí, en orden de entrada, así que el resultado es
+    idéntico al del modo serie. Como mucho hay ``2 * workers`` documentos en vuelo.
+    """
+    next_id = first_id
+    if workers <= 1 or len(documents) <= 1:
+        for doc in documents:
+            records = chunk_file(doc[1], doc[0], settings, next_id)
+            next_id += len(records)
+            yield doc, records
+        return
+
+    # spawn: no hereda hilos ni modelos del proceso servidor
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+        pending: deque[tuple[tuple[str, Path], Future[list[ChunkRecord]]]] = deque()
+        todo = iter(documents)
+        for doc in todo:
+            pending.append((doc, pool.submit(chunk_file, doc[1], doc[0], settings)))
+            if len(pending) >= 2 * workers:
+                break
+
+        while pending:
+            doc, fut = pending.popleft()
+            records = [replace(r, id=r.id + next_id) for r in fut.result()]
+            next_id += len(records)
+            nxt = next(todo, None)
+            if nxt is not None:
+                pending.append((nxt, pool.submit(chunk_file, nxt[1], nxt[0], settings)))
+            yield doc, records
+
+
+_SECTION_PATTERNS: list[tuple[str, re.Pattern]] = [
+    ("abstract", re.compile(r"\babstract\b", re.I)),
+    ("introduction", re.compile(r"\bintroduction\b", re.I)),
+    ("methods", re.compile(r"\b(methods?|methodology|materials?\s+and\s+methods?)\b", re.I)),
+    ("results", re.compile(r"\bresults?\b", re.I)),
+    ("discussion", re.compile(r"\bdiscussion\b", re.I)),
+    ("conclusion", re.compile(r"\bconclusions?\b", re.I)),
+    ("related_work", re.compile(r"\brelated\s+work\b", re.I)),
+]
+
+_REFERENCES_RE = re.compile(r"\b(references|bibliography|works\s+cited)\b", re.I)
+
+
+def guess_section(text: str) -> str | None:
+    return section_label(text[:800])
+
+
+def section_label(text: str) -> str | None:
+    """Nombre canónico (``methods``, ``results``…) de la primera sección que menciona ``text``."""
+    for name, pat in _SECTION_PATTERNS:
+        if pat.search(text):
+            return name
+    return None
+
+
+def references_start(text: str) -> bool:
+    head = text[:1200]
+    return bool(_REFERENCES_RE.search(head))
@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import os
+import re
+import shutil
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass(frozen=True)
+class IndexFiles:
+    """Rutas de los ficheros que componen un índice."""
+
+    root: Path
+
+    @property
+    def index(self) -> Path:
+        return self.root / "global.faiss"
+
+    @property
+    def chunks(self) -> Path:
+        return self.root / "chunks.jsonl"
+
+    @property
+    def chunk_store(self) -> Path:
+        return self.root / "chunks.bin"
+
+    @property
+    def bm25(self) -> Path:
+        return self.root / "bm25.npz"
+
+    @property
+    def manifest(self) -> Path:
+        return self.root / "manifest.json"
+
+    def all(self) -> tuple[Path, ...]:
+        return (self.index, self.chunks, self.chunk_store, self.bm25, self.manifest)
+
+
+# Los ids de chunk del shard ``i`` empiezan en ``i << SHARD_ID_BITS``: son únicos en toda
+# la colección y ``neighbors`` sabe a qué shard ir sin buscar en todos
+SHARD_ID_BITS = 40
+
+
+def shard_of(doc_id: str, n_shards: int) -> int:
+    """Shard de un documento: estable mientras no cambie el número de shards."""
+    return int(doc_id[:8], 16) % n_shards if n_shards > 1 else 0
+
+
+def shard_root(index_dir: Path, shard: int, n_shards: int) -> Path:
+    # con un solo shard, el índice está directamente en ``index_dir`` (como siempre)
+    return index_dir if n_shards <= 1 else index_dir / f"shard-{shard:03d}"
+
+
+def shard_files(index_dir: Path) -> list[IndexFiles]:
+    """Shards de un índice ya construido (uno solo si no está particionado)."""
+    shards = sorted(p for p in index_dir.glob("shard-*") if p.is_dir())
+    return [IndexFiles(p) for p in shards] or [IndexFiles(index_dir)]
+
+
+_GENERATION_RE = re.compile(r"gen-(\d+)")
+
+
+class IndexGenerations:
+    """
+    Generaciones de un índice: cada reindexado construye ``<root>/gen-NNNNNN`` desde cero
+    (sin tocar la publicada) y la publica reescribiendo ``<root>/CURRENT`` con un
+    ``os.replace`` atómico. Un lector ve la generación anterior o la nueva completa,
+    nunca ficheros a medias. Sin ``CURRENT``, el índice anterior a las generaciones
+    (ficheros directamente en ``root``) cuenta como la generación publicada.
+    """
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    @property
+    def pointer(self) -> Path:
+        return self.root / "CURRENT"
+
+    def current(self) -> Path | None:
+        """Raíz de la generación publicada (``None`` si aún no hay índice)."""
+        if self.pointer.exists():
+            return self.root / self.pointer.read_text(encoding="utf-8").strip()
+        if any(f.exists() for f in (IndexFiles(self.root).manifest, self.root / "shard-000")):
+            return self.root
+        return None
+
+    def building(self) -> Path:
+        """
+        Directorio de la próxima generación: el de una construcción interrumpida (se
+        reanuda) o uno nuevo.
+        """
+        gens = self._generations()
+        current = _generation_number(self.current())
+        if gens and gens[-1][0] > current:
+            return gens[-1][1]
+        path = self.root / f"gen-{max([current, *(n for n, _ in gens)]) + 1:06d}"
+        path.mkdir(parents=True)
+        return path
+
+    def publish(self, generation: Path) -> None:
+        tmp = self.pointer.with_suffix(".tmp")
+        tmp.write_text(generation.name, encoding="utf-8")
+        os.replace(tmp, self.pointer)
+
+    def collect(self, keep: Iterable[Path] = ()) -> list[Path]:
+        """
+        Borra las generaciones anteriores a la publicada salvo las de ``keep`` (en uso).
+        Las posteriores (construcciones en curso) no se tocan.
+        """
+        if not self.pointer.exists():
+            return []
+        keep = {Path(p) for p in keep}
+        current = _generation_number(self.current())
+        removed = []
+        for n, path in self._generations():
+            if n < current and path not in keep:
+                shutil.rmtree(path, ignore_errors=True)
+                removed.append(path)
+        if self.root not in keep:
+            # índice anterior a las generaciones
+            for f in IndexFiles(self.root).all():
+                f.unlink(missing_ok=True)
+            for shard in self.root.glob("shard-*"):
+                shutil.rmtree(shard, ignore_errors=True)
+        return removed
+
+    def _generations(self) -> list[tuple[int, Path]]:
+        gens = []
+        for path in self.root.glob("gen-*"):
+            m = _GENERATION_RE.fullmatch(path.name)
+            if m and path.is_dir():
+                gens.append((int(m.group(1)), path))
+        return sorted(gens)
+
+
+def _generation_number(root: Path | None) -> int:
+    m = _GENERATION_RE.fullmatch(root.name) if root is not None else None
+    return int(m.group(1)) if m else 0
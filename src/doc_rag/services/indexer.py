@@ -1,164 +1,360 @@
 from __future__ import annotations
 
-import hashlib
 import json
+import os
+import shutil
 from dataclasses import dataclass
 from pathlib import Path
 
-from doc_rag.adapters.loaders.md_loader import load_markdown
-from doc_rag.adapters.loaders.pdf_loader import load_pdf_pages
-from doc_rag.adapters.vectorstore.faiss_store import FaissStore
+import numpy as np
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+from doc_rag.adapters.vectorstore.faiss_store import FaissStore, IndexSpec
 from doc_rag.core.settings import Settings
-from doc_rag.services.chunking import chunk_text
+from doc_rag.services.bm25 import BM25Index
+from doc_rag.services.catalog import DocumentCatalog
 from doc_rag.services.embedding import Embedder
-import re
+from doc_rag.services.extraction import ChunkRecord, iter_document_chunks
+from doc_rag.services.index_files import (
+    SHARD_ID_BITS,
+    IndexFiles,
+    IndexGenerations,
+    shard_of,
+    shard_root,
+)
+from doc_rag.services.locks import file_lock
+from doc_rag.services.manifest import IndexManifest, ManifestEntry
+from doc_rag.services.registry import REGISTRY
 
 
 @dataclass(frozen=True)
-class ChunkRecord:
-    id: int
-    doc_id: str
-    source_filename: str
-    page: int | None
-    char_start: int
-    char_end: int
-    section: str | None
-    text: str
-
-    def anchor(self) -> str:
-        if self.page is None:
-            return f"md:c{self.char_start}-{self.char_end}"
-        return f"p{self.page}:c{self.char_start}-{self.char_end}"
-
-
-def sha256_file(path: Path) -> str:
-    h = hashlib.sha256()
-    with path.open("rb") as f:
-        for block in iter(lambda: f.read(1024 * 1024), b""):
-            h.update(block)
-    return h.hexdigest()
-
-
-def list_uploads(uploads_dir: Path) -> list[Path]:
-    exts = {".pdf", ".md", ".markdown"}
-    return sorted([p for p in uploads_dir.iterdir() if p.is_file() and p.suffix.lower() in exts])
-
-
-def rebuild_global_index(settings: Settings) -> tuple[int, int]:
-    embedder = Embedder(settings.embedding_model)
-    store = FaissStore(embedder.dim)
-
-    index_path = settings.index_dir / "global.faiss"
-    chunks_path = settings.index_dir / "chunks.jsonl"
-
-    # Reset
-    if index_path.exists():
-        index_path.unlink()
-    if chunks_path.exists():
-        chunks_path.unlink()
-
-    chunk_records: list[ChunkRecord] = []
-    uploads = list_uploads(settings.uploads_dir)
-
-    next_id = 0
-    for file_path in uploads:
-        doc_id = sha256_file(file_path)
-        source_filename = file_path.name
-        ext = file_path.suffix.lower()
-
-        if ext == ".pdf":
-            stop = False
-            for page in load_pdf_pages(file_path):
-                if references_start(page.text):
-                    stop = True
-                if stop:
-                    break
-
-                page_section = guess_section(page.text)
-
-                for ch in chunk_text(page.text, settings.chunk_size, settings.chunk_overlap):
-                    chunk_records.append(
-                        ChunkRecord(
-                            id=next_id,
-                            doc_id=doc_id,
-                            source_filename=source_filename,
-                            page=page.page_number,
-                            char_start=ch.char_start,
-                            char_end=ch.char_end,
-                            section=page_section,
-                            text=ch.text,
-                        )
-                    )
-                    next_id += 1
-        else:
-            text = load_markdown(file_path)
-            for ch in chunk_text(text, settings.chunk_size, settings.chunk_overlap):
-                chunk_records.append(
-                    ChunkRecord(
-                        id=next_id,
-                        doc_id=doc_id,
-                        source_filename=source_filename,
-                        page=None,
-                        char_start=ch.char_start,
-                        char_end=ch.char_end,
-                        section=None,
-                        text=ch.text,
-                    )
-                )
-                next_id += 1
-
-    # Embeddings + FAISS
-    texts = [c.text for c in chunk_records]
-    if texts:
-        vecs = embedder.encode(texts)
-        store.add(vecs)
-        store.save(index_path)
-
-    # JSONL metadata
-    with chunks_path.open("w", encoding="utf-8") as f:
-        for c in chunk_records:
-            f.write(
-                json.dumps(
-                    {
-                        "id": c.id,
-                        "doc_id": c.doc_id,
-                        "source_filename": c.source_filename,
-                        "page": c.page,
-                        "char_start": c.char_start,
-                        "char_end": c.char_end,
-                        "section": c.section,
-                        "anchor": c.anchor(),
-                        "text": c.text,
-                    },
-                    ensure_ascii=False,
-                )
-                + "\n"
-            )
-
-    return len(uploads), len(chunk_records)
-
-
-_SECTION_PATTERNS: list[tuple[str, re.Pattern]] = [
-    ("abstract", re.compile(r"\babstract\b", re.I)),
-    ("introduction", re.compile(r"\bintroduction\b", re.I)),
-    ("methods", re.compile(r"\b(methods?|methodology|materials?\s+and\s+methods?)\b", re.I)),
-    ("results", re.compile(r"\bresults?\b", re.I)),
-    ("discussion", re.compile(r"\bdiscussion\b", re.I)),
-    ("conclusion", re.compile(r"\bconclusions?\b", re.I)),
-    ("related_work", re.compile(r"\brelated\s+work\b", re.I)),
-]
-
-_REFERENCES_RE = re.compile(r"\b(references|bibliography|works\s+cited)\b", re.I)
-
-
-def guess_section(text: str) -> str | None:
-    head = text[:800]
-    for name, pat in _SECTION_PATTERNS:
-        if pat.search(head):
-            return name
-    return None
-
-
-def references_start(text: str) -> bool:
-    head = text[:1200]
-    return bool(_REFERENCES_RE.search(head))
+class ReindexStats:
+    documents: int
+    chunks: int
+    added_documents: int
+    removed_documents: int
+    embedded_chunks: int
+
+
+class _StreamingWriter:
+    """
+    Embebe los chunks por lotes de tamaño fijo según llegan de la extracción: cada lote
+    se añade al índice y a ``chunks.jsonl`` en el acto. Cada ``checkpoint_chunks`` se
+    guardan índice y manifiesto con los documentos ya completos, de modo que una
+    interrupción deja un punto desde el que reanudar.
+    """
+
+    def __init__(
+        self,
+        files: IndexFiles,
+        manifest: IndexManifest,
+        store: FaissStore,
+        embedder: Embedder,
+        batch_size: int,
+        checkpoint_chunks: int,
+    ):
+        self.files = files
+        self.manifest = manifest
+        self.store = store
+        self.embedder = embedder
+        self.batch_size = max(1, batch_size)
+        self.checkpoint_chunks = checkpoint_chunks
+        self.embedded = 0
+        self._since_checkpoint = 0
+        self._buffer: list[ChunkRecord] = []
+        # documentos con chunks aún sin embeber: (doc_id, entrada, último id)
+        self._open_docs: list[tuple[str, ManifestEntry, int]] = []
+        self._next_id = manifest.next_id
+        self._out = files.chunks.open("a", encoding="utf-8")
+
+    def add_document(self, doc_id: str, source_filename: str, records: list[ChunkRecord]) -> None:
+        first_id = self._next_id
+        self._next_id += len(records)
+        entry = ManifestEntry(
+            source_filename=source_filename, first_id=first_id, n_chunks=len(records)
+        )
+        self._open_docs.append((doc_id, entry, first_id + len(records) - 1))
+        self._buffer.extend(records)
+        while len(self._buffer) >= self.batch_size:
+            self._flush(self._buffer[: self.batch_size])
+            del self._buffer[: self.batch_size]
+        self._complete_docs()
+
+    def finish(self) -> None:
+        if self._buffer:
+            self._flush(self._buffer)
+            self._buffer = []
+        self._complete_docs()
+
+    def close(self) -> None:
+        self._out.close()
+
+    def _flush(self, batch: list[ChunkRecord]) -> None:
+        vecs = self.embedder.encode([c.text for c in batch])
+        self.store.add(vecs, np.array([c.id for c in batch], dtype="int64"))
+        for c in batch:
+            self._out.write(json.dumps(c.to_dict(), ensure_ascii=False) + "\n")
+        self.embedded += len(batch)
+        self._since_checkpoint += len(batch)
+
+    def _complete_docs(self) -> None:
+        pending_from = self._buffer[0].id if self._buffer else None
+        while self._open_docs:
+            doc_id, entry, last_id = self._open_docs[0]
+            if pending_from is not None and last_id >= pending_from:
+                break
+            self._open_docs.pop(0)
+            self.manifest.documents[doc_id] = entry
+            self.manifest.next_id = entry.first_id + entry.n_chunks
+
+        # ivf / ivfpq sin entrenar todavía: no hay índice que guardar
+        if (
+            self.checkpoint_chunks > 0
+            and self._since_checkpoint >= self.checkpoint_chunks
+            and self.store.is_trained
+        ):
+            self._out.flush()
+            os.fsync(self._out.fileno())
+            self.store.save(self.files.index)
+            self.manifest.built_index_type = self.store.kind
+            self.manifest.save(self.files.manifest)
+            if self.embedder.cache is not None:
+                self.embedder.cache.flush()
+            self._since_checkpoint = 0
+
+
+def _sync_chunks_file(path: Path, manifest: IndexManifest) -> None:
+    """Deja en ``chunks.jsonl`` solo los chunks del manifiesto, con su nombre de fichero."""
+    tmp = path.with_suffix(".jsonl.tmp")
+    with path.open("r", encoding="utf-8") as src, tmp.open("w", encoding="utf-8") as f:
+        for line in src:
+            rec = json.loads(line)
+            entry = manifest.documents.get(rec["doc_id"])
+            if entry is None or int(rec["id"]) not in entry.chunk_ids():
+                continue
+            if rec["source_filename"] != entry.source_filename:
+                rec["source_filename"] = entry.source_filename
+                line = json.dumps(rec, ensure_ascii=False) + "\n"
+            f.write(line)
+    os.replace(tmp, path)
+
+
+def index_spec(settings: Settings) -> IndexSpec:
+    return IndexSpec(
+        kind=settings.index_type,
+        nlist=settings.ivf_nlist,
+        hnsw_m=settings.hnsw_m,
+        hnsw_ef_construction=settings.hnsw_ef_construction,
+        pq_m=settings.pq_m,
+        pq_nbits=settings.pq_nbits,
+        train_size=settings.ann_train_size,
+    )
+
+
+def _open_existing(
+    files: IndexFiles,
+    settings: Settings,
+    current: dict[str, Path],
+    index_path: Path | None = None,
+) -> tuple[IndexManifest, FaissStore] | None:
+    manifest = IndexManifest.load(files.manifest)
+    if manifest is None or not manifest.matches(settings):
+        return None
+    index_path = index_path or files.index
+    if not index_path.exists() or not files.chunks.exists():
+        return None
+    store = FaissStore.load(index_path, index_spec(settings))
+    if not store.supports_ids:
+        return None
+    # ivf / ivfpq que se quedó en flat: se vuelve a entrenar en cuanto haya corpus
+    store.untrain()
+    store.ensure_direct_map()
+
+    needs_remove = not manifest.complete or any(d not in current for d in manifest.documents)
+    if needs_remove and not store.supports_remove:
+        # p. ej. HNSW: no se pueden quitar vectores, se reconstruye
+        return None
+
+    if not manifest.complete:
+        # Reanudación tras una interrupción: fuera los restos de documentos a medias
+        valid = np.concatenate(
+            [np.array(e.chunk_ids(), dtype="int64") for e in manifest.documents.values()]
+            + [np.empty(0, dtype="int64")]
+        )
+        store.remove_except(valid)
+        _sync_chunks_file(files.chunks, manifest)
+    return manifest, store
+
+
+def rebuild_global_index(settings: Settings, full: bool = False) -> ReindexStats:
+    """
+    Sincroniza el índice de la colección (``settings.collection``) con su directorio de
+    subidas.
+
+    En modo incremental (por defecto) solo se extraen y embeben los documentos nuevos
+    (por doc_id) y se eliminan los vectores de los documentos que ya no están. Si no hay
+    manifiesto compatible, o con ``full=True``, se reconstruye todo. Si una ejecución
+    anterior se interrumpió, se reanuda desde su último checkpoint.
+
+    Con ``index_shards`` > 1 cada documento va a un shard según su doc_id; cada shard es
+    un índice completo (FAISS, chunks, BM25, manifiesto) y se sincroniza por separado.
+
+    El resultado es una generación nueva (``IndexGenerations``) que se publica al final
+    de una vez; la anterior sigue sirviendo consultas mientras tanto y no se modifica.
+    """
+    # un reindexado a la vez por colección, también entre workers de ``doc_rag.serve``
+    with file_lock(settings.index_dir / ".reindex.lock"):
+        return _rebuild_generation(settings, full)
+
+
+def _rebuild_generation(settings: Settings, full: bool) -> ReindexStats:
+    embedder = REGISTRY.embedder(settings)  # el mismo que usa el retriever
+
+    # Un fichero por doc_id (copias idénticas se indexan una sola vez). El catálogo
+    # solo calcula el sha256 de ficheros nuevos o modificados.
+    catalog = DocumentCatalog.from_settings(settings)
+    current: dict[str, Path] = {}
+    for entry in catalog.sync():
+        current.setdefault(entry.doc_id, settings.uploads_dir / entry.source_filename)
+
+    n_shards = max(1, settings.index_shards)
+    generations = IndexGenerations(settings.index_dir)
+    published = generations.current()
+    build = generations.building()
+    _drop_other_layouts(build, n_shards)
+    parts: list[dict[str, Path]] = [{} for _ in range(n_shards)]
+    for doc_id, path in current.items():
+        parts[shard_of(doc_id, n_shards)][doc_id] = path
+
+    stats: list[ReindexStats] = []
+    chunk_counts: dict[str, int] = {}
+    for shard, part in enumerate(parts):
+        files = IndexFiles(shard_root(build, shard, n_shards))
+        files.root.mkdir(parents=True, exist_ok=True)
+        previous = None
+        if published is not None:
+            previous = IndexFiles(shard_root(published, shard, n_shards))
+        shard_stats, manifest = _rebuild_shard(
+            settings, files, previous, part, full, embedder, first_id=shard << SHARD_ID_BITS
+        )
+        stats.append(shard_stats)
+        chunk_counts.update({d: e.n_chunks for d, e in manifest.documents.items()})
+
+    generations.publish(build)
+    # la generación recién sustituida se conserva: puede haber consultas usándola
+    generations.collect(keep=[published] if published is not None else [])
+    catalog.set_chunk_counts(chunk_counts)
+
+    return ReindexStats(
+        documents=sum(st.documents for st in stats),
+        chunks=sum(st.chunks for st in stats),
+        added_documents=sum(st.added_documents for st in stats),
+        removed_documents=sum(st.removed_documents for st in stats),
+        embedded_chunks=sum(st.embedded_chunks for st in stats),
+    )
+
+
+def _drop_other_layouts(index_dir: Path, n_shards: int) -> None:
+    """
+    Al reanudar con otro ``index_shards`` se borran los shards (o el índice sin shards)
+    que sobran.
+    """
+    for path in index_dir.glob("shard-*"):
+        if n_shards <= 1 or int(path.name.removeprefix("shard-")) >= n_shards:
+            shutil.rmtree(path)
+    if n_shards > 1:
+        _unlink_index(IndexFiles(index_dir))
+
+
+def _unlink_index(files: IndexFiles) -> None:
+    for path in files.all():
+        path.unlink(missing_ok=True)
+
+
+def _rebuild_shard(
+    settings: Settings,
+    files: IndexFiles,
+    previous: IndexFiles | None,
+    current: dict[str, Path],
+    full: bool,
+    embedder: Embedder,
+    first_id: int,
+) -> tuple[ReindexStats, IndexManifest]:
+    existing = None
+    if not full and files.manifest.exists() and files.index.exists():
+        # construcción interrumpida de esta misma generación: se reanuda
+        existing = _open_existing(files, settings, current)
+    elif not full and previous is not None and previous.manifest.exists():
+        # incremental sobre la generación publicada sin modificarla: se copian los
+        # ficheros que se amplían y el índice FAISS se lee de ella (se guarda aquí).
+        # También si la construcción interrumpida no llegó a su primer checkpoint.
+        shutil.copyfile(previous.chunks, files.chunks)
+        shutil.copyfile(previous.manifest, files.manifest)
+        existing = _open_existing(files, settings, current, index_path=previous.index)
+    if existing is None:
+        # Reset
+        _unlink_index(files)
+        files.chunks.touch()
+        manifest = IndexManifest.for_settings(settings)
+        manifest.next_id = first_id
+        store = FaissStore(embedder.dim, spec=index_spec(settings))
+    else:
+        manifest, store = existing
+
+    removed = [d for d in manifest.documents if d not in current]
+    renamed = {
+        d: p.name
+        for d, p in current.items()
+        if d in manifest.documents and manifest.documents[d].source_filename != p.name
+    }
+    added = [(d, p) for d, p in current.items() if d not in manifest.documents]
+
+    # Bajas: fuera del índice sin tocar el resto de vectores
+    if removed:
+        ids = np.concatenate([np.array(manifest.documents[d].chunk_ids()) for d in removed])
+        store.remove(ids)
+        for d in removed:
+            del manifest.documents[d]
+    for d, name in renamed.items():
+        manifest.documents[d].source_filename = name
+    if removed or renamed:
+        _sync_chunks_file(files.chunks, manifest)
+
+    # Altas: extracción + chunking + embeddings por lotes, solo de lo nuevo
+    writer = _StreamingWriter(
+        files,
+        manifest,
+        store,
+        embedder,
+        batch_size=settings.embed_batch_size,
+        checkpoint_chunks=settings.index_checkpoint_chunks,
+    )
+    if added:
+        manifest.complete = False
+        manifest.save(files.manifest)
+    try:
+        for (doc_id, file_path), records in iter_document_chunks(
+            added, settings, manifest.next_id, workers=settings.index_workers
+        ):
+            writer.add_document(doc_id, file_path.name, records)
+        writer.finish()
+    finally:
+        writer.close()
+
+    manifest.complete = True
+    store.save(files.index)
+    manifest.built_index_type = store.kind
+    ChunkStore.write_from_jsonl(files.chunk_store, files.chunks)
+    BM25Index.build(ChunkStore(files.chunk_store)).save(files.bm25)
+    manifest.save(files.manifest)
+    if embedder.cache is not None:
+        embedder.cache.flush()
+
+    stats = ReindexStats(
+        documents=len(manifest.documents),
+        chunks=manifest.n_chunks,
+        added_documents=len(added),
+        removed_documents=len(removed),
+        embedded_chunks=writer.embedded,
+    )
+    return stats, manifest
@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import json
+import os
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Callable
+from concurrent.futures import Executor
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, BinaryIO
+
+from doc_rag.core.settings import DEFAULT_COLLECTION, Settings
+from doc_rag.services.indexer import ReindexStats, rebuild_global_index
+from doc_rag.services.locks import hold_lock, is_locked
+
+_JOB_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+
+@dataclass
+class ReindexJob:
+    job_id: str
+    full: bool
+    collection: str = DEFAULT_COLLECTION
+    status: str = "queued"  # queued | running | done | failed
+    created_at: float = 0.0
+    started_at: float | None = None
+    finished_at: float | None = None
+    stats: ReindexStats | None = None
+    error: str | None = None
+    reload_error: str | None = None  # índice publicado, pero no se pudo poner en servicio
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> ReindexJob:
+        stats = data.get("stats")
+        return cls(**{**data, "stats": ReindexStats(**stats) if stats else None})
+
+
+class ReindexJobs:
+    """
+    Reindexados en segundo plano, de uno en uno. Si ya hay uno en curso para la misma
+    colección, ``submit`` devuelve ese mismo trabajo. ``on_done(colección)`` se llama al
+    terminar con éxito (p. ej. para que el retriever recargue solo esa colección).
+
+    Con ``state_dir`` cada trabajo se guarda también como ``<state_dir>/<job_id>.json``,
+    de modo que cualquier worker puede responder por un trabajo lanzado en otro. Mientras
+    está activo, su proceso tiene un ``flock`` sobre ``<job_id>.lock``: al arrancar, los
+    trabajos activos sin cerrojo son de un proceso caído y se marcan como fallidos.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        executor: Executor,
+        on_done: Callable[[str], None],
+        keep: int = 20,
+        state_dir: Path | None = None,
+    ):
+        self.settings = settings
+        self.executor = executor
+        self.on_done = on_done
+        self.keep = keep
+        self.state_dir = state_dir
+        self._jobs: OrderedDict[str, ReindexJob] = OrderedDict()
+        self._held: dict[str, BinaryIO] = {}
+        self._lock = threading.Lock()
+        if state_dir is not None:
+            self._fail_orphans()
+
+    def submit(self, full: bool = False, collection: str = DEFAULT_COLLECTION) -> ReindexJob:
+        self.settings.for_collection(collection)  # valida el nombre antes de encolar
+        with self._lock:
+            for job in self._jobs.values():
+                if job.active and job.collection == collection:
+                    return job
+            job = ReindexJob(
+                job_id=uuid.uuid4().hex, full=full, collection=collection, created_at=time.time()
+            )
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.keep:
+                _, dropped = self._jobs.popitem(last=False)
+                if self.state_dir is not None:
+                    (self.state_dir / f"{dropped.job_id}.json").unlink(missing_ok=True)
+                    (self.state_dir / f"{dropped.job_id}.lock").unlink(missing_ok=True)
+            if self.state_dir is not None:
+                self._held[job.job_id] = hold_lock(self.state_dir / f"{job.job_id}.lock")
+        self._save(job)
+        self.executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> ReindexJob | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None or self.state_dir is None or not _JOB_ID_RE.fullmatch(job_id):
+            return job
+        # lanzado por otro worker
+        return _read_job(self.state_dir / f"{job_id}.json")
+
+    def _run(self, job: ReindexJob) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+        self._save(job)
+        reloading = False
+        try:
+            settings = self.settings.for_collection(job.collection)
+            job.stats = rebuild_global_index(settings, full=job.full)
+            job.status = "done"
+            job.finished_at = time.time()
+            self._save(job)
+            # la generación ya está publicada: un fallo al recargar no anula el trabajo
+            reloading = True
+            self.on_done(job.collection)
+        except Exception as e:
+            if reloading:
+                job.reload_error = f"{type(e).__name__}: {e}"
+            else:
+                job.error = f"{type(e).__name__}: {e}"
+                job.status = "failed"
+        finally:
+            job.finished_at = job.finished_at or time.time()
+            self._save(job)
+            self._release(job)
+
+    def _release(self, job: ReindexJob) -> None:
+        held = self._held.pop(job.job_id, None)
+        if held is not None:
+            held.close()
+            (self.state_dir / f"{job.job_id}.lock").unlink(missing_ok=True)
+
+    def _fail_orphans(self) -> None:
+        for path in self.state_dir.glob("*.json"):
+            job = _read_job(path)
+            if job is None or not job.active or is_locked(path.with_suffix(".lock")):
+                continue
+            # se relee: puede haber terminado justo entre la lectura y la comprobación
+            job = _read_job(path)
+            if job is None or not job.active:
+                continue
+            job.status = "failed"
+            job.error = "Interrumpido: el proceso que lo ejecutaba terminó."
+            job.finished_at = time.time()
+            self._save(job)
+            path.with_suffix(".lock").unlink(missing_ok=True)
+
+    def _save(self, job: ReindexJob) -> None:
+        if self.state_dir is None:
+            return
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        path = self.state_dir / f"{job.job_id}.json"
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(job)), encoding="utf-8")
+        os.replace(tmp, path)
+
+
+def _read_job(path: Path) -> ReindexJob | None:
+    try:
+        return ReindexJob.from_dict(json.loads(path.read_text(encoding="utf-8")))
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
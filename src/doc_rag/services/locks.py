@@ -0,0 +1,47 @@
+from __future__ import annotations
+
+import fcntl
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO
+
+
+@contextmanager
+def file_lock(path: Path) -> Iterator[None]:
+    """
+    Cerrojo exclusivo entre procesos (``flock``) sobre ``path``, que se crea si no existe.
+    Con varios workers sirviendo el mismo ``data_dir`` sustituye a los ``threading.Lock``
+    de cada proceso en las secciones que escriben ficheros compartidos.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with path.open("a+b") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def hold_lock(path: Path) -> BinaryIO:
+    """
+    ``flock`` exclusivo sobre ``path`` que dura hasta cerrar el fichero devuelto (o hasta
+    que termine el proceso, aunque sea por una caída).
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    f = path.open("a+b")
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    return f
+
+
+def is_locked(path: Path) -> bool:
+    """``True`` si alguien (otro proceso u otro fichero abierto) tiene ``flock`` sobre ``path``."""
+    if not path.exists():
+        return False
+    with path.open("a+b") as f:
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return True
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return False
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+
+from doc_rag.core.settings import Settings
+from doc_rag.services.backends import InferenceBackend
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ManifestEntry:
+    source_filename: str
+    first_id: int  # ids de chunk contiguos: [first_id, first_id + n_chunks)
+    n_chunks: int
+
+    def chunk_ids(self) -> range:
+        return range(self.first_id, self.first_id + self.n_chunks)
+
+
+@dataclass
+class IndexManifest:
+    """
+    Registro de los documentos indexados (por doc_id) y de los parámetros con los
+    que se construyó el índice. Permite reindexar de forma incremental.
+    """
+
+    embedding_model: str
+    chunk_size: int
+    chunk_overlap: int
+    chunker: str = "fixed"  # los índices anteriores al chunker estructurado son "fixed"
+    index_type: str = "flat"
+    built_index_type: str = "flat"  # FaissStore.kind: flat si ivf / ivfpq no pudo entrenar
+    embedding_backend: str = "torch"  # InferenceBackend.tag (torch / onnx / onnx-qint8-…)
+    next_id: int = 0
+    complete: bool = True  # False mientras hay una indexación en curso (o interrumpida)
+    documents: dict[str, ManifestEntry] = field(default_factory=dict)
+
+    @classmethod
+    def for_settings(cls, settings: Settings) -> IndexManifest:
+        return cls(
+            embedding_model=settings.embedding_model,
+            chunk_size=settings.chunk_size,
+            chunk_overlap=settings.chunk_overlap,
+            chunker=settings.chunker,
+            index_type=settings.index_type,
+            built_index_type=settings.index_type,
+            embedding_backend=InferenceBackend.from_settings(settings).tag,
+        )
+
+    def matches(self, settings: Settings) -> bool:
+        """El índice solo se puede ampliar si se construyó con los mismos parámetros."""
+        return (
+            self.embedding_model == settings.embedding_model
+            and self.chunk_size == settings.chunk_size
+            and self.chunk_overlap == settings.chunk_overlap
+            and self.chunker == settings.chunker
+            and self.index_type == settings.index_type
+            and self.embedding_backend == InferenceBackend.from_settings(settings).tag
+        )
+
+    @property
+    def n_chunks(self) -> int:
+        return sum(e.n_chunks for e in self.documents.values())
+
+    @classmethod
+    def load(cls, path: Path) -> IndexManifest | None:
+        if not path.exists():
+            return None
+        data = json.loads(path.read_text(encoding="utf-8"))
+        if data.get("version") != MANIFEST_VERSION:
+            return None
+        return cls(
+            embedding_model=data["embedding_model"],
+            chunk_size=int(data["chunk_size"]),
+            chunk_overlap=int(data["chunk_overlap"]),
+            chunker=data.get("chunker", "fixed"),
+            index_type=data.get("index_type", "flat"),
+            built_index_type=data.get("built_index_type", data.get("index_type", "flat")),
+            embedding_backend=data.get("embedding_backend", "torch"),
+            next_id=int(data["next_id"]),
+            complete=bool(data.get("complete", True)),
+            documents={k: ManifestEntry(**v) for k, v in data["documents"].items()},
+        )
+
+    def save(self, path: Path) -> None:
+        data = {
+            "version": MANIFEST_VERSION,
+            "embedding_model": self.embedding_model,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunker": self.chunker,
+            "index_type": self.index_type,
+            "built_index_type": self.built_index_type,
+            "embedding_backend": self.embedding_backend,
+            "next_id": self.next_id,
+            "complete": self.complete,
+            "documents": {k: asdict(v) for k, v in self.documents.items()},
+        }
+        # escritura atómica: nunca queda un manifiesto a medias
+        tmp = path.with_suffix(path.suffix + ".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, path)
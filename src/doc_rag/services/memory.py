@@ -0,0 +1,33 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+# campos de smaps_rollup (en kB) que se informan, por nombre de salida
+_FIELDS = {
+    "rss_bytes": ("Rss",),
+    "pss_bytes": ("Pss",),
+    "shared_bytes": ("Shared_Clean", "Shared_Dirty"),
+    "private_bytes": ("Private_Clean", "Private_Dirty"),
+    "swap_bytes": ("Swap",),
+}
+
+
+def process_memory(pid: int | None = None) -> dict[str, int] | None:
+    """
+    Memoria de un proceso (por defecto el actual) según ``/proc/<pid>/smaps_rollup``.
+    ``private_bytes`` es lo que cuesta cada worker por sí solo; lo mapeado desde el
+    mismo fichero o heredado del fork sin modificar cuenta en ``shared_bytes``, y ``pss``
+    lo reparte entre los procesos que lo comparten. ``None`` fuera de Linux.
+    """
+    path = Path("/proc") / (str(pid) if pid is not None else "self") / "smaps_rollup"
+    try:
+        text = path.read_text(encoding="ascii")
+    except OSError:
+        return None
+    kb: dict[str, int] = {}
+    for line in text.splitlines():
+        name, _, value = line.partition(":")
+        parts = value.split()
+        if len(parts) == 2 and parts[1] == "kB":
+            kb[name] = int(parts[0])
+    return {out: sum(kb.get(f, 0) for f in fields) * 1024 for out, fields in _FIELDS.items()}
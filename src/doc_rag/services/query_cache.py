@@ -0,0 +1,79 @@
+from __future__ import annotations
+
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from collections.abc import Hashable
+from typing import Any, Generic, TypeVar
+
+V = TypeVar("V")
+
+
+def normalize_question(question: str) -> str:
+    """Forma canónica de una pregunta para usarla como clave (NFKC y espacios colapsados)."""
+    return " ".join(unicodedata.normalize("NFKC", question).split())
+
+
+class LRUCache(Generic[V]):
+    """
+    Caché LRU acotada en entradas, con caducidad (``ttl_s``, 0 = sin caducidad) y
+    ligada a una generación del índice: una entrada guardada con otra generación
+    cuenta como fallo y se descarta. ``size`` en ``put`` es el tamaño aproximado en
+    bytes del valor, solo para las estadísticas.
+    """
+
+    def __init__(self, max_entries: int, ttl_s: float = 0.0):
+        self.max_entries = max(0, max_entries)
+        self.ttl_s = ttl_s
+        self._data: OrderedDict[Hashable, tuple[V, int, float, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, generation: int = 0) -> V | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                value, gen, stored_at, _ = entry
+                expired = self.ttl_s > 0 and time.monotonic() - stored_at > self.ttl_s
+                if gen == generation and not expired:
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._pop(key)
+            self.misses += 1
+            return None
+
+    def put(self, key: Hashable, value: V, generation: int = 0, size: int = 0) -> None:
+        if self.max_entries == 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, generation, time.monotonic(), size)
+            self._bytes += size
+            while len(self._data) > self.max_entries:
+                self._pop(next(iter(self._data)))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "max_entries": self.max_entries,
+                "approx_bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _pop(self, key: Hashable) -> None:
+        _, _, _, size = self._data.pop(key)
+        self._bytes -= size
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+import threading
+from typing import TYPE_CHECKING, Any
+
+from doc_rag.core.settings import Settings
+from doc_rag.services.backends import InferenceBackend
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+    from doc_rag.services.embedding import Embedder
+    from doc_rag.services.reranker import Reranker
+
+
+class ModelRegistry:
+    """
+    Instancias compartidas por todo el proceso: un ``Embedder`` y un ``Reranker`` por
+    configuración de modelo (los usan tanto el indexador como el retriever) y un
+    cliente asíncrono de OpenAI con su pool HTTP keep-alive.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._embedders: dict[tuple, Embedder] = {}
+        self._rerankers: dict[tuple, Reranker] = {}
+        self._async_openai: AsyncOpenAI | None = None
+
+    def embedder(self, settings: Settings) -> Embedder:
+        from doc_rag.services.embedding import Embedder
+
+        key = (
+            settings.embedding_model,
+            InferenceBackend.from_settings(settings),
+            settings.embed_cache,
+            settings.embed_cache_max_entries,
+            settings.data_dir,
+        )
+        with self._lock:
+            embedder = self._embedders.get(key)
+            if embedder is None:
+                embedder = self._embedders[key] = Embedder.from_settings(settings)
+            return embedder
+
+    def reranker(self, settings: Settings) -> Reranker:
+        from doc_rag.services.reranker import Reranker
+
+        backend = InferenceBackend.from_settings(settings)
+        key = (settings.rerank_model, settings.rerank_device, backend)
+        with self._lock:
+            reranker = self._rerankers.get(key)
+            if reranker is None:
+                reranker = self._rerankers[key] = Reranker(
+                    model_name=settings.rerank_model,
+                    device=settings.rerank_device,
+                    backend=backend,
+                )
+            return reranker
+
+    def async_openai(self, settings: Settings) -> AsyncOpenAI:
+        from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+        from doc_rag.adapters.llm.openai_client import api_key
+
+        with self._lock:
+            if self._async_openai is None:
+                self._async_openai = AsyncOpenAI(
+                    api_key=api_key(),
+                    timeout=settings.openai_timeout_s,
+                    http_client=DefaultAsyncHttpxClient(limits=_limits(settings)),
+                )
+            return self._async_openai
+
+    def warm(self, settings: Settings) -> None:
+        """Carga los modelos que usarán las consultas (y hace una pasada de prueba)."""
+        self.embedder(settings).encode(["warm-up"])
+        if settings.use_rerank:
+            self.reranker(settings).score_pairs([("warm-up", "warm-up")])
+
+    async def aclose(self) -> None:
+        with self._lock:
+            client, self._async_openai = self._async_openai, None
+        if client is not None:
+            await client.close()
+
+
+def _limits(settings: Settings) -> Any:
+    import httpx
+
+    return httpx.Limits(
+        max_connections=settings.openai_max_connections,
+        max_keepalive_connections=settings.openai_max_connections,
+        keepalive_expiry=settings.openai_keepalive_s,
+    )
+
+
+REGISTRY = ModelRegistry()
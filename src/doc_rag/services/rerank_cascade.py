@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from collections.abc import Callable, MutableMapping
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from doc_rag.services.query_cache import LRUCache, normalize_question
+
+
+@dataclass
+class StageStats:
+    calls: int = 0
+    pairs_in: int = 0
+    pairs_out: int = 0
+    cache_hits: int = 0
+    scored: int = 0  # pares que pasan por el CrossEncoder
+    seconds: float = 0.0
+
+
+class RerankCascade:
+    """
+    Re-rank en cascada sobre los candidatos de la primera fase:
+
+    1. ``prune``: descarta los candidatos cuyo score denso queda más de ``dense_margin``
+       por debajo del mejor (0 = desactivado). Los que solo vienen de BM25 se conservan.
+    2. ``first_pass``: CrossEncoder sobre los primeros ``first_pass_chars`` caracteres de
+       cada pasaje; solo los ``first_pass_keep`` mejores pasan a la fase completa
+       (0 = desactivado).
+    3. ``full``: CrossEncoder sobre el pasaje completo.
+
+    Los scores se cachean por (hash de la pregunta, colección e id de chunk, fase) y
+    generación del índice, así que un par ya visto no vuelve al modelo. Cada fase
+    acumula su coste.
+    """
+
+    def __init__(
+        self,
+        score_pairs: Callable[[list[tuple[str, str]]], list[float]],
+        dense_margin: float = 0.0,
+        first_pass_chars: int = 0,
+        first_pass_keep: int = 0,
+        cache_size: int = 0,
+        cache_ttl_s: float = 0.0,
+    ):
+        self.score_pairs = score_pairs
+        self.dense_margin = dense_margin
+        self.first_pass_chars = first_pass_chars
+        self.first_pass_keep = first_pass_keep
+        self.cache: LRUCache[float] = LRUCache(cache_size, ttl_s=cache_ttl_s)
+        self._stats = {name: StageStats() for name in ("prune", "first_pass", "full")}
+        self._lock = threading.Lock()
+
+    def rerank(
+        self,
+        questions: list[str],
+        per_question: list[list[MutableMapping[str, Any]]],
+        top_k: int,
+        generation: int = 0,
+    ) -> list[list[MutableMapping[str, Any]]]:
+        """Puntúa in situ (``score_rerank`` / ``score``) y devuelve los candidatos que quedan."""
+        qkeys = [_question_key(q) for q in questions]
+
+        t0 = time.perf_counter()
+        n_in = sum(len(c) for c in per_question)
+        if self.dense_margin > 0:
+            per_question = [self._prune(cands, top_k) for cands in per_question]
+        self._record(
+            "prune", n_in, sum(len(c) for c in per_question), 0, 0, time.perf_counter() - t0
+        )
+
+        keep = max(self.first_pass_keep, top_k * 2)
+        if self.first_pass_chars > 0 and any(len(c) > keep for c in per_question):
+            scores = self._score(
+                "first_pass",
+                questions,
+                qkeys,
+                per_question,
+                lambda c: c["text"][: self.first_pass_chars],
+                generation,
+            )
+            kept: list[list[MutableMapping[str, Any]]] = []
+            for cands, sc in zip(per_question, scores, strict=True):
+                order = sorted(range(len(cands)), key=lambda i: sc[i], reverse=True)[:keep]
+                kept.append([cands[i] for i in sorted(order)])
+            n_out = sum(len(c) for c in kept)
+            with self._lock:
+                self._stats["first_pass"].pairs_out += n_out
+            per_question = kept
+
+        scores = self._score(
+            "full", questions, qkeys, per_question, lambda c: c["text"], generation
+        )
+        with self._lock:
+            self._stats["full"].pairs_out += sum(len(c) for c in per_question)
+        for cands, sc in zip(per_question, scores, strict=True):
+            for c, rr in zip(cands, sc, strict=True):
+                c["score_rerank"] = rr
+                c["score"] = rr  # score final
+        return per_question
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            out: dict[str, Any] = {name: asdict(st) for name, st in self._stats.items()}
+        for st in out.values():
+            st["seconds"] = round(st["seconds"], 4)
+        out["score_cache"] = self.cache.stats()
+        return out
+
+    def _prune(
+        self, cands: list[MutableMapping[str, Any]], top_k: int
+    ) -> list[MutableMapping[str, Any]]:
+        dense = [c["score_dense"] for c in cands if c.get("score_dense") is not None]
+        if not dense or len(cands) <= top_k:
+            return cands
+        floor = max(dense) - self.dense_margin
+        keep = [c.get("score_dense") is None or c["score_dense"] >= floor for c in cands]
+        missing = top_k - sum(keep)
+        if missing > 0:
+            # nunca por debajo de top_k: se recuperan los mejores descartados
+            dropped = [i for i, k in enumerate(keep) if not k]
+            dropped.sort(key=lambda i: cands[i]["score_dense"], reverse=True)
+            for i in dropped[:missing]:
+                keep[i] = True
+        return [c for c, k in zip(cands, keep, strict=True) if k]
+
+    def _score(
+        self,
+        stage: str,
+        questions: list[str],
+        qkeys: list[bytes],
+        per_question: list[list[MutableMapping[str, Any]]],
+        passage: Callable[[MutableMapping[str, Any]], str],
+        generation: int,
+    ) -> list[list[float]]:
+        t0 = time.perf_counter()
+        scores: list[list[float | None]] = []
+        pending: list[tuple[int, int]] = []
+        pairs: list[tuple[str, str]] = []
+        for qi, (q, cands) in enumerate(zip(questions, per_question, strict=True)):
+            row: list[float | None] = []
+            for ci, c in enumerate(cands):
+                hit = self.cache.get((qkeys[qi], _chunk_key(c), stage), generation)
+                row.append(hit)
+                if hit is None:
+                    pending.append((qi, ci))
+                    pairs.append((q, passage(c)))
+            scores.append(row)
+
+        # todos los pares sin caché de todas las preguntas en una sola llamada
+        if pairs:
+            for (qi, ci), sc in zip(pending, self.score_pairs(pairs), strict=True):
+                scores[qi][ci] = sc
+                key = (qkeys[qi], _chunk_key(per_question[qi][ci]), stage)
+                self.cache.put(key, sc, generation)
+
+        n_in = sum(len(c) for c in per_question)
+        self._record(stage, n_in, 0, n_in - len(pairs), len(pairs), time.perf_counter() - t0)
+        return scores  # type: ignore[return-value]
+
+    def _record(
+        self, stage: str, pairs_in: int, pairs_out: int, hits: int, scored: int, seconds: float
+    ) -> None:
+        with self._lock:
+            st = self._stats[stage]
+            st.calls += 1
+            st.pairs_in += pairs_in
+            st.pairs_out += pairs_out
+            st.cache_hits += hits
+            st.scored += scored
+            st.seconds += seconds
+
+
+def _question_key(question: str) -> bytes:
+    return hashlib.blake2b(normalize_question(question).encode("utf-8"), digest_size=8).digest()
+
+
+def _chunk_key(c: MutableMapping[str, Any]) -> tuple[str | None, int]:
+    # los ids de chunk solo son únicos dentro de una colección
+    return c.get("collection"), int(c["id"])
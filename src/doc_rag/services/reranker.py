@@ -1,13 +1,20 @@
 from __future__ import annotations
 
-from sentence_transformers import CrossEncoder  # :contentReference[oaicite:2]{index=2}
+from doc_rag.services.backends import InferenceBackend
 
 
 class Reranker:
-    def __init__(self, model_name: str, device: str = "cpu"):
-        self.model = CrossEncoder(model_name, device=device)
+    def __init__(
+        self, model_name: str, device: str = "cpu", backend: InferenceBackend | None = None
+    ):
+        self.model = (backend or InferenceBackend()).cross_encoder(model_name, device=device)
 
     def score(self, query: str, passages: list[str]) -> list[float]:
-        pairs = [[query, p] for p in passages]
-        scores = self.model.predict(pairs)
+        return self.score_pairs([(query, p) for p in passages])
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        """Puntúa pares (consulta, pasaje) de varias consultas en una sola llamada."""
+        if not pairs:
+            return []
+        scores = self.model.predict([[q, p] for q, p in pairs])
         return [float(s) for s in scores]
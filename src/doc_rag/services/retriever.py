@@ -1,45 +1,344 @@
 from __future__ import annotations
 
-import json
+import threading
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
 from typing import Any
 
-import faiss
+import numpy as np
 
-from doc_rag.core.settings import Settings
-from doc_rag.services.embedding import Embedder
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore, ChunkView
+from doc_rag.adapters.vectorstore.faiss_store import FaissStore
+from doc_rag.core.errors import IndexNotFound
+from doc_rag.core.settings import DEFAULT_COLLECTION, Settings
+from doc_rag.services.bm25 import BM25Index
+from doc_rag.services.extraction import section_label
+from doc_rag.services.index_files import (
+    SHARD_ID_BITS,
+    IndexFiles,
+    IndexGenerations,
+    shard_files,
+)
+from doc_rag.services.query_cache import LRUCache, normalize_question
+from doc_rag.services.registry import REGISTRY
+from doc_rag.services.rerank_cascade import RerankCascade
 from doc_rag.services.reranker import Reranker
+from doc_rag.services.scheduler import InferenceScheduler
+
+
+@dataclass(frozen=True)
+class LoadedIndex:
+    """Un shard de una colección."""
+
+    store: FaissStore
+    chunks: ChunkStore
+    bm25: BM25Index | None
+    collection: str = DEFAULT_COLLECTION
+
+    @classmethod
+    def open(cls, files: IndexFiles, collection: str) -> LoadedIndex:
+        # Todo se abre con mmap: carga casi inmediata y páginas compartidas entre workers
+        return cls(
+            store=FaissStore.load(files.index, mmap=True),
+            chunks=ChunkStore(files.chunk_store),
+            bm25=BM25Index.load(files.bm25, mmap=True) if files.bm25.exists() else None,
+            collection=collection,
+        )
+
+
+class LoadedGeneration:
+    """
+    Generación de índice en servicio para una colección: sus shards y cuántas consultas
+    la están usando. Al sustituirla (``retired``) se borra del disco en cuanto queda libre.
+    """
+
+    def __init__(self, index_dir: Path, root: Path, shards: tuple[LoadedIndex, ...]):
+        self.index_dir = index_dir
+        self.root = root
+        self.shards = shards
+        self.users = 0
+        self.retired = False
+        # última vez que se comprobó si hay otra generación publicada, y si la había
+        self.checked_at = time.monotonic()
+        self.stale = False
+
+    @classmethod
+    def open(cls, settings: Settings, collection: str, attempts: int = 3) -> LoadedGeneration:
+        index_dir = settings.for_collection(collection).index_dir
+        generations = IndexGenerations(index_dir)
+        for _ in range(attempts):
+            root = generations.current()
+            files = shard_files(root) if root is not None else []
+            if root is None or not all(f.index.exists() and f.chunk_store.exists() for f in files):
+                break
+            try:
+                return cls(index_dir, root, tuple(LoadedIndex.open(f, collection) for f in files))
+            except (FileNotFoundError, RuntimeError):
+                # otro proceso ha publicado una generación nueva y borrado esta a mitad
+                if generations.current() == root:
+                    raise
+        where = "" if collection == DEFAULT_COLLECTION else f" en la colección {collection!r}"
+        raise IndexNotFound(f"Índice no encontrado{where}. Ejecute /documents/reindex primero.")
 
 
 class Retriever:
     def __init__(self, settings: Settings):
         self.settings = settings
-        self.embedder = Embedder(settings.embedding_model)
-        self.index_path = settings.index_dir / "global.faiss"
-        self.chunks_path = settings.index_dir / "chunks.jsonl"
-        self._reranker: Reranker | None = None
+        self.embedder = REGISTRY.embedder(settings)
+        self.scheduler: InferenceScheduler | None = None
+        if settings.inference_batching:
+            self.scheduler = InferenceScheduler(
+                encode=self.embedder.encode,
+                score_pairs=lambda pairs: self._get_reranker().score_pairs(pairs),
+                max_wait_ms=settings.batch_max_wait_ms,
+                embed_max_batch=settings.embed_max_batch,
+                rerank_max_batch=settings.rerank_max_batch,
+            )
+
+        self.cascade = RerankCascade(
+            self._score_pairs,
+            dense_margin=settings.rerank_dense_margin,
+            first_pass_chars=settings.rerank_first_pass_chars,
+            first_pass_keep=settings.rerank_first_pass_keep,
+            cache_size=settings.rerank_cache_size,
+            cache_ttl_s=settings.query_cache_ttl_s,
+        )
+
+        # Vector por pregunta normalizada (no depende del índice, solo del modelo)
+        self.query_vectors: LRUCache[np.ndarray] | None = None
+        if settings.query_cache:
+            self.query_vectors = LRUCache(
+                settings.query_vector_cache_size, ttl_s=settings.query_cache_ttl_s
+            )
+
+        # Se incrementa con cada recarga o ``reset``: invalida las cachés ligadas al índice
+        self.generation = 0
+        # Generación en servicio por colección. El diccionario no se modifica, se sustituye
+        # con una sola asignación: cada consulta toma (y retiene) la suya al empezar
+        self._loaded: dict[str, LoadedGeneration] = {}
+        # generaciones sustituidas que aún usa alguna consulta
+        self._retired: set[LoadedGeneration] = set()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        # colecciones con una recarga en segundo plano en curso
+        self._reloading: set[str] = set()
+        # máscara de secciones preferidas sobre la tabla de secciones de cada shard
+        self._section_masks: dict[tuple[int, tuple[str, ...]], tuple[ChunkStore, np.ndarray]] = {}
+        # búsqueda en paralelo sobre los shards de una consulta
+        self._fanout = ThreadPoolExecutor(
+            max_workers=max(1, settings.search_threads), thread_name_prefix="doc-rag-search"
+        )
+
+    def load(self, collection: str = DEFAULT_COLLECTION) -> LoadedGeneration:
+        """Carga la generación publicada de la colección y la pone en servicio."""
+        loaded = LoadedGeneration.open(self.settings, collection)
+        self._swap(collection, loaded)
+        return loaded
+
+    def warm(self, collections: Sequence[str] = (DEFAULT_COLLECTION,)) -> None:
+        """Carga las colecciones indicadas que aún no lo estén (las que no tienen índice, no)."""
+        for name in collections:
+            if name in self._loaded:
+                continue
+            try:
+                self.load(name)
+            except IndexNotFound:
+                pass  # aún no hay índice
+
+    def reload(self, collection: str = DEFAULT_COLLECTION) -> None:
+        """
+        Tras un reindexado: carga la generación nueva en el hilo que llama (no en el de
+        una consulta) y la pone en servicio de una vez. Las consultas en curso terminan
+        con la anterior.
+        """
+        try:
+            self.load(collection)
+        except IndexNotFound:
+            self.reset(collection)
+
+    def refresh(self) -> list[str]:
+        """
+        Recarga, en el hilo que llama, las colecciones cuya generación publicada ya no es la
+        cargada (la ha publicado otro proceso). Devuelve sus nombres.
+        """
+        stale = [name for name, loaded in self._loaded.items() if _stale(loaded)]
+        for name in stale:
+            self.reload(name)
+        return stale
+
+    def reset(self, collection: str | None = None) -> None:
+        """Descarta lo cargado (de una colección o de todas); se recarga al consultar."""
+        names = list(self._loaded) if collection is None else [collection]
+        for name in names:
+            self._swap(name, None)
+        if not names:
+            with self._lock:
+                self.generation += 1
+
+    def _swap(self, collection: str, loaded: LoadedGeneration | None) -> None:
+        with self._lock:
+            old = self._loaded.get(collection)
+            current = {k: v for k, v in self._loaded.items() if k != collection}
+            if loaded is not None:
+                current[collection] = loaded
+            self._loaded = current
+            if old is None and loaded is not None:
+                return  # primera carga: nada que invalidar
+            self._section_masks = {}
+            self.generation += 1
+            if old is None:
+                return
+            old.retired = True
+            if old.users:
+                self._retired.add(old)
+                return
+        self._collect(old)
+
+    def _acquire(self, collection: str) -> LoadedGeneration:
+        while True:
+            with self._lock:
+                loaded = self._loaded.get(collection)
+                if loaded is not None:
+                    loaded.users += 1
+                    check = self._check_due(loaded)
+            if loaded is not None:
+                if check:
+                    self._check_published(collection, loaded)
+                return loaded
+            with self._load_lock:
+                if collection not in self._loaded:
+                    self.load(collection)
+
+    def is_current(self, collections: Sequence[str] | None = None) -> bool:
+        """
+        ``False`` si otro proceso ha publicado una generación nueva de alguna de las
+        colecciones cargadas (se mira como mucho cada ``reload_check_s``; la recarga se
+        lanza en segundo plano). Lo cacheado con la generación actual ya no vale.
+        """
+        for name in collections or (DEFAULT_COLLECTION,):
+            loaded = self._loaded.get(name)
+            if loaded is None:
+                continue
+            with self._lock:
+                check = self._check_due(loaded)
+            if check:
+                self._check_published(name, loaded)
+            if loaded.stale:
+                return False
+        return True
+
+    def _check_due(self, loaded: LoadedGeneration) -> bool:
+        interval = self.settings.reload_check_s
+        now = time.monotonic()
+        if interval <= 0 or now - loaded.checked_at < interval:
+            return False
+        loaded.checked_at = now
+        return True
+
+    def _check_published(self, collection: str, loaded: LoadedGeneration) -> None:
+        """
+        Con varios workers, el reindexado corre en uno solo y solo ese recarga al terminar:
+        los demás ven que ``CURRENT`` ha cambiado y recargan en un hilo aparte (la consulta
+        que lo detecta sigue con la generación que tiene).
+        """
+        try:
+            if not _stale(loaded):
+                return
+        except OSError:
+            return  # se vuelve a mirar en la siguiente comprobación
+        loaded.stale = True
+        with self._lock:
+            if collection in self._reloading:
+                return
+            self._reloading.add(collection)
+        threading.Thread(
+            target=self._background_reload, args=(collection,), name="doc-rag-reload", daemon=True
+        ).start()
+
+    def _background_reload(self, collection: str) -> None:
+        try:
+            self.reload(collection)
+        finally:
+            with self._lock:
+                self._reloading.discard(collection)
 
-        self._index: faiss.Index | None = None
-        self._chunks_by_id: dict[int, dict[str, Any]] = {}
+    def _release(self, loaded: LoadedGeneration) -> None:
+        with self._lock:
+            loaded.users -= 1
+            if not (loaded.retired and loaded.users == 0):
+                return
+            self._retired.discard(loaded)
+        self._collect(loaded)
 
-    def load(self) -> None:
-        if not self.index_path.exists() or not self.chunks_path.exists():
-            raise FileNotFoundError("Índice no encontrado. Ejecute /documents/reindex primero.")
+    def _collect(self, old: LoadedGeneration) -> None:
+        """
+        Borra las generaciones sustituidas que ya no usa ninguna consulta. Otros procesos
+        que aún las tengan abiertas siguen leyéndolas: sus ficheros están mapeados.
+        """
+        with self._lock:
+            keep = [g.root for g in (*self._loaded.values(), *self._retired)]
+        IndexGenerations(old.index_dir).collect(keep=keep)
 
-        self._index = faiss.read_index(str(self.index_path))
-        self._chunks_by_id.clear()
+    def close(self) -> None:
+        self._fanout.shutdown(wait=False, cancel_futures=True)
 
-        with self.chunks_path.open("r", encoding="utf-8") as f:
-            for line in f:
-                rec = json.loads(line)
-                self._chunks_by_id[int(rec["id"])] = rec
+    def stats(self) -> dict[str, Any]:
+        out: dict[str, Any] = {"index_generation": self.generation}
+        out["collections"] = {
+            name: {
+                "generation": loaded.root.name,
+                "shards": len(loaded.shards),
+                "chunks": sum(len(s.chunks) for s in loaded.shards),
+                "in_flight": loaded.users,
+            }
+            for name, loaded in self._loaded.items()
+        }
+        out["retired_generations_in_use"] = len(self._retired)
+        if self.query_vectors is not None:
+            out["query_vector_cache"] = self.query_vectors.stats()
+        cache = self.embedder.cache
+        if cache is not None:
+            lookups = cache.hits + cache.misses
+            out["embedding_cache"] = {
+                "entries": len(cache),
+                "max_entries": cache.max_entries,
+                "hits": cache.hits,
+                "misses": cache.misses,
+                "hit_rate": round(cache.hits / lookups, 4) if lookups else 0.0,
+            }
+        out["rerank"] = self.cascade.stats()
+        if self.scheduler is not None:
+            out["inference_batching"] = self.scheduler.stats()
+        return out
 
     def _get_reranker(self) -> Reranker:
-        if self._reranker is None:
-            self._reranker = Reranker(
-                model_name=self.settings.rerank_model,
-                device=self.settings.rerank_device,
-            )
-        return self._reranker
+        return REGISTRY.reranker(self.settings)
+
+    def _encode(self, texts: list[str]) -> np.ndarray:
+        if self.query_vectors is None:
+            return self._encode_uncached(texts)
+        keys = [normalize_question(t) for t in texts]
+        vecs = [self.query_vectors.get(k) for k in keys]
+        miss = [i for i, v in enumerate(vecs) if v is None]
+        if miss:
+            computed = self._encode_uncached([texts[i] for i in miss])
+            for i, vec in zip(miss, computed, strict=True):
+                vecs[i] = vec = vec.copy()  # sin retener el lote completo
+                self.query_vectors.put(keys[i], vec, size=vec.nbytes)
+        return np.stack(vecs)  # type: ignore[arg-type]
+
+    def _encode_uncached(self, texts: list[str]) -> np.ndarray:
+        if self.scheduler is not None:
+            return self.scheduler.encode(texts)
+        return self.embedder.encode(texts)
+
+    def _score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        if self.scheduler is not None:
+            return self.scheduler.score_pairs(pairs)
+        return self._get_reranker().score_pairs(pairs)
 
     def search(
         self,
@@ -49,99 +348,433 @@ class Retriever:
         doc_id: str | None = None,
         source_filename: str | None = None,
         preferred_sections: tuple[str, ...] = (),
+        collections: Sequence[str] | None = None,
     ) -> list[dict[str, Any]]:
-        if self._index is None or not self._chunks_by_id:
-            self.load()
+        return self.search_many(
+            [question],
+            top_k,
+            use_rerank=use_rerank,
+            doc_id=doc_id,
+            source_filename=source_filename,
+            preferred_sections=[preferred_sections],
+            collections=collections,
+        )[0]
 
+    def search_many(
+        self,
+        questions: list[str],
+        top_k: int,
+        use_rerank: bool | None = None,
+        doc_id: str | None = None,
+        source_filename: str | None = None,
+        preferred_sections: list[tuple[str, ...]] | None = None,
+        collections: Sequence[str] | None = None,
+    ) -> list[list[dict[str, Any]]]:
+        """
+        Como ``search`` para varias preguntas a la vez: un único ``encode``, una búsqueda
+        FAISS multi-fila y una sola llamada al CrossEncoder con todos los pares.
+
+        ``collections`` (por defecto, ``default``) elige las colecciones. Cada shard se
+        busca en un hilo de ``search_threads``; sus rankings denso y léxico se unen por
+        score y el RRF se hace una vez sobre los rankings unidos, antes del re-rank.
+        """
+        if not questions:
+            return []
+        generation = self.generation
+        held: list[LoadedGeneration] = []
+        try:
+            for name in dict.fromkeys(collections or [DEFAULT_COLLECTION]):
+                held.append(self._acquire(name))
+            shards = [shard for loaded in held for shard in loaded.shards]
+            return self._search_shards(
+                shards,
+                questions,
+                top_k,
+                use_rerank,
+                doc_id,
+                source_filename,
+                preferred_sections,
+                generation,
+            )
+        finally:
+            for loaded in held:
+                self._release(loaded)
+
+    def _search_shards(
+        self,
+        shards: list[LoadedIndex],
+        questions: list[str],
+        top_k: int,
+        use_rerank: bool | None,
+        doc_id: str | None,
+        source_filename: str | None,
+        preferred_sections: list[tuple[str, ...]] | None,
+        generation: int,
+    ) -> list[list[dict[str, Any]]]:
         use_rerank_final = use_rerank if use_rerank is not None else self.settings.use_rerank
 
-        # 1) Recuperación densa (candidatos)
+        # 1) Recuperación densa (+ BM25) por shard
         candidates_k = max(self.settings.retrieve_candidates, top_k * 8)
-        qvec = self.embedder.encode([question])
-        scores, ids = self._index.search(qvec, candidates_k)  # type: ignore[union-attr]
+        qvecs = self._encode(questions)
 
-        candidates: list[dict[str, Any]] = []
-        for score, idx in zip(scores[0], ids[0], strict=False):
-            if idx < 0:
-                continue
-            rec = self._chunks_by_id.get(int(idx))
-            if not rec:
-                continue
-            candidates.append({**rec, "score_dense": float(score)})
+        def search_shard(si: int) -> list[_Hits]:
+            return self._shard_hits(
+                si, shards[si], questions, qvecs, candidates_k, doc_id, source_filename
+            )
 
-        if doc_id:
-            candidates = [c for c in candidates if c.get("doc_id") == doc_id]
-        if source_filename:
-            candidates = [c for c in candidates if c.get("source_filename") == source_filename]
-        if not candidates:
-            return []
-        if not candidates:
-            return []
+        if len(shards) == 1:
+            per_shard = [search_shard(0)]
+        else:
+            per_shard = list(self._fanout.map(search_shard, range(len(shards))))
+        # mismo tamaño de pool que con un único shard
+        limit = max(self._pool_size(shard, candidates_k, top_k) for shard in shards)
+        pools = [
+            _Hits.merge([p[qi] for p in per_shard], candidates_k).pool(self.settings.rrf_k, limit)
+            for qi in range(len(questions))
+        ]
 
-        # 2) Re-rank (CrossEncoder) y selección final
+        # 2) Re-rank en cascada (CrossEncoder): los pares de todas las preguntas por fase
+        # van al modelo en una llamada. Solo aquí hacen falta vistas (y texto) del pool.
+        views: list[list[ChunkView]] | None = None
         if use_rerank_final:
-            reranker = self._get_reranker()
-            passage_texts = [c["text"] for c in candidates]
-            rr_scores = reranker.score(question, passage_texts)
+            views = [pool.views(shards) for pool in pools]
+            views = self.cascade.rerank(questions, views, top_k, generation)  # type: ignore[arg-type]
+            pools = [_CandidatePool.from_views(v, shards) for v in views]
 
-            for c, rr in zip(candidates, rr_scores, strict=False):
-                c["score_rerank"] = rr
-                c["score"] = rr  # score final
+        # 3) Orden final (score + prioridad de sección), top-k y deduplicación por ancla
+        # sobre arrays; solo los ``top_k`` elegidos se materializan como dicts
+        prefs = preferred_sections or [()] * len(questions)
+        out: list[list[dict[str, Any]]] = []
+        for qi, (pool, sections) in enumerate(zip(pools, prefs, strict=True)):
+            prio = self._section_priority(shards, pool, sections)
+            picked = _select(pool.anchor_keys(shards), pool.score, prio, top_k)
+            if views is not None:
+                out.append([views[qi][i].to_dict() for i in picked])
+            else:
+                out.append([pool.view(shards, i).to_dict() for i in picked])
+        return out
 
-            candidates.sort(key=lambda x: x["score"], reverse=True)
+    def _shard_hits(
+        self,
+        si: int,
+        shard: LoadedIndex,
+        questions: list[str],
+        qvecs: np.ndarray,
+        candidates_k: int,
+        doc_id: str | None,
+        source_filename: str | None,
+    ) -> list[_Hits]:
+        # Con filtros, la búsqueda se restringe a los chunks del documento dentro del
+        # propio índice (no se descartan candidatos después)
+        chunks = shard.chunks
+        subset_rows = None
+        if doc_id or source_filename:
+            subset_rows = chunks.rows_for(doc_id, source_filename)
+            scores, ids = shard.store.search_subset_many(
+                qvecs, candidates_k, chunks.ids[subset_rows]
+            )
         else:
-            for c in candidates:
-                c["score"] = c["score_dense"]
-            candidates.sort(key=lambda x: x["score"], reverse=True)
-
-        # Ordenar por secciones
-        if preferred_sections:
-            pref = set(s.lower() for s in preferred_sections)
-
-            def section_priority(rec: dict[str, Any]) -> int:
-                s = (rec.get("section") or "").lower()
-                return 1 if s in pref else 0
-
-            candidates.sort(key=lambda x: (section_priority(x), x["score"]), reverse=True)
-
-        # Deduplicación mínima por (fichero+ancla)
-        seen = set()
-        final: list[dict[str, Any]] = []
-        for c in candidates:
-            key = (c["source_filename"], c["anchor"])
-            if key in seen:
-                continue
-            seen.add(key)
-            final.append(c)
-            if len(final) >= top_k:
-                break
+            scores, ids = shard.store.search_many(
+                qvecs,
+                candidates_k,
+                nprobe=self.settings.ivf_nprobe,
+                ef_search=self.settings.hnsw_ef_search,
+            )
+        return [
+            self._hits(si, shard, q, scores[i], ids[i], candidates_k, subset_rows)
+            for i, q in enumerate(questions)
+        ]
+
+    def _hits(
+        self,
+        si: int,
+        index: LoadedIndex,
+        question: str,
+        scores: np.ndarray,
+        ids: np.ndarray,
+        candidates_k: int,
+        subset_rows: np.ndarray | None,
+    ) -> _Hits:
+        chunks = index.chunks
+        valid = ids >= 0
+        dense_rows = chunks.rows_of(ids[valid])
+        dense_scores = scores[valid].astype(np.float32)
+        found = dense_rows >= 0
+        base = np.int64(si) << SHARD_ID_BITS
+        hits = _Hits(dense=base | dense_rows[found], dense_scores=dense_scores[found])
 
-        return final
+        # 1b) Híbrido: la vía léxica (BM25) se fusiona con la densa por RRF al unir los
+        # shards. Los términos exactos (siglas, genes, etiquetas) entran por aquí.
+        if not (self.settings.use_hybrid and index.bm25 is not None):
+            return hits
+        lex_scores, lex_rows = index.bm25.search(  # type: ignore[union-attr]
+            question,
+            candidates_k,
+            k1=self.settings.bm25_k1,
+            b=self.settings.bm25_b,
+            rows=subset_rows,
+        )
+        return _Hits(
+            dense=hits.dense,
+            dense_scores=hits.dense_scores,
+            lexical=base | np.asarray(lex_rows, dtype=np.int64),
+            lexical_scores=lex_scores.astype(np.float32),
+        )
 
-    def neighbors(self, chunk_id: int, n: int = 1, same_page: bool = True) -> list[dict[str, Any]]:
+    def _pool_size(self, index: LoadedIndex, candidates_k: int, top_k: int) -> int:
+        if self.settings.use_hybrid and index.bm25 is not None:
+            return max(self.settings.hybrid_candidates, top_k * 2)
+        return candidates_k
+
+    def _section_priority(
+        self,
+        shards: Sequence[LoadedIndex],
+        pool: _CandidatePool,
+        preferred_sections: tuple[str, ...],
+    ) -> np.ndarray | None:
+        """1 si el chunk es de una sección preferida, 0 si no (``None`` sin preferencias)."""
+        if not preferred_sections:
+            return None
+        prio = np.zeros(len(pool.rows), dtype=np.int8)
+        for si in np.unique(pool.shard):
+            chunks = shards[si].chunks
+            sel = pool.shard == si
+            prio[sel] = self._section_mask(chunks, preferred_sections)[
+                chunks.cols["section"][pool.rows[sel]]
+            ]
+        return prio
+
+    def _section_mask(self, chunks: ChunkStore, preferred_sections: tuple[str, ...]) -> np.ndarray:
+        key = (id(chunks), preferred_sections)
+        cached = self._section_masks.get(key)
+        if cached is not None and cached[0] is chunks:
+            return cached[1]
+        # una vez por shard cargado: la sección es un nombre canónico o un título real
+        pref = {s.lower() for s in preferred_sections}
+        labels = [s.lower() in pref or section_label(s.lower()) in pref for s in chunks.sections]
+        mask = np.array([*labels, False], dtype=bool)  # posición -1: sin sección
+        self._section_masks[key] = (chunks, mask)
+        return mask
+
+    def neighbors(
+        self,
+        chunk_id: int,
+        n: int = 1,
+        same_page: bool = True,
+        collection: str = DEFAULT_COLLECTION,
+    ) -> list[dict[str, Any]]:
         """
         Devuelve vecinos (previos y posteriores) del mismo documento.
         Por defecto restringe a la misma página (útil en papers).
         """
-        if self._index is None or not self._chunks_by_id:
-            self.load()
+        loaded = self._acquire(collection)
+        try:
+            shards = loaded.shards
+            chunks = shards[min(int(chunk_id) >> SHARD_ID_BITS, len(shards) - 1)].chunks
+            return _neighbors(chunks, int(chunk_id), n, same_page)
+        finally:
+            self._release(loaded)
 
-        base = self._chunks_by_id.get(int(chunk_id))
-        if not base:
-            return []
 
-        base_doc = base.get("doc_id")
-        base_page = base.get("page")
+def _stale(loaded: LoadedGeneration) -> bool:
+    return IndexGenerations(loaded.index_dir).current() != loaded.root
 
-        out: list[dict[str, Any]] = []
-        deltas = list(range(-n, 0)) + list(range(1, n + 1))  # prev..., next...
-        for d in deltas:
-            rec = self._chunks_by_id.get(int(chunk_id) + d)
-            if not rec:
-                continue
-            if rec.get("doc_id") != base_doc:
-                continue
-            if same_page and rec.get("page") != base_page:
-                continue
-            out.append(rec)
+
+def _neighbors(chunks: ChunkStore, chunk_id: int, n: int, same_page: bool) -> list[dict[str, Any]]:
+    base = chunks.get(chunk_id)
+    if not base:
+        return []
+
+    base_doc = base.get("doc_id")
+    base_page = base.get("page")
+
+    out: list[dict[str, Any]] = []
+    deltas = list(range(-n, 0)) + list(range(1, n + 1))  # prev..., next...
+    for d in deltas:
+        rec = chunks.get(chunk_id + d)
+        if not rec:
+            continue
+        if rec.get("doc_id") != base_doc:
+            continue
+        if same_page and rec.get("page") != base_page:
+            continue
+        out.append(rec)
+    return out
+
+
+@dataclass(frozen=True)
+class _Hits:
+    """
+    Rankings de primera fase de una pregunta, de mayor a menor score. Cada candidato es
+    ``(shard << SHARD_ID_BITS) | fila``, con ``shard`` su posición en los shards de la
+    consulta. ``lexical`` es ``None`` sin híbrido.
+    """
+
+    dense: np.ndarray
+    dense_scores: np.ndarray
+    lexical: np.ndarray | None = None
+    lexical_scores: np.ndarray | None = None
+
+    @classmethod
+    def merge(cls, hits: list[_Hits], k: int) -> _Hits:
+        """
+        Une los rankings de varios shards, cada vía por su score y con sus ``k`` mejores.
+        El coseno es comparable entre shards; BM25 usa las estadísticas de cada shard,
+        que para shards de un mismo corpus son parecidas.
+        """
+        if len(hits) == 1:
+            return hits[0]
+        dense, dense_scores = _top([h.dense for h in hits], [h.dense_scores for h in hits], k)
+        lexical = [h for h in hits if h.lexical is not None]
+        if not lexical:
+            return cls(dense=dense, dense_scores=dense_scores)
+        lex, lex_scores = _top(
+            [h.lexical for h in lexical],  # type: ignore[misc]
+            [h.lexical_scores for h in lexical],  # type: ignore[misc]
+            k,
+        )
+        return cls(dense=dense, dense_scores=dense_scores, lexical=lex, lexical_scores=lex_scores)
+
+    def pool(self, rrf_k: int, limit: int) -> _CandidatePool:
+        """
+        Candidatos para el re-rank: el ranking denso o, con híbrido, la fusión RRF de
+        ambas vías, que con pools menores ya cubre los términos exactos.
+        """
+        if self.lexical is None:
+            keys, score = self.dense, self.dense_scores
+            dense, lexical = self.dense_scores, None
+        else:
+            keys, score = _reciprocal_rank_fusion([self.dense, self.lexical], rrf_k)
+            keys, score = keys[:limit], score[:limit]
+            dense = _lookup(keys, self.dense, self.dense_scores)
+            lexical = _lookup(keys, self.lexical, self.lexical_scores)  # type: ignore[arg-type]
+        return _CandidatePool(
+            rows=keys & ((1 << SHARD_ID_BITS) - 1),
+            shard=(keys >> SHARD_ID_BITS).astype(np.int32),
+            score=score,
+            dense=dense,
+            lexical=lexical,
+        )
+
+
+def _top(keys: list[np.ndarray], scores: list[np.ndarray], k: int) -> tuple[np.ndarray, np.ndarray]:
+    """Los ``k`` de mayor score entre varios rankings (empates en orden de shard)."""
+    all_keys, all_scores = np.concatenate(keys), np.concatenate(scores)
+    order = np.argsort(-all_scores, kind="stable")[:k]
+    return all_keys[order], all_scores[order]
+
+
+@dataclass(frozen=True)
+class _CandidatePool:
+    """
+    Candidatos de una pregunta como arrays alineados: shard (posición en la lista de
+    shards de la consulta), fila en su ChunkStore y scores.
+    """
+
+    rows: np.ndarray
+    shard: np.ndarray
+    score: np.ndarray  # score de la primera fase (o final tras el re-rank)
+    dense: np.ndarray | None  # NaN = no vino de la vía densa
+    lexical: np.ndarray | None  # None = sin híbrido
+
+    def view(self, shards: Sequence[LoadedIndex], i: int) -> ChunkView:
+        shard = shards[int(self.shard[i])]
+        v = shard.chunks.view(int(self.rows[i]))
+        v["collection"] = shard.collection
+        v["score_dense"] = _opt_float(self.dense, i)
+        if self.lexical is not None:
+            v["score_lexical"] = _opt_float(self.lexical, i)
+        v["score"] = float(self.score[i])
+        return v
+
+    def views(self, shards: Sequence[LoadedIndex]) -> list[ChunkView]:
+        return [self.view(shards, i) for i in range(len(self.rows))]
+
+    def anchor_keys(self, shards: Sequence[LoadedIndex]) -> np.ndarray:
+        """(shard, fichero, página, inicio, fin) de cada candidato."""
+        keys = np.empty((len(self.rows), 5), dtype=np.int64)
+        keys[:, 0] = self.shard
+        for si in np.unique(self.shard):
+            sel = self.shard == si
+            keys[sel, 1:] = shards[si].chunks.anchor_keys(self.rows[sel])
+        return keys
+
+    @classmethod
+    def from_views(cls, views: list[ChunkView], shards: Sequence[LoadedIndex]) -> _CandidatePool:
+        position = {id(s.chunks): si for si, s in enumerate(shards)}
+        n = len(views)
+        return cls(
+            rows=np.fromiter((v.row for v in views), dtype=np.int64, count=n),
+            shard=np.fromiter((position[id(v.store)] for v in views), dtype=np.int32, count=n),
+            score=np.fromiter((v["score"] for v in views), dtype=np.float64, count=n),
+            dense=None,
+            lexical=None,
+        )
+
+
+def _opt_float(values: np.ndarray | None, i: int) -> float | None:
+    if values is None or np.isnan(values[i]):
+        return None
+    return float(values[i])
+
+
+def _lookup(rows: np.ndarray, keys: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """``values`` de cada fila de ``rows`` según ``keys`` (NaN si no está)."""
+    out = np.full(len(rows), np.nan, dtype=np.float32)
+    if len(keys) == 0:
         return out
+    order = np.argsort(keys, kind="stable")
+    pos = np.searchsorted(keys, rows, sorter=order).clip(max=len(keys) - 1)
+    hit = keys[order[pos]] == rows
+    out[hit] = values[order[pos[hit]]]
+    return out
+
+
+def _select(
+    anchors: np.ndarray,
+    score: np.ndarray,
+    priority: np.ndarray | None,
+    top_k: int,
+) -> np.ndarray:
+    """
+    Posiciones de los ``top_k`` mejores candidatos: por score, con las secciones
+    preferidas (``priority`` = 1) siempre delante, y sin repetir ancla (una fila de
+    ``anchors`` por candidato).
+    """
+    n = len(score)
+    if n == 0 or top_k <= 0:
+        return np.empty(0, dtype=np.int64)
+    key = np.asarray(score, dtype=np.float64)
+    if priority is not None and priority.any():
+        # fusión: la prioridad pesa más que cualquier diferencia de score
+        span = float(key.max() - key.min()) + 1.0
+        key = key + priority * span
+
+    # top-k con argpartition; se amplía si la deduplicación deja menos de ``top_k``
+    want = top_k
+    while True:
+        m = min(n, want * 2)
+        part = np.argpartition(-key, m - 1)[:m] if m < n else np.arange(n)
+        part = np.sort(part)  # empates en orden de candidato
+        order = part[np.argsort(-key[part], kind="stable")]
+        _, first = np.unique(anchors[order], axis=0, return_index=True)
+        picked = order[np.sort(first)][:top_k]
+        if len(picked) >= top_k or m == n:
+            return picked
+        want *= 4
+
+
+def _reciprocal_rank_fusion(rankings: list[np.ndarray], k: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    RRF: score(d) = sum(1 / (k + rango_i(d))). Devuelve ``(ids, scores)`` de mayor a menor;
+    los empates quedan en orden de primera aparición.
+    """
+    ranked = [np.asarray(r, dtype=np.int64) for r in rankings]
+    all_ids = np.concatenate(ranked)
+    if len(all_ids) == 0:
+        return all_ids, np.empty(0, dtype=np.float64)
+    contrib = np.concatenate([1.0 / (k + np.arange(1, len(r) + 1)) for r in ranked])
+    uniq, first, inverse = np.unique(all_ids, return_index=True, return_inverse=True)
+    fused = np.bincount(inverse, weights=contrib, minlength=len(uniq))
+    order = np.lexsort((first, -fused))
+    return uniq[order], fused[order]
@@ -0,0 +1,144 @@
+from __future__ import annotations
+
+import queue
+import threading
+import time
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from typing import Any, Generic, TypeVar
+
+import numpy as np
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class MicroBatcher(Generic[T, R]):
+    """
+    Agrupa peticiones concurrentes en micro-lotes para una función por lotes ``fn``.
+
+    Un hilo propio toma la primera petición de la cola y espera como mucho
+    ``max_wait_ms`` a que lleguen más, hasta sumar ``max_batch`` elementos; llama a
+    ``fn`` una sola vez y reparte los resultados (por posición) entre los llamantes.
+    Una petición nunca se parte: si por sí sola supera ``max_batch`` va en su propio lote.
+    Si ``fn`` falla con un lote de varias peticiones, se reintenta cada una por separado
+    y la excepción solo llega a las que fallan solas.
+    """
+
+    def __init__(
+        self,
+        fn: Callable[[list[T]], Sequence[R]],
+        max_batch: int,
+        max_wait_ms: float,
+        name: str = "batcher",
+    ):
+        self.fn = fn
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.name = name
+        self._queue: queue.Queue[tuple[list[T], Future]] = queue.Queue()
+        self._carry: tuple[list[T], Future] | None = None
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+        self.batches = 0
+        self.items = 0
+        self.requests = 0
+
+    def submit(self, items: list[T]) -> Sequence[R]:
+        """Bloquea hasta que el lote que incluye ``items`` se ha procesado."""
+        if not items:
+            return self.fn([])
+        self._ensure_started()
+        fut: Future = Future()
+        self._queue.put((items, fut))
+        return fut.result()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_items": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "mean_batch_requests": round(self.requests / self.batches, 2) if self.batches else 0.0,
+        }
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+                self._thread.start()
+
+    def _loop(self) -> None:
+        while True:
+            batch = [self._carry if self._carry is not None else self._queue.get()]
+            self._carry = None
+            n = len(batch[0][0])
+            deadline = time.monotonic() + self.max_wait
+            while n < self.max_batch:
+                remaining = deadline - time.monotonic()
+                try:
+                    req = self._queue.get(timeout=remaining) if remaining > 0 else None
+                except queue.Empty:
+                    req = None
+                if req is None:
+                    break
+                if n + len(req[0]) > self.max_batch:
+                    self._carry = req  # abre el siguiente lote
+                    break
+                batch.append(req)
+                n += len(req[0])
+            self._run(batch)
+
+    def _run(self, batch: list[tuple[list[T], Future]]) -> None:
+        flat = [item for items, _ in batch for item in items]
+        try:
+            results = self.fn(flat)
+        except Exception as e:
+            if len(batch) == 1:
+                batch[0][1].set_exception(e)
+                return
+            # una petición defectuosa no hace fallar al resto: se repite cada una por separado
+            for req in batch:
+                self._run([req])
+            return
+        self.batches += 1
+        self.items += len(flat)
+        self.requests += len(batch)
+        start = 0
+        for items, fut in batch:
+            fut.set_result(results[start : start + len(items)])
+            start += len(items)
+
+
+class InferenceScheduler:
+    """
+    Punto único de inferencia para las consultas: las llamadas concurrentes a
+    ``encode`` y ``score_pairs`` se agrupan en micro-lotes, de modo que el modelo hace
+    pocos forward grandes en lugar de muchos pequeños compitiendo por los núcleos.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[list[str]], np.ndarray],
+        score_pairs: Callable[[list[tuple[str, str]]], list[float]],
+        max_wait_ms: float,
+        embed_max_batch: int,
+        rerank_max_batch: int,
+    ):
+        self._encode: MicroBatcher[str, Any] = MicroBatcher(
+            encode, embed_max_batch, max_wait_ms, name="doc-rag-encode"
+        )
+        self._rerank: MicroBatcher[tuple[str, str], float] = MicroBatcher(
+            score_pairs, rerank_max_batch, max_wait_ms, name="doc-rag-rerank"
+        )
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        return np.asarray(self._encode.submit(texts), dtype=np.float32)
+
+    def score_pairs(self, pairs: list[tuple[str, str]]) -> list[float]:
+        return list(self._rerank.submit(pairs))
+
+    def stats(self) -> dict[str, Any]:
+        return {"encode": self._encode.stats(), "rerank": self._rerank.stats()}
@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from doc_rag.services.catalog import UPLOAD_SUFFIXES, DocumentCatalog
+from doc_rag.services.locks import file_lock
+
+ALLOWED_SUFFIXES = UPLOAD_SUFFIXES
+COPY_BLOCK = 1024 * 1024
+
+# comprobación de duplicado + renombrado atómicos entre subidas concurrentes (entre
+# workers con ``file_lock`` sobre el directorio de subidas)
+_STORE_LOCK = threading.Lock()
+
+
+class UploadTooLarge(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    doc_id: str
+    stored_filename: str
+    original_filename: str
+    size_bytes: int
+    duplicate: bool  # ya existía un documento con el mismo contenido
+
+
+def safe_filename(filename: str | None, doc_id: str, suffix: str) -> str:
+    return (Path(filename).name if filename else f"{doc_id}{suffix}").replace(" ", "_")
+
+
+def store_upload(
+    src: BinaryIO, filename: str | None, catalog: DocumentCatalog, max_bytes: int
+) -> StoredUpload:
+    """
+    Copia ``src`` por bloques a un temporal del directorio de subidas calculando el
+    sha256 y el tamaño sobre la marcha (memoria constante). Si supera ``max_bytes`` se
+    aborta (``UploadTooLarge``); si el contenido ya está en el catálogo se descarta el
+    temporal; si no, se renombra de forma atómica a ``<doc_id[:12]>_<nombre>`` y se
+    registra en el catálogo.
+    """
+    suffix = Path(filename or "").suffix.lower()
+    uploads_dir = catalog.uploads_dir
+    uploads_dir.mkdir(parents=True, exist_ok=True)
+    h = hashlib.sha256()
+    size = 0
+    fd, tmp_name = tempfile.mkstemp(prefix=".upload-", suffix=".part", dir=uploads_dir)
+    tmp = Path(tmp_name)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            while block := src.read(COPY_BLOCK):
+                size += len(block)
+                if size > max_bytes:
+                    raise UploadTooLarge(f"Máximo {max_bytes // (1024 * 1024)} MB.")
+                h.update(block)
+                out.write(block)
+
+        doc_id = h.hexdigest()
+        safe_name = safe_filename(filename, doc_id, suffix)
+        with _STORE_LOCK, file_lock(uploads_dir / ".uploads.lock"):
+            existing = catalog.find(doc_id)
+            if existing is not None:
+                return StoredUpload(
+                    doc_id, existing.source_filename, safe_name, size, duplicate=True
+                )
+            stored_filename = f"{doc_id[:12]}_{safe_name}"
+            os.replace(tmp, uploads_dir / stored_filename)
+            catalog.record(uploads_dir / stored_filename, doc_id)
+        return StoredUpload(doc_id, stored_filename, safe_name, size, duplicate=False)
+    finally:
+        tmp.unlink(missing_ok=True)
@@ -1,8 +1,25 @@
+import json
+import time
+
 import streamlit as st
 import requests
 
 API = "http://localhost:8000"
 
+
+def iter_sse(resp: requests.Response):
+    """Eventos ``(nombre, datos JSON)`` de una respuesta text/event-stream."""
+    event, data = "message", []
+    for line in resp.iter_lines(decode_unicode=True):
+        if line.startswith("event:"):
+            event = line[6:].strip()
+        elif line.startswith("data:"):
+            data.append(line[5:].strip())
+        elif not line and data:
+            yield event, json.loads("\n".join(data))
+            event, data = "message", []
+
+
 st.set_page_config(page_title="Doc RAG Assistant", layout="wide")
 st.title("Doc RAG Assistant")
 
@@ -15,8 +32,13 @@ with st.sidebar:
         st.write(r.json())
 
     if st.button("2) Reindexar todo (global)"):
-        r = requests.post(f"{API}/documents/reindex", timeout=600)
-        st.write(r.json())
+        # el reindexado corre en segundo plano: se consulta su estado hasta que termina
+        job = requests.post(f"{API}/documents/reindex", timeout=30).json()
+        with st.spinner("Reindexando…"):
+            while job.get("status") in ("queued", "running"):
+                time.sleep(1.0)
+                job = requests.get(f"{API}/documents/reindex/{job['job_id']}", timeout=30).json()
+        st.write(job)
 
     st.divider()
     use_openai = st.checkbox("Usar OpenAI (si hay API key)", value=False)
@@ -54,17 +76,28 @@ if st.button("Consultar") and question.strip():
         payload["doc_id"] = selected_doc["doc_id"]
         payload["source_filename"] = selected_doc["source_filename"]
 
-    r = requests.post(f"{API}/query", json=payload, timeout=120)
+    # Streaming (SSE): las citas llegan tras la búsqueda y la respuesta token a token
+    r = requests.post(f"{API}/query/stream", json=payload, stream=True, timeout=120)
 
     if r.status_code != 200:
         st.error(r.text)
     else:
-        data = r.json()
         st.subheader("Respuesta")
-        st.write(data["answer"])
-
-        st.subheader("Citas")
-        for c in data["citations"]:
-            title = f"{c['source_filename']} | {c['anchor']} | score={c['score']:.3f}"
-            with st.expander(title):
-                st.write(c["snippet"])
+        answer_box = st.empty()
+        citations_box = st.container()
+        answer = ""
+        for event, data in iter_sse(r):
+            if event == "citations":
+                with citations_box:
+                    st.subheader("Citas")
+                    for c in data:
+                        title = f"{c['source_filename']} | {c['anchor']} | score={c['score']:.3f}"
+                        with st.expander(title):
+                            st.write(c["snippet"])
+            elif event == "token":
+                answer += data["text"]
+                answer_box.markdown(answer + "▌")
+            elif event == "error":
+                st.warning(f"La respuesta se ha interrumpido: {data['detail']}")
+            elif event == "done":
+                answer_box.markdown(data["answer"])
@@ -0,0 +1,94 @@
+"""Selección de backend con un sentence_transformers de prueba (sin modelos reales)."""
+
+import sys
+import types
+from pathlib import Path
+
+import pytest
+
+from doc_rag.core.settings import Settings
+from doc_rag.services import backends
+from doc_rag.services.backends import InferenceBackend
+
+
+class _Model:
+    def __init__(self, name: str, **kwargs):
+        self.name = name
+        self.kwargs = kwargs
+
+    def save_pretrained(self, path: str) -> None:
+        (Path(path) / "onnx").mkdir(parents=True, exist_ok=True)
+        (Path(path) / "onnx" / "model.onnx").write_bytes(b"onnx")
+
+
+def _quantize(model: _Model, config: str, path: str) -> None:
+    (Path(path) / "onnx" / f"model_qint8_{config}.onnx").write_bytes(b"int8")
+
+
+class _SessionOptions:
+    intra_op_num_threads = 0
+
+
+@pytest.fixture
+def stub_modules(monkeypatch):
+    st = types.ModuleType("sentence_transformers")
+    st.SentenceTransformer = type("SentenceTransformer", (_Model,), {})
+    st.CrossEncoder = type("CrossEncoder", (_Model,), {})
+    st.export_dynamic_quantized_onnx_model = _quantize
+    ort = types.ModuleType("onnxruntime")
+    ort.SessionOptions = _SessionOptions
+    monkeypatch.setitem(sys.modules, "sentence_transformers", st)
+    monkeypatch.setitem(sys.modules, "onnxruntime", ort)
+
+
+def _settings(tmp_path, backend: str) -> Settings:
+    return Settings(inference_backend=backend, onnx_threads=3, data_dir=tmp_path)
+
+
+def test_torch_is_default(stub_modules):
+    backend = InferenceBackend()
+    model = backend.sentence_transformer("m")
+    assert (backend.tag, model.name, model.kwargs) == ("torch", "m", {})
+    assert backend.cross_encoder("r", device="cpu").kwargs == {"device": "cpu"}
+
+
+def test_onnx_exports_once_and_uses_quantized_file(tmp_path, monkeypatch, stub_modules):
+    monkeypatch.setattr(backends, "onnx_available", lambda: True)
+    backend = InferenceBackend.from_settings(_settings(tmp_path, "onnx"))
+    assert backend.kind == "onnx"
+    assert backend.tag == "onnx-qint8-avx2"
+
+    model = backend.sentence_transformer("org/model")
+    export_dir = tmp_path / "models" / "onnx" / "org_model"
+    assert model.name == str(export_dir)
+    assert model.kwargs["backend"] == "onnx"
+    assert model.kwargs["model_kwargs"]["file_name"] == "onnx/model_qint8_avx2.onnx"
+    assert model.kwargs["model_kwargs"]["session_options"].intra_op_num_threads == 3
+    assert (export_dir / "onnx" / "model_qint8_avx2.onnx").exists()
+
+    # ya exportado: no se vuelve a exportar desde PyTorch
+    (export_dir / "onnx" / "model.onnx").write_bytes(b"kept")
+    backend.cross_encoder("org/model")
+    assert (export_dir / "onnx" / "model.onnx").read_bytes() == b"kept"
+
+
+def test_onnx_falls_back_to_torch_without_extra(tmp_path, monkeypatch):
+    monkeypatch.setattr(backends, "onnx_available", lambda: False)
+    backend = InferenceBackend.from_settings(_settings(tmp_path, "onnx"))
+    assert (backend.kind, backend.tag) == ("torch", "torch")
+
+
+def test_onnx_available_checks_modules(monkeypatch):
+    backends.onnx_available.cache_clear()
+    monkeypatch.setattr(backends.importlib.util, "find_spec", lambda name: None)
+    try:
+        assert backends.onnx_available() is False
+    finally:
+        backends.onnx_available.cache_clear()
+
+
+def test_unknown_backend_rejected():
+    with pytest.raises(ValueError):
+        InferenceBackend(kind="tensorrt")
+    with pytest.raises(ValueError):
+        InferenceBackend(kind="onnx", quantization_config="sse4")
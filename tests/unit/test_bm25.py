@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+from doc_rag.services.bm25 import BM25Index, tokenize
+
+TEXTS = ["BRCA1 cáncer", "BRCA1 brca1 riesgo mama", "IL-6 plasma"]
+
+
+@pytest.fixture
+def chunks(tmp_path):
+    records = [
+        {
+            "id": i,
+            "doc_id": f"d{i}",
+            "source_filename": f"{i}.md",
+            "page": None,
+            "char_start": 0,
+            "char_end": len(t),
+            "text": t,
+        }
+        for i, t in enumerate(TEXTS)
+    ]
+    ChunkStore.write(tmp_path / "chunks.bin", records)
+    return ChunkStore(tmp_path / "chunks.bin")
+
+
+def test_tokenize_keeps_compound_terms():
+    assert tokenize("IL-6, BRCA1 y eq.3 (p53)") == ["il-6", "brca1", "y", "eq.3", "p53"]
+
+
+def test_scores_match_hand_computed_bm25(chunks):
+    bm25 = BM25Index.build(chunks)
+    scores, rows = bm25.search("brca1", top_k=10, k1=1.2, b=0.75)
+
+    # n = 3, df(brca1) = 2, avgdl = 8 / 3
+    idf = math.log(1 + (3 - 2 + 0.5) / (2 + 0.5))
+    norm0 = 1.2 * (1 - 0.75 + 0.75 * 2 / (8 / 3))  # fila 0: tf = 1, |d| = 2
+    norm1 = 1.2 * (1 - 0.75 + 0.75 * 4 / (8 / 3))  # fila 1: tf = 2, |d| = 4
+    expected = [idf * 2 * 2.2 / (2 + norm1), idf * 1 * 2.2 / (1 + norm0)]
+    assert rows.tolist() == [1, 0]
+    assert np.allclose(scores, expected, rtol=1e-6)
+
+
+def test_query_terms_add_up_and_filters_apply(chunks):
+    bm25 = BM25Index.build(chunks)
+    single, _ = bm25.search("plasma", 5)
+    both, rows = bm25.search("IL-6 plasma desconocido", 5)
+    assert rows.tolist() == [2] and both[0] > single[0]
+    assert bm25.search("nada", 5)[1].size == 0
+
+    _, rows = bm25.search("brca1", 1)
+    assert rows.tolist() == [1]
+    _, rows = bm25.search("brca1", 5, rows=np.array([0, 2]))
+    assert rows.tolist() == [0]
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_save_and_load(tmp_path, chunks, mmap):
+    bm25 = BM25Index.build(chunks)
+    bm25.save(tmp_path / "bm25.npz")
+    loaded = BM25Index.load(tmp_path / "bm25.npz", mmap=mmap)
+    assert len(loaded) == len(bm25)
+    for query in ("brca1 riesgo", "il-6"):
+        a, ra = bm25.search(query, 3)
+        b, rb = loaded.search(query, 3)
+        assert ra.tolist() == rb.tolist() and np.allclose(a, b)
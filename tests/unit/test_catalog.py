@@ -0,0 +1,90 @@
+import hashlib
+import os
+
+import pytest
+
+from doc_rag.services import catalog as catalog_mod
+from doc_rag.services.catalog import DocumentCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    (tmp_path / "uploads").mkdir()
+    return DocumentCatalog(tmp_path / "catalog.json", tmp_path / "uploads")
+
+
+@pytest.fixture
+def hashed(monkeypatch):
+    """Nombres de los ficheros a los que se calcula el sha256."""
+    names: list[str] = []
+    real = catalog_mod.sha256_file
+
+    def counting(path):
+        names.append(path.name)
+        return real(path)
+
+    monkeypatch.setattr(catalog_mod, "sha256_file", counting)
+    return names
+
+
+def _write(catalog: DocumentCatalog, name: str, body: str) -> None:
+    (catalog.uploads_dir / name).write_text(body, encoding="utf-8")
+
+
+def _sha(body: str) -> str:
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def test_sync_detects_added_changed_and_removed(catalog, hashed):
+    _write(catalog, "a.md", "alfa")
+    _write(catalog, "b.md", "beta")
+    _write(catalog, "notas.txt", "no es un documento")
+    entries = catalog.sync()
+    assert [(e.source_filename, e.doc_id) for e in entries] == [
+        ("a.md", _sha("alfa")),
+        ("b.md", _sha("beta")),
+    ]
+    assert sorted(hashed) == ["a.md", "b.md"]
+
+    hashed.clear()
+    assert catalog.sync() == entries  # sin cambios: solo ``stat``
+    assert hashed == []
+
+    _write(catalog, "b.md", "beta v2")
+    _write(catalog, "c.md", "gamma")
+    (catalog.uploads_dir / "a.md").unlink()
+    entries = catalog.sync()
+    assert [(e.source_filename, e.doc_id) for e in entries] == [
+        ("b.md", _sha("beta v2")),
+        ("c.md", _sha("gamma")),
+    ]
+    assert sorted(hashed) == ["b.md", "c.md"]
+
+
+def test_same_size_change_is_detected_by_mtime(catalog):
+    _write(catalog, "a.md", "alfa")
+    catalog.sync()
+    path = catalog.uploads_dir / "a.md"
+    st = path.stat()
+    _write(catalog, "a.md", "ALFA")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert catalog.sync()[0].doc_id == _sha("ALFA")
+
+
+def test_catalog_is_persisted_with_chunk_counts(catalog, hashed):
+    _write(catalog, "a.md", "alfa")
+    _write(catalog, "b.md", "beta")
+    catalog.sync()
+    catalog.set_chunk_counts({_sha("alfa"): 3})
+
+    hashed.clear()
+    reopened = DocumentCatalog(catalog.path, catalog.uploads_dir)
+    assert [(e.source_filename, e.chunks) for e in reopened.sync()] == [("a.md", 3), ("b.md", None)]
+    assert hashed == []
+    assert reopened.find(_sha("beta")).source_filename == "b.md"
+    assert reopened.find(_sha("otro")) is None
+
+
+def test_missing_uploads_dir_is_empty(tmp_path):
+    catalog = DocumentCatalog(tmp_path / "catalog.json", tmp_path / "uploads")
+    assert catalog.sync() == []
@@ -0,0 +1,88 @@
+import json
+
+import numpy as np
+import pytest
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+
+
+def _rec(i, doc="d1", name="a.pdf", page=1, start=0, end=10, section=None, text=None):
+    return {
+        "id": i,
+        "doc_id": doc,
+        "source_filename": name,
+        "page": page,
+        "char_start": start,
+        "char_end": end,
+        "section": section,
+        "text": text if text is not None else f"chunk {i} ñandú",
+    }
+
+
+RECORDS = [
+    _rec(12, "d2", "b.md", page=None, start=0, end=40, section="Resultados"),
+    _rec(0, section="Métodos"),
+    _rec(1, start=10, end=20, section="Métodos"),
+    _rec(2, page=2, text=""),
+    _rec(13, "d2", "b.md", page=None, start=40, end=80),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    jsonl = tmp_path / "chunks.jsonl"
+    jsonl.write_text(
+        "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS), encoding="utf-8"
+    )
+    assert ChunkStore.write_from_jsonl(tmp_path / "chunks.bin", jsonl) == len(RECORDS)
+    return ChunkStore(tmp_path / "chunks.bin")
+
+
+def test_round_trip_keeps_every_field(store):
+    assert store.ids.tolist() == [0, 1, 2, 12, 13]  # ordenados por id
+    for rec in RECORDS:
+        got = store.get(rec["id"])
+        assert {k: got[k] for k in rec} == rec
+    assert store.get(12)["anchor"] == "md:c0-40"
+    assert store.get(2)["anchor"] == "p2:c0-10"
+    assert store.get(5) is None
+
+
+def test_rows_of_and_views(store):
+    assert store.rows_of(np.array([13, 5, 0])).tolist() == [4, -1, 0]
+    view = store.view(store.row(1))
+    view["score"] = 0.5
+    assert view["text"] == "chunk 1 ñandú" and view.to_dict()["score"] == 0.5
+    with pytest.raises(KeyError):
+        view["text"] = "otro"
+
+
+def test_anchor_keys_identify_citations(store):
+    keys = store.anchor_keys(np.arange(len(store)))
+    assert len({tuple(k) for k in keys.tolist()}) == len(store)
+    assert (keys[3:, 0] != keys[0, 0]).all()  # otro fichero
+
+
+def test_rejects_other_formats(tmp_path):
+    bad = tmp_path / "chunks.bin"
+    bad.write_bytes(b"NOTCHUNK" + bytes(8))
+    with pytest.raises(ValueError):
+        ChunkStore(bad)
+
+
+def test_rows_for_filters_by_document_and_filename(tmp_path):
+    records = [
+        _rec(0, "d1", "a.pdf"),
+        _rec(1, "d1", "a.pdf"),
+        _rec(2, "d2", "b.pdf"),
+        _rec(3, "d3", "a.pdf"),  # otro documento con el mismo nombre
+        _rec(4, "d2", "b.pdf"),
+    ]
+    ChunkStore.write(tmp_path / "chunks.bin", records)
+    store = ChunkStore(tmp_path / "chunks.bin")
+    assert store.rows_for().tolist() == [0, 1, 2, 3, 4]
+    assert store.rows_for(doc_id="d2").tolist() == [2, 4]
+    assert store.rows_for(source_filename="a.pdf").tolist() == [0, 1, 3]
+    assert store.rows_for(doc_id="d1", source_filename="a.pdf").tolist() == [0, 1]
+    assert store.rows_for(doc_id="d1", source_filename="b.pdf").size == 0
+    assert store.rows_for(doc_id="nada").size == 0
@@ -0,0 +1,106 @@
+from itertools import pairwise
+
+from doc_rag.services.chunking import (
+    chunk_structured,
+    chunk_text,
+    heading_title,
+    split_structured,
+)
+
+DOC = """# Estudio
+
+Resumen breve del trabajo.
+
+## 2. Métodos
+Reclutamos 40 pacientes. Se midió IL-6 en plasma antes y después de la intervención.
+El análisis se hizo con modelos mixtos.
+
+3 Results
+IL-6 bajó un 30%. La diferencia no fue significativa en el subgrupo (p = 0.08). Fin.
+"""
+
+
+def _covered(text: str, chunks) -> bool:
+    covered = set()
+    for ch in chunks:
+        covered.update(range(ch.char_start, ch.char_end))
+    return all(i in covered for i, c in enumerate(text) if not c.isspace())
+
+
+def test_offsets_map_to_original_text():
+    chunks = chunk_structured(DOC, 80, 30)
+    assert chunks
+    for ch in chunks:
+        assert DOC[ch.char_start : ch.char_end] == ch.text
+        assert ch.text == ch.text.strip()
+        assert len(ch.text) <= 80
+    assert _covered(DOC, chunks)
+
+
+def test_sections_follow_headings():
+    chunks = chunk_structured(DOC, 200, 0)
+    by_section = {ch.section: ch.text for ch in chunks}
+    assert by_section["Estudio"].startswith("# Estudio")
+    assert "Reclutamos" in by_section["2. Métodos"]
+    assert "IL-6 bajó" in by_section["Results"]
+    # un chunk nunca cruza un título
+    assert all(ch.text.count("#") <= 2 for ch in chunks)
+
+
+def test_section_carries_over_between_pages():
+    chunks = chunk_structured("Texto que continúa en la página siguiente.", 200, 0, "Methods")
+    assert [ch.section for ch in chunks] == ["Methods"]
+
+
+def test_overlap_repeats_whole_sentences():
+    text = " ".join(f"Frase número {i} del párrafo." for i in range(20))
+    chunks = chunk_structured(text, 100, 40)
+    for prev, nxt in pairwise(chunks):
+        assert nxt.char_start > prev.char_start
+        assert nxt.char_start < prev.char_end  # solapan
+        assert nxt.text.startswith("Frase número")
+    assert _covered(text, chunks)
+
+
+def test_long_words_and_sentences_are_split():
+    text = "x" * 250 + " " + "palabra " * 60
+    chunks = chunk_structured(text, 100, 10)
+    assert all(len(ch.text) <= 100 for ch in chunks)
+    assert _covered(text, chunks)
+
+
+def test_heading_title():
+    assert heading_title("## 2.1 Resultados ##") == "2.1 Resultados"
+    assert heading_title("3 Results") == "Results"
+    assert heading_title("Materials and Methods") == "Materials and Methods"
+    assert heading_title("3 patients were excluded.") is None
+    assert heading_title("El análisis se hizo con modelos mixtos.") is None
+
+
+def test_fixed_chunker_unchanged():
+    chunks = chunk_text("a  b\n c " * 10, 10, 2)
+    assert chunks[0].char_start == 0 and chunks[0].char_end == 10
+    assert all(ch.section is None for ch in chunks)
+
+
+def test_consecutive_headings_join_the_following_content():
+    text = "# A Study of IL-6\n\n## Abstract\n\nIL-6 bajó un 30%.\n\n## Methods\n"
+    chunks, section = split_structured(text, 200, 0)
+    assert [(ch.text, ch.section) for ch in chunks] == [
+        ("# A Study of IL-6\n\n## Abstract\n\nIL-6 bajó un 30%.", "Abstract")
+    ]
+    # el título final no es un chunk, pero pasa como sección a la página siguiente
+    assert section == "Methods"
+    assert chunk_structured("## Methods", 200, 0) == []
+
+
+def test_heading_that_does_not_fit_is_only_the_section():
+    body = "Reclutamos pacientes durante dos años en tres hospitales del país."
+    text = f"# Estudio\n\n## Methods\n\n{body}"
+    chunks = chunk_structured(text, len(body) + 12, 0)
+    assert [(ch.text, ch.section) for ch in chunks] == [(f"## Methods\n\n{body}", "Methods")]
+
+    chunks = chunk_structured(f"## Methods\n\n{body} {body}", len(body), 10)
+    assert [ch.text for ch in chunks] == [body, body]
+    assert all(ch.section == "Methods" for ch in chunks)
+    assert not any(heading_title(ch.text) for ch in chunks)
@@ -0,0 +1,39 @@
+from pathlib import Path
+
+import pytest
+
+from doc_rag.core.errors import IndexNotFound, InvalidRequest
+from doc_rag.core.settings import Settings
+from doc_rag.services.index_files import shard_files, shard_of, shard_root
+from doc_rag.services.retriever import LoadedGeneration
+
+
+def test_collection_dirs():
+    base = Settings(uploads_dir=Path("up"), index_dir=Path("idx"))
+    papers = base.for_collection("papers")
+    assert papers.uploads_dir == Path("up/collections/papers")
+    assert papers.index_dir == Path("idx/collections/papers")
+    assert papers.for_collection("notes").index_dir == Path("idx/collections/notes")
+    assert papers.for_collection("default") == base
+    with pytest.raises(InvalidRequest):
+        base.for_collection("../fuera")
+
+
+def test_missing_index_is_a_client_error(tmp_path):
+    settings = Settings(index_dir=tmp_path / "index")
+    with pytest.raises(IndexNotFound, match="colección 'papers'"):
+        LoadedGeneration.open(settings, "papers")
+    with pytest.raises(InvalidRequest):
+        LoadedGeneration.open(settings, "Mal nombre")
+
+
+def test_shard_layout(tmp_path):
+    assert shard_root(tmp_path, 0, 1) == tmp_path
+    assert [f.root for f in shard_files(tmp_path)] == [tmp_path]
+    for i in range(3):
+        shard_root(tmp_path, i, 3).mkdir()
+    assert [f.root.name for f in shard_files(tmp_path)] == ["shard-000", "shard-001", "shard-002"]
+
+    doc_ids = [f"{i:08x}" + "0" * 56 for i in range(30)]
+    assert {shard_of(d, 3) for d in doc_ids} == {0, 1, 2}
+    assert {shard_of(d, 1) for d in doc_ids} == {0}
@@ -0,0 +1,77 @@
+from doc_rag.services.context import ContextSpan, merge_text, pack_context
+
+PAGE = "uno dos tres cuatro cinco seis siete ocho nueve diez once doce"
+
+
+def _span(start: int, end: int, text: str | None = None, doc: str = "d1") -> ContextSpan:
+    return ContextSpan(
+        doc_id=doc,
+        source_filename=f"{doc}.pdf",
+        page=1,
+        char_start=start,
+        char_end=end,
+        text=PAGE[start:end] if text is None else text,
+        rank=0,
+    )
+
+
+def _rec(i: int, start: int, end: int, doc: str = "d1") -> dict:
+    return {
+        "id": i,
+        "doc_id": doc,
+        "source_filename": f"{doc}.pdf",
+        "page": 1,
+        "char_start": start,
+        "char_end": end,
+        "text": PAGE[start:end],
+    }
+
+
+def test_merge_text_joins_overlap_once():
+    assert merge_text(_span(0, 19), _span(13, 30)) == PAGE[:30]
+    assert merge_text(_span(0, 12), _span(12, 19)) == PAGE[:19]  # justo adyacentes
+    assert merge_text(_span(0, 30), _span(4, 12)) == PAGE[:30]  # contenido
+    assert merge_text(_span(0, 12), _span(13, 19)) is None  # hueco
+
+
+def test_merge_text_restores_stripped_spaces():
+    # chunker ``fixed``: "uno dos " perdió el espacio final al hacer strip
+    left = _span(0, 8, text="uno dos")
+    assert merge_text(left, _span(4, 12)) == PAGE[:12]
+    assert merge_text(left, _span(4, 12, text="DOS tres")) is None  # no coincide el solape
+
+
+def test_pack_context_stops_at_token_budget():
+    results = [_rec(0, 0, 9, "d1"), _rec(1, 0, 9, "d2"), _rec(2, 0, 9, "d3")]
+    # con 1 carácter por token cada resultado cuesta 10
+    spans = pack_context(results, budget_tokens=25, chars_per_token=1)
+    assert [s.doc_id for s in spans] == ["d1", "d2"]
+    # el primer resultado entra aunque no quepa
+    spans = pack_context(results, budget_tokens=1, chars_per_token=1)
+    assert [s.doc_id for s in spans] == ["d1"]
+
+
+def test_pack_context_counts_overlap_once():
+    results = [_rec(5, 13, 30), _rec(4, 0, 19), _rec(9, 0, 9, "d2")]
+    # tramo fusionado: 30 + 1 tokens; el de d2 (10) solo cabe si el solape no se cobra dos veces
+    spans = pack_context(results, budget_tokens=41, chars_per_token=1)
+    assert [(s.doc_id, s.text, s.chunk_ids, s.rank) for s in spans] == [
+        ("d1", PAGE[:30], [4, 5], 0),
+        ("d2", PAGE[:9], [9], 2),
+    ]
+    assert spans[0].anchor == "p1:c0-30"
+
+
+def test_pack_context_adds_neighbors_in_distance_order():
+    chunks = {i: _rec(i, 8 * i, 8 * i + 12) for i in range(5)}
+
+    def neighbors(r):
+        return [chunks[j] for j in (r["id"] - 2, r["id"] + 1, r["id"] - 1) if j in chunks]
+
+    spans = pack_context([chunks[3]], budget_tokens=100, neighbors=neighbors, chars_per_token=1)
+    assert [s.chunk_ids for s in spans] == [[1, 2, 3, 4]]
+    assert spans[0].text == PAGE[8:44]
+
+    # sin presupuesto para todos, entran primero los más cercanos
+    spans = pack_context([chunks[3]], budget_tokens=31, neighbors=neighbors, chars_per_token=1)
+    assert spans[0].chunk_ids == [2, 3, 4]
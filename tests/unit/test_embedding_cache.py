@@ -0,0 +1,87 @@
+import numpy as np
+
+from doc_rag.services.embedding_cache import EmbeddingCache
+
+DIM = 4
+
+
+def _vec(i: int) -> np.ndarray:
+    return np.full((1, DIM), i, dtype=np.float32)
+
+
+def _put(cache: EmbeddingCache, text: str, i: int) -> None:
+    cache.put_many([EmbeddingCache.key(text)], _vec(i))
+
+
+def _get(cache: EmbeddingCache, text: str) -> np.ndarray | None:
+    vecs, hit = cache.get_many([EmbeddingCache.key(text)])
+    return vecs[0] if hit[0] else None
+
+
+def test_hit_and_miss(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM, max_entries=8)
+    _put(cache, "a", 1)
+    vecs, hit = cache.get_many([EmbeddingCache.key("a"), EmbeddingCache.key("b")])
+    assert hit.tolist() == [True, False]
+    assert np.array_equal(vecs[0], _vec(1)[0])
+    assert not vecs[1].any()
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM, max_entries=4)
+    for i, text in enumerate("abcd"):
+        _put(cache, text, i)
+    assert _get(cache, "a") is not None  # "b" pasa a ser la menos usada
+    _put(cache, "e", 9)
+    assert len(cache) == 4
+    assert _get(cache, "b") is None
+    for text in "acde":
+        assert _get(cache, text) is not None
+
+
+def test_reopen_keeps_entries_and_recency(tmp_path):
+    cache = EmbeddingCache(tmp_path, DIM, max_entries=4)
+    for i, text in enumerate("abcd"):
+        _put(cache, text, i)
+    _get(cache, "a")
+    cache.flush()
+
+    reopened = EmbeddingCache(tmp_path, DIM, max_entries=4)
+    assert len(reopened) == 4
+    assert np.array_equal(_get(reopened, "c"), _vec(2)[0])
+    _put(reopened, "e", 9)
+    assert _get(reopened, "b") is None
+    assert _get(reopened, "a") is not None
+
+
+def test_reopen_with_other_size_starts_empty(tmp_path):
+    _put(EmbeddingCache(tmp_path, DIM, max_entries=4), "a", 1)
+    assert len(EmbeddingCache(tmp_path, DIM, max_entries=8)) == 0
+
+
+def test_processes_share_recency(tmp_path):
+    # dos instancias sobre los mismos ficheros, como dos workers
+    first = EmbeddingCache(tmp_path, DIM, max_entries=4)
+    second = EmbeddingCache(tmp_path, DIM, max_entries=4)
+    for i, text in enumerate("abcd"):
+        _put(first, text, i)
+    # ``second`` adopta las entradas de ``first`` al buscar ranura y expulsa la más antigua
+    _put(second, "x", 5)
+    assert _get(second, "a") is None
+    assert np.array_equal(_get(second, "b"), _vec(1)[0])
+
+    # ``first`` acaba de usar "c": ``second`` no debe expulsarla aunque nunca la haya leído
+    assert _get(first, "c") is not None
+    _put(second, "y", 6)
+    assert _get(first, "c") is not None
+    assert _get(second, "d") is None
+
+
+def test_slot_reused_by_other_process_is_a_miss(tmp_path):
+    first = EmbeddingCache(tmp_path, DIM, max_entries=1)
+    second = EmbeddingCache(tmp_path, DIM, max_entries=1)
+    _put(first, "a", 1)
+    _put(second, "b", 2)  # adopta "a", la expulsa y reutiliza la ranura
+    assert _get(first, "a") is None
+    assert np.array_equal(_get(second, "b"), _vec(2)[0])
@@ -0,0 +1,95 @@
+import numpy as np
+import pytest
+
+from doc_rag.adapters.vectorstore.faiss_store import FaissStore, IndexSpec
+
+
+def _vectors(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    x = np.random.default_rng(seed).standard_normal((n, dim)).astype("float32")
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+def test_load_missing_or_corrupt_index_raises(tmp_path, mmap):
+    with pytest.raises(RuntimeError):
+        FaissStore.load(tmp_path / "missing.faiss", mmap=mmap)
+    corrupt = tmp_path / "corrupt.faiss"
+    corrupt.write_bytes(b"no es un indice")
+    with pytest.raises(RuntimeError):
+        FaissStore.load(corrupt, mmap=mmap)
+
+
+def test_mmap_load_round_trip(tmp_path):
+    x = _vectors(50)
+    store = FaissStore(x.shape[1], spec=IndexSpec(kind="flat"))
+    store.add(x, np.arange(100, 150))
+    store.save(tmp_path / "index.faiss")
+    loaded = FaissStore.load(tmp_path / "index.faiss", mmap=True)
+    _, ids = loaded.search(x[7], 1)
+    assert ids[0] == 107
+
+
+def test_small_corpus_falls_back_to_flat_and_retrains_later(tmp_path):
+    spec = IndexSpec(kind="ivf", nlist=4, train_size=1000)
+    store = FaissStore(16, spec=spec)
+    store.add(_vectors(20), np.arange(20))
+    store.save(tmp_path / "index.faiss")  # 20 < 39 puntos por lista: flat
+    assert store.kind == "flat"
+
+    reopened = FaissStore.load(tmp_path / "index.faiss", spec)
+    reopened.untrain()
+    assert reopened.ntotal == 20 and not reopened.is_trained
+    reopened.add(_vectors(180, seed=1), np.arange(20, 200))
+    reopened.remove(np.array([3]))
+    reopened.finalize()
+    assert reopened.kind == "ivf"
+    assert reopened.ntotal == 199
+    _, ids = reopened.search(_vectors(20)[7], 1, nprobe=4)
+    assert ids[0] == 7
+
+
+def test_untrain_keeps_trained_indexes(tmp_path):
+    store = FaissStore(16, spec=IndexSpec(kind="ivf", nlist=2, train_size=1000))
+    store.add(_vectors(100), np.arange(100))
+    store.finalize()
+    trained = store.index
+    store.untrain()
+    assert store.index is trained and store.kind == "ivf"
+
+
+def _exact(x: np.ndarray, ids: np.ndarray, q: np.ndarray, k: int) -> list[int]:
+    return ids[np.argsort(-(x @ q))[:k]].tolist()
+
+
+@pytest.mark.parametrize("kind", ["ivf", "ivfpq"])
+def test_ivf_subset_search_scores_only_the_subset(tmp_path, kind):
+    x = _vectors(1000)
+    ids = np.arange(1000) * 3
+    store = FaissStore(
+        16, spec=IndexSpec(kind=kind, nlist=16, pq_m=4, pq_nbits=4, train_size=10_000)
+    )
+    store.add(x, ids)
+    store.save(tmp_path / "index.faiss")
+    loaded = FaissStore.load(tmp_path / "index.faiss", mmap=True)
+    assert loaded.kind == kind
+
+    subset = ids[100:160]
+    scores, found = loaded.search_subset_many(_vectors(2, seed=5), 5, subset)
+    assert found.shape == (2, 5)
+    assert set(found.ravel().tolist()) <= set(subset.tolist())
+    assert (np.diff(scores, axis=1) <= 0).all()
+    if kind == "ivf":  # vectores sin comprimir: igual que la búsqueda exacta
+        for qi, q in enumerate(_vectors(2, seed=5)):
+            assert found[qi].tolist() == _exact(x[100:160], subset, q, 5)
+
+
+def test_ivf_remove_with_direct_map():
+    x = _vectors(500)
+    store = FaissStore(16, spec=IndexSpec(kind="ivf", nlist=4, train_size=10_000))
+    store.add(x, np.arange(500))
+    store.finalize()
+    assert store.remove(np.arange(10)) == 10
+    assert store.remove_except(np.arange(10, 400)) == 100
+    assert store.ntotal == 390
+    _, found = store.search_subset_many(x[20], 1, np.array([20, 21, 399]))
+    assert found[0].tolist() == [20]
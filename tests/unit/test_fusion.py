@@ -0,0 +1,115 @@
+import numpy as np
+
+from doc_rag.services.index_files import SHARD_ID_BITS
+from doc_rag.services.retriever import _Hits, _reciprocal_rank_fusion, _select
+
+
+def _keys(shard: int, rows: list[int]) -> np.ndarray:
+    return (np.int64(shard) << SHARD_ID_BITS) | np.array(rows, dtype=np.int64)
+
+
+def _f32(values: list[float]) -> np.ndarray:
+    return np.array(values, dtype=np.float32)
+
+
+def test_shards_fuse_on_merged_rankings():
+    # en el shard 1, la fila 0 es la mejor de ambas vías, pero es la peor del conjunto
+    first = _Hits(
+        dense=_keys(0, [0, 1, 2]),
+        dense_scores=_f32([0.9, 0.8, 0.7]),
+        lexical=_keys(0, [0, 1]),
+        lexical_scores=_f32([5.0, 4.0]),
+    )
+    second = _Hits(
+        dense=_keys(1, [0]),
+        dense_scores=_f32([0.2]),
+        lexical=_keys(1, [0]),
+        lexical_scores=_f32([1.0]),
+    )
+    pool = _Hits.merge([first, second], k=10).pool(rrf_k=60, limit=10)
+
+    assert list(zip(pool.shard.tolist(), pool.rows.tolist(), strict=True)) == [
+        (0, 0),
+        (0, 1),
+        (1, 0),
+        (0, 2),
+    ]
+    _, expected = _reciprocal_rank_fusion(
+        [
+            np.concatenate([first.dense, second.dense]),
+            np.concatenate([first.lexical, second.lexical]),
+        ],
+        60,
+    )
+    assert np.allclose(pool.score, expected)
+    assert np.allclose(pool.dense, [0.9, 0.8, 0.2, 0.7])
+    assert np.isnan(pool.lexical[3])
+
+
+def test_merge_keeps_top_k_per_route_and_limit():
+    first = _Hits(dense=_keys(0, [0, 1]), dense_scores=_f32([0.9, 0.1]))
+    second = _Hits(dense=_keys(1, [5, 6]), dense_scores=_f32([0.5, 0.4]))
+    merged = _Hits.merge([first, second], k=3)
+    assert merged.lexical is None
+    assert merged.dense.tolist() == [*_keys(0, [0]), *_keys(1, [5, 6])]
+
+    pool = merged.pool(rrf_k=60, limit=1)  # sin híbrido el pool es el ranking denso
+    assert pool.shard.tolist() == [0, 1, 1]
+    assert pool.rows.tolist() == [0, 5, 6]
+    assert pool.score.tolist() == pool.dense.tolist()
+
+
+def test_hybrid_pool_is_truncated_to_limit():
+    hits = _Hits(
+        dense=_keys(0, [0, 1, 2]),
+        dense_scores=_f32([0.9, 0.8, 0.7]),
+        lexical=_keys(0, [2]),
+        lexical_scores=_f32([3.0]),
+    )
+    pool = hits.pool(rrf_k=60, limit=2)
+    assert pool.rows.tolist() == [2, 0]
+
+
+def test_rrf_sums_reciprocal_ranks():
+    ids, scores = _reciprocal_rank_fusion([np.array([7, 8, 9]), np.array([9, 7])], k=60)
+    assert ids.tolist() == [7, 9, 8]
+    assert np.allclose(scores, [1 / 61 + 1 / 62, 1 / 63 + 1 / 61, 1 / 62])
+
+
+def test_rrf_ties_keep_first_appearance():
+    # 5 y 6 suman lo mismo (1/61 + 1/62): gana el que aparece antes
+    ids, scores = _reciprocal_rank_fusion([np.array([5, 6]), np.array([6, 5])], k=60)
+    assert ids.tolist() == [5, 6] and scores[0] == scores[1]
+    ids, _ = _reciprocal_rank_fusion([np.array([3]), np.array([4])], k=60)
+    assert ids.tolist() == [3, 4]
+    ids, scores = _reciprocal_rank_fusion([np.array([], dtype=np.int64)], k=60)
+    assert ids.size == 0 and scores.size == 0
+
+
+def _anchors(*keys: int) -> np.ndarray:
+    return np.array([(k, k) for k in keys], dtype=np.int64)
+
+
+def test_select_drops_repeated_anchors():
+    picked = _select(_anchors(1, 1, 2, 3), _f32([0.9, 0.8, 0.7, 0.6]), None, top_k=2)
+    assert picked.tolist() == [0, 2]
+    # empates de score en orden de candidato
+    assert _select(_anchors(1, 2, 3), _f32([0.5, 0.5, 0.5]), None, 2).tolist() == [0, 1]
+    assert _select(_anchors(), _f32([]), None, 3).size == 0
+    assert _select(_anchors(1), _f32([0.5]), None, 0).size == 0
+
+
+def test_select_puts_priority_sections_first():
+    priority = np.array([0, 0, 1, 0])
+    picked = _select(_anchors(1, 2, 3, 4), _f32([0.9, 0.8, 0.1, 0.6]), priority, top_k=3)
+    assert picked.tolist() == [2, 0, 1]
+    none = np.zeros(4, dtype=np.int64)
+    assert _select(_anchors(1, 2, 3, 4), _f32([0.9, 0.8, 0.1, 0.6]), none, 2).tolist() == [0, 1]
+
+
+def test_select_widens_window_when_dedup_leaves_too_few():
+    # los 10 mejores comparten ancla: la primera ventana (2 * top_k) no basta
+    anchors = _anchors(*[0] * 10, 1, 2, 3)
+    score = _f32([1.0 - i / 100 for i in range(13)])
+    assert _select(anchors, score, None, top_k=3).tolist() == [0, 10, 11]
+    assert _select(anchors, score, None, top_k=10).tolist() == [0, 10, 11, 12]
@@ -0,0 +1,183 @@
+import hashlib
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+from doc_rag.core.settings import Settings
+from doc_rag.services import indexer
+from doc_rag.services.index_files import IndexFiles, IndexGenerations
+from doc_rag.services.indexer import rebuild_global_index
+from doc_rag.services.manifest import IndexManifest
+
+DIM = 8
+
+
+class StubEmbedder:
+    """Vectores deterministas por texto; cuenta lo embebido y puede fallar a mitad."""
+
+    dim = DIM
+    cache = None
+
+    def __init__(self):
+        self.texts: list[str] = []
+        self.fail_after: int | None = None
+
+    def encode(self, texts: list[str]) -> np.ndarray:
+        if self.fail_after is not None and len(self.texts) + len(texts) > self.fail_after:
+            raise RuntimeError("interrumpido")
+        self.texts.extend(texts)
+        out = np.empty((len(texts), DIM), dtype=np.float32)
+        for i, t in enumerate(texts):
+            seed = int.from_bytes(hashlib.blake2b(t.encode(), digest_size=8).digest(), "little")
+            out[i] = np.random.default_rng(seed).standard_normal(DIM)
+        return out / np.linalg.norm(out, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def embedder(monkeypatch):
+    stub = StubEmbedder()
+    monkeypatch.setattr(indexer.REGISTRY, "embedder", lambda settings: stub)
+    return stub
+
+
+@pytest.fixture
+def settings(tmp_path):
+    base = replace(
+        Settings(),
+        data_dir=tmp_path / "data",
+        uploads_dir=tmp_path / "uploads",
+        index_dir=tmp_path / "data" / "index",
+        chunker="fixed",
+        chunk_size=120,
+        chunk_overlap=0,
+        index_workers=1,
+        embed_batch_size=2,
+        index_checkpoint_chunks=2,
+    )
+    base.uploads_dir.mkdir(parents=True)
+    return base
+
+
+def _write(settings: Settings, name: str, topic: str, paragraphs: int = 3) -> None:
+    text = "\n\n".join(
+        f"{topic} párrafo {i}: " + " ".join(f"{topic}{i}-{j}" for j in range(12))
+        for i in range(paragraphs)
+    )
+    (settings.uploads_dir / name).write_text(f"# {topic}\n\n{text}\n", encoding="utf-8")
+
+
+def _published(settings: Settings) -> tuple[IndexManifest, ChunkStore]:
+    files = IndexFiles(IndexGenerations(settings.index_dir).current())
+    manifest = IndexManifest.load(files.manifest)
+    assert manifest is not None
+    return manifest, ChunkStore(files.chunk_store)
+
+
+def _texts(store: ChunkStore) -> list[str]:
+    return [store.text(row) for row in range(len(store.ids))]
+
+
+def test_add_embeds_only_new_documents(settings, embedder):
+    _write(settings, "a.md", "alfa")
+    _write(settings, "b.md", "beta")
+    first = rebuild_global_index(settings)
+    assert (first.documents, first.added_documents) == (2, 2)
+    assert first.embedded_chunks == first.chunks == len(embedder.texts)
+
+    embedder.texts.clear()
+    _write(settings, "c.md", "gamma")
+    second = rebuild_global_index(settings)
+    assert (second.documents, second.added_documents, second.removed_documents) == (3, 1, 0)
+    assert second.embedded_chunks == len(embedder.texts) == second.chunks - first.chunks
+    assert all("gamma" in t for t in embedder.texts)
+
+    manifest, store = _published(settings)
+    assert manifest.complete and manifest.n_chunks == len(store.ids) == second.chunks
+    assert len(set(store.ids.tolist())) == len(store.ids)
+
+
+def test_modified_document_is_reembedded_and_old_chunks_dropped(settings, embedder):
+    _write(settings, "a.md", "alfa")
+    _write(settings, "b.md", "beta")
+    rebuild_global_index(settings)
+
+    embedder.texts.clear()
+    _write(settings, "b.md", "delta")
+    stats = rebuild_global_index(settings)
+    assert (stats.added_documents, stats.removed_documents) == (1, 1)
+    assert embedder.texts and all("delta" in t for t in embedder.texts)
+
+    _, store = _published(settings)
+    texts = _texts(store)
+    assert not any("beta" in t for t in texts)
+    assert any("delta" in t for t in texts) and any("alfa" in t for t in texts)
+
+
+def test_deleted_document_is_removed_without_embedding(settings, embedder):
+    _write(settings, "a.md", "alfa")
+    _write(settings, "b.md", "beta")
+    rebuild_global_index(settings)
+
+    embedder.texts.clear()
+    (settings.uploads_dir / "b.md").unlink()
+    stats = rebuild_global_index(settings)
+    assert (stats.documents, stats.removed_documents, stats.embedded_chunks) == (1, 1, 0)
+    assert embedder.texts == []
+
+    manifest, store = _published(settings)
+    assert [e.source_filename for e in manifest.documents.values()] == ["a.md"]
+    assert set(store.filenames) == {"a.md"}
+
+
+def test_unchanged_reindex_embeds_nothing(settings, embedder):
+    _write(settings, "a.md", "alfa")
+    first = rebuild_global_index(settings)
+
+    embedder.texts.clear()
+    again = rebuild_global_index(settings)
+    assert embedder.texts == []
+    assert (again.added_documents, again.removed_documents, again.embedded_chunks) == (0, 0, 0)
+    assert again.chunks == first.chunks
+
+
+def test_interrupted_build_resumes_from_checkpoint(settings, embedder):
+    for i, topic in enumerate(["alfa", "beta", "gamma", "delta"]):
+        _write(settings, f"{i}.md", topic)
+    embedder.fail_after = 7
+    with pytest.raises(RuntimeError, match="interrumpido"):
+        rebuild_global_index(settings)
+    assert IndexGenerations(settings.index_dir).current() is None
+    done_before = len(embedder.texts)
+
+    embedder.fail_after = None
+    stats = rebuild_global_index(settings)
+    manifest, store = _published(settings)
+    assert stats.documents == 4 and manifest.complete
+    # los documentos completos del último checkpoint no se vuelven a embeber
+    assert stats.embedded_chunks < stats.chunks
+    assert len(embedder.texts) == done_before + stats.embedded_chunks
+    assert len(store.ids) == stats.chunks
+    assert len(set(store.ids.tolist())) == len(store.ids)
+    assert sorted(_texts(store)) == sorted(set(embedder.texts))
+
+
+def test_interrupted_before_first_checkpoint_resumes_from_published(settings, embedder):
+    for i, topic in enumerate(["alfa", "beta", "gamma"]):
+        _write(settings, f"{i}.md", topic)
+    first = rebuild_global_index(settings)
+
+    embedder.texts.clear()
+    _write(settings, "3.md", "delta")
+    embedder.fail_after = 0
+    with pytest.raises(RuntimeError, match="interrumpido"):
+        rebuild_global_index(settings)
+
+    embedder.fail_after = None
+    stats = rebuild_global_index(settings)
+    assert (stats.documents, stats.added_documents) == (4, 1)
+    assert stats.embedded_chunks == len(embedder.texts) == stats.chunks - first.chunks
+    assert all("delta" in t for t in embedder.texts)
+    manifest, store = _published(settings)
+    assert manifest.complete and len(store.ids) == stats.chunks
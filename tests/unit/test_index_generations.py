@@ -0,0 +1,32 @@
+from doc_rag.services.index_files import IndexFiles, IndexGenerations
+
+
+def test_publish_and_collect(tmp_path):
+    gens = IndexGenerations(tmp_path)
+    assert gens.current() is None
+
+    first = gens.building()
+    assert gens.building() == first  # sin publicar: se reanuda la misma
+    gens.publish(first)
+    assert gens.current() == first
+
+    second = gens.building()
+    assert second.name == "gen-000002"
+    gens.publish(second)
+    assert gens.collect(keep=[first]) == []
+    assert gens.collect() == [first]
+    assert not first.exists() and gens.current() == second
+
+
+def test_legacy_index_is_current_until_replaced(tmp_path):
+    legacy = IndexFiles(tmp_path)
+    legacy.manifest.write_text("{}")
+    gens = IndexGenerations(tmp_path)
+    assert gens.current() == tmp_path
+
+    build = gens.building()
+    gens.publish(build)
+    gens.collect(keep=[tmp_path])
+    assert legacy.manifest.exists()
+    gens.collect()
+    assert not legacy.manifest.exists() and gens.current() == build
@@ -0,0 +1,81 @@
+import json
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+import pytest
+
+from doc_rag.core.settings import Settings
+from doc_rag.services import jobs
+from doc_rag.services.indexer import ReindexStats
+from doc_rag.services.jobs import ReindexJobs
+
+STATS = ReindexStats(
+    documents=1, chunks=3, added_documents=1, removed_documents=0, embedded_chunks=3
+)
+
+
+class NeverRuns(Executor):
+    """Deja los trabajos en cola, como un worker que sigue vivo con otro reindexado."""
+
+    def submit(self, fn, /, *args, **kwargs):
+        return None
+
+
+@pytest.fixture
+def settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(jobs, "rebuild_global_index", lambda settings, full: STATS)
+    return Settings(data_dir=tmp_path / "data")
+
+
+def _run_job(settings, state_dir, on_done):
+    executor = ThreadPoolExecutor(max_workers=1)
+    reindex = ReindexJobs(settings, executor, on_done=on_done, state_dir=state_dir)
+    job = reindex.submit()
+    executor.shutdown(wait=True)
+    return reindex, job
+
+
+def test_done_job_reports_stats_and_releases_lock(settings, tmp_path):
+    loaded = []
+    reindex, job = _run_job(settings, tmp_path / "jobs", loaded.append)
+    assert (job.status, job.stats, job.error, job.reload_error) == ("done", STATS, None, None)
+    assert loaded == ["default"]
+    assert reindex.get(job.job_id).finished_at is not None
+    assert not (tmp_path / "jobs" / f"{job.job_id}.lock").exists()
+
+
+def test_reload_failure_keeps_the_build_result(settings, tmp_path):
+    def failing_reload(collection):
+        raise RuntimeError("sin memoria")
+
+    _, job = _run_job(settings, tmp_path / "jobs", failing_reload)
+    other_worker = ReindexJobs(settings, NeverRuns(), on_done=print, state_dir=tmp_path / "jobs")
+    stored = other_worker.get(job.job_id)
+    assert (stored.status, stored.stats) == ("done", STATS)
+    assert stored.error is None and stored.reload_error == "RuntimeError: sin memoria"
+
+
+def test_build_failure_is_reported(settings, tmp_path, monkeypatch):
+    def failing_build(settings, full):
+        raise ValueError("índice corrupto")
+
+    monkeypatch.setattr(jobs, "rebuild_global_index", failing_build)
+    loaded = []
+    _, job = _run_job(settings, tmp_path / "jobs", loaded.append)
+    assert (job.status, job.error, loaded) == ("failed", "ValueError: índice corrupto", [])
+
+
+def test_startup_fails_jobs_left_active_by_a_dead_process(settings, tmp_path):
+    state_dir = tmp_path / "jobs"
+    live = ReindexJobs(settings, NeverRuns(), on_done=print, state_dir=state_dir)
+    queued = live.submit()
+    # trabajo de un proceso que ya no existe: el json dice ``running`` pero nadie tiene el cerrojo
+    orphan = json.loads((state_dir / f"{queued.job_id}.json").read_text())
+    orphan.update(job_id="0" * 32, status="running", collection="otra")
+    (state_dir / f"{'0' * 32}.json").write_text(json.dumps(orphan))
+
+    restarted = ReindexJobs(settings, NeverRuns(), on_done=print, state_dir=state_dir)
+    failed = restarted.get("0" * 32)
+    assert failed.status == "failed" and "Interrumpido" in failed.error
+    assert failed.finished_at is not None
+    # el del worker vivo conserva su cerrojo y sigue en cola
+    assert restarted.get(queued.job_id).status == "queued"
@@ -0,0 +1,72 @@
+"""
+Paridad del backend ONNX (int8) frente a PyTorch.
+
+Descarga y exporta los modelos por defecto, así que solo se ejecuta con
+``DOC_RAG_RUN_MODEL_TESTS=1`` y el extra ``onnx`` instalado.
+"""
+
+import os
+
+import numpy as np
+import pytest
+
+if os.getenv("DOC_RAG_RUN_MODEL_TESTS") != "1":
+    pytest.skip("requiere DOC_RAG_RUN_MODEL_TESTS=1", allow_module_level=True)
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("optimum")
+
+from doc_rag.core.settings import Settings
+from doc_rag.services.backends import InferenceBackend
+
+SETTINGS = Settings()
+
+QUESTION = "¿Qué mutaciones de BRCA1 se asocian al riesgo de cáncer de mama?"
+PASSAGES = [
+    "Las variantes patogénicas de BRCA1 aumentan el riesgo de cáncer de mama y ovario.",
+    "We measured IL-6 levels in plasma before and after the intervention.",
+    "La tabla 2 resume los parámetros de entrenamiento del modelo.",
+    "BRCA1 germline mutations were found in 12% of the early-onset cohort.",
+]
+
+# Deriva máxima admitida frente a PyTorch fp32
+MIN_EMBED_COSINE = 0.98
+MAX_RERANK_DRIFT = 0.1  # fracción del rango de scores de PyTorch
+
+
+@pytest.fixture(scope="module")
+def backends(tmp_path_factory):
+    models_dir = tmp_path_factory.mktemp("models")
+    torch = InferenceBackend(kind="torch")
+    onnx = InferenceBackend(
+        kind="onnx",
+        quantize=True,
+        quantization_config=SETTINGS.onnx_quantization_config,
+        threads=2,
+        models_dir=models_dir,
+    )
+    return torch, onnx
+
+
+def test_embedding_parity(backends):
+    torch, onnx = backends
+    texts = [QUESTION, *PASSAGES]
+    ref = torch.sentence_transformer(SETTINGS.embedding_model).encode(
+        texts, normalize_embeddings=True
+    )
+    got = onnx.sentence_transformer(SETTINGS.embedding_model).encode(
+        texts, normalize_embeddings=True
+    )
+    cosine = np.sum(ref * got, axis=1)
+    assert cosine.min() >= MIN_EMBED_COSINE
+
+
+def test_rerank_parity(backends):
+    torch, onnx = backends
+    pairs = [[QUESTION, p] for p in PASSAGES]
+    ref = np.asarray(torch.cross_encoder(SETTINGS.rerank_model).predict(pairs))
+    got = np.asarray(onnx.cross_encoder(SETTINGS.rerank_model).predict(pairs))
+    drift = np.abs(ref - got).max() / max(float(np.ptp(ref)), 1e-6)
+    assert drift <= MAX_RERANK_DRIFT
+    assert int(np.argmax(ref)) == int(np.argmax(got))
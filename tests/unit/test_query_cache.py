@@ -0,0 +1,76 @@
+import time
+from dataclasses import replace
+
+from doc_rag.core.settings import Settings
+from doc_rag.services import retriever as retriever_module
+from doc_rag.services.index_files import IndexGenerations
+from doc_rag.services.query_cache import LRUCache, normalize_question
+from doc_rag.services.retriever import LoadedGeneration, Retriever
+
+
+def test_lru_eviction_and_stats():
+    cache: LRUCache[str] = LRUCache(2)
+    cache.put("a", "A", size=10)
+    cache.put("b", "B", size=20)
+    assert cache.get("a") == "A"  # "a" pasa a ser la más reciente
+    cache.put("c", "C", size=30)
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    stats = cache.stats()
+    assert stats["entries"] == 2 and stats["approx_bytes"] == 40
+    assert stats["hits"] == 3 and stats["misses"] == 1
+
+
+def test_lru_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "monotonic", lambda: now[0])
+    cache: LRUCache[str] = LRUCache(4, ttl_s=10)
+    cache.put("q", "respuesta")
+    now[0] += 9
+    assert cache.get("q") == "respuesta"
+    now[0] += 2
+    assert cache.get("q") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_generation_invalidates():
+    cache: LRUCache[str] = LRUCache(4)
+    cache.put("q", "vieja", generation=1)
+    assert cache.get("q", generation=1) == "vieja"
+    assert cache.get("q", generation=2) is None
+    assert cache.get("q", generation=1) is None  # la entrada se descartó
+    assert LRUCache(0).get("q") is None
+
+
+def test_normalize_question():
+    assert normalize_question("  ¿Qué   es\tIL-6? ") == "¿Qué es IL-6?"
+
+
+class _StubEmbedder:
+    cache = None
+
+    def encode(self, texts):
+        raise AssertionError("no se embebe nada")
+
+
+def test_published_generation_from_other_process_is_not_current(tmp_path, monkeypatch):
+    monkeypatch.setattr(retriever_module.REGISTRY, "embedder", lambda s: _StubEmbedder())
+    settings = replace(Settings(), index_dir=tmp_path, reload_check_s=1e-6)
+    retriever = Retriever(settings)
+    gens = IndexGenerations(tmp_path)
+    first = gens.building()
+    gens.publish(first)
+    retriever._loaded = {"default": LoadedGeneration(tmp_path, first, ())}
+    time.sleep(0.01)
+    assert retriever.is_current()
+
+    # otro worker publica una generación nueva
+    gens.publish(gens.building())
+    time.sleep(0.01)
+    generation = retriever.generation
+    assert not retriever.is_current(["default"])
+    deadline = time.monotonic() + 5
+    while retriever.generation == generation and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert retriever.generation > generation  # la recarga invalida lo cacheado
+    retriever.close()
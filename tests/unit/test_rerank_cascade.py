@@ -0,0 +1,90 @@
+from doc_rag.services.rerank_cascade import RerankCascade
+
+
+class StubCrossEncoder:
+    """Puntúa por el número de palabras del pasaje iguales a la pregunta."""
+
+    def __init__(self):
+        self.calls: list[list[tuple[str, str]]] = []
+
+    def __call__(self, pairs: list[tuple[str, str]]) -> list[float]:
+        self.calls.append(pairs)
+        return [float(p.split().count(q.strip())) for q, p in pairs]
+
+    @property
+    def pairs(self) -> int:
+        return sum(len(c) for c in self.calls)
+
+
+def _cand(i: int, text: str, dense: float | None = 0.5, collection: str = "default") -> dict:
+    return {"id": i, "text": text, "score_dense": dense, "collection": collection}
+
+
+def test_prune_drops_far_dense_candidates_but_keeps_top_k():
+    model = StubCrossEncoder()
+    cascade = RerankCascade(model, dense_margin=0.1)
+    cands = [
+        _cand(0, "a", 0.90),
+        _cand(1, "a", 0.85),
+        _cand(2, "a", 0.50),
+        _cand(3, "a", None),  # solo BM25: se conserva
+        _cand(4, "a", 0.40),
+    ]
+    out = cascade.rerank(["a"], [cands], top_k=2)[0]
+    assert [c["id"] for c in out] == [0, 1, 3]
+
+    # si el margen deja menos de top_k, se recuperan los mejores descartados
+    out = cascade.rerank(["a"], [[_cand(i, "a", d) for i, d in enumerate([0.9, 0.3, 0.5])]], 2)
+    assert [c["id"] for c in out[0]] == [0, 2]
+    assert cascade.stats()["prune"]["pairs_out"] == 5
+
+
+def test_first_pass_truncates_passages_and_keeps_best():
+    model = StubCrossEncoder()
+    cascade = RerankCascade(model, first_pass_chars=4, first_pass_keep=2)
+    texts = ["x x x x x x", "q q x x", "q x x x q q q", "x x x q"]
+    cands = [_cand(i, t) for i, t in enumerate(texts)]
+    out = cascade.rerank(["q"], [cands], top_k=1)[0]
+
+    first, full = model.calls
+    assert [p for _, p in first] == [t[:4] for t in texts]
+    # pasan los dos mejores de la primera fase, en su orden original
+    assert [c["id"] for c in out] == [1, 2]
+    assert [p for _, p in full] == [texts[1], texts[2]]
+    assert [c["score"] for c in out] == [2.0, 4.0]
+    assert all(c["score_rerank"] == c["score"] for c in out)
+    assert cascade.stats()["first_pass"]["pairs_out"] == 2
+
+
+def test_first_pass_skipped_when_pool_is_small():
+    model = StubCrossEncoder()
+    cascade = RerankCascade(model, first_pass_chars=4, first_pass_keep=2)
+    cascade.rerank(["q"], [[_cand(i, "q") for i in range(3)]], top_k=2)  # keep = 4
+    assert len(model.calls) == 1
+    assert cascade.stats()["first_pass"]["calls"] == 0
+
+
+def test_cache_hits_skip_the_model_until_generation_changes():
+    model = StubCrossEncoder()
+    cascade = RerankCascade(model, cache_size=16)
+    cands = [_cand(0, "q q"), _cand(1, "q")]
+    cascade.rerank([" q  "], [cands], top_k=2, generation=1)
+    assert model.pairs == 2
+
+    # misma pregunta normalizada y mismos chunks: ningún par vuelve al modelo
+    again = [_cand(0, "q q"), _cand(1, "q"), _cand(1, "q", collection="papers")]
+    out = cascade.rerank(["q"], [again], top_k=2, generation=1)[0]
+    assert model.pairs == 3  # solo el chunk de otra colección
+    assert [c["score"] for c in out] == [2.0, 1.0, 1.0]
+    assert cascade.stats()["full"]["cache_hits"] == 2
+
+    cascade.rerank(["q"], [cands], top_k=2, generation=2)
+    assert model.pairs == 5
+
+
+def test_pairs_of_all_questions_go_in_one_call():
+    model = StubCrossEncoder()
+    cascade = RerankCascade(model)
+    out = cascade.rerank(["a", "b"], [[_cand(0, "a")], [_cand(0, "b b"), _cand(1, "a")]], 2)
+    assert len(model.calls) == 1
+    assert [[c["score"] for c in cands] for cands in out] == [[1.0], [2.0, 0.0]]
@@ -0,0 +1,94 @@
+import threading
+import time
+from concurrent.futures import Future
+
+import pytest
+
+from doc_rag.services.scheduler import MicroBatcher
+
+
+class Recorder:
+    """Función por lotes que anota cada llamada y falla con el elemento ``"bad"``."""
+
+    def __init__(self):
+        self.calls: list[list[str]] = []
+
+    def __call__(self, items: list[str]) -> list[str]:
+        self.calls.append(list(items))
+        if "bad" in items:
+            raise ValueError("entrada inválida")
+        return [s.upper() for s in items]
+
+
+def _enqueue(batcher: MicroBatcher, items: list[str]) -> Future:
+    # en cola antes de arrancar el hilo: el orden de llegada es determinista
+    fut: Future = Future()
+    batcher._queue.put((items, fut))
+    return fut
+
+
+def test_flushes_when_max_batch_is_reached():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=4, max_wait_ms=10_000)
+    results = {}
+
+    def call(name, items):
+        results[name] = batcher.submit(items)
+
+    threads = [threading.Thread(target=call, args=(n, [n, n + "2"])) for n in "ab"]
+    t0 = time.monotonic()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=5)
+    assert time.monotonic() - t0 < 5  # no esperó al plazo
+    assert results == {"a": ["A", "A2"], "b": ["B", "B2"]}
+    assert len(fn.calls) == 1 and sorted(fn.calls[0]) == ["a", "a2", "b", "b2"]
+    assert batcher.stats()["mean_batch_requests"] == 2
+
+
+def test_flushes_at_deadline():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=100, max_wait_ms=50)
+    t0 = time.monotonic()
+    assert batcher.submit(["x"]) == ["X"]
+    assert 0.04 <= time.monotonic() - t0 < 2
+    assert fn.calls == [["x"]]
+
+
+def test_overflow_is_carried_to_next_batch():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=3, max_wait_ms=50)
+    futs = [_enqueue(batcher, items) for items in (["a", "b"], ["c", "d"], ["e"], list("vwxyz"))]
+    batcher._ensure_started()
+    assert [f.result(timeout=5) for f in futs] == [
+        ["A", "B"],
+        ["C", "D"],
+        ["E"],
+        list("VWXYZ"),
+    ]
+    # una petición nunca se parte, aunque supere ``max_batch``
+    assert fn.calls == [["a", "b"], ["c", "d", "e"], list("vwxyz")]
+
+
+def test_failure_only_reaches_the_failing_request():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=10, max_wait_ms=50)
+    ok, bad, other = (_enqueue(batcher, items) for items in (["a"], ["bad"], ["b", "c"]))
+    batcher._ensure_started()
+    assert ok.result(timeout=5) == ["A"]
+    assert other.result(timeout=5) == ["B", "C"]
+    with pytest.raises(ValueError, match="inválida"):
+        bad.result(timeout=5)
+    assert fn.calls == [["a", "bad", "b", "c"], ["a"], ["bad"], ["b", "c"]]
+    assert batcher.stats()["requests"] == 2
+
+    with pytest.raises(ValueError):
+        batcher.submit(["bad"])
+
+
+def test_empty_request_skips_the_queue():
+    fn = Recorder()
+    batcher = MicroBatcher(fn, max_batch=4, max_wait_ms=10_000)
+    assert batcher.submit([]) == []
+    assert batcher._thread is None
@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from doc_rag.adapters.vectorstore.chunk_store import ChunkStore
+from doc_rag.core.settings import Settings
+from doc_rag.services.bm25 import BM25Index
+from doc_rag.services.jobs import ReindexJobs
+
+
+def test_bm25_mmap_matches_copy(tmp_path):
+    records = [
+        {
+            "id": i,
+            "doc_id": "a" * 64,
+            "source_filename": "x.md",
+            "page": None,
+            "char_start": 0,
+            "char_end": len(t),
+            "section": None,
+            "text": t,
+        }
+        for i, t in enumerate(["IL-6 bajó un 30%", "Se midió IL-6 en plasma", "", "p53 y BRCA1"])
+    ]
+    ChunkStore.write(tmp_path / "chunks.bin", records)
+    BM25Index.build(ChunkStore(tmp_path / "chunks.bin")).save(tmp_path / "bm25.npz")
+
+    copy = BM25Index.load(tmp_path / "bm25.npz")
+    mapped = BM25Index.load(tmp_path / "bm25.npz", mmap=True)
+    assert isinstance(mapped.rows, np.memmap)
+    assert mapped.vocab == copy.vocab
+    for q in ("il-6 plasma", "brca1", "nada"):
+        for a, b in zip(copy.search(q, 3), mapped.search(q, 3), strict=True):
+            np.testing.assert_array_equal(a, b)
+
+
+def test_job_status_visible_from_other_worker(tmp_path, monkeypatch):
+    monkeypatch.setattr("doc_rag.services.jobs.rebuild_global_index", lambda s, full: None)
+    settings = Settings(data_dir=tmp_path)
+    with ThreadPoolExecutor(1) as pool:
+        jobs = ReindexJobs(settings, pool, on_done=lambda c: None, state_dir=tmp_path / "jobs")
+        job = jobs.submit(full=True)
+    other = ReindexJobs(settings, pool, on_done=lambda c: None, state_dir=tmp_path / "jobs")
+    seen = other.get(job.job_id)
+    assert seen is not None and seen.status == "done" and seen.full
+    assert other.get("0" * 32) is None and other.get("../x") is None
@@ -0,0 +1,72 @@
+import hashlib
+import io
+import multiprocessing
+
+import pytest
+
+from doc_rag.services import uploads
+from doc_rag.services.catalog import DocumentCatalog, list_uploads
+from doc_rag.services.uploads import UploadTooLarge, store_upload
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    return DocumentCatalog(tmp_path / "catalog.json", tmp_path / "uploads")
+
+
+def test_stores_with_sha256_name_and_records_it(catalog):
+    body = b"# Informe\n\nIL-6 elevada.\n"
+    stored = store_upload(io.BytesIO(body), "mi informe.md", catalog, max_bytes=1024)
+    doc_id = hashlib.sha256(body).hexdigest()
+    assert stored == uploads.StoredUpload(
+        doc_id, f"{doc_id[:12]}_mi_informe.md", "mi_informe.md", len(body), duplicate=False
+    )
+    assert (catalog.uploads_dir / stored.stored_filename).read_bytes() == body
+    assert [e.doc_id for e in catalog.sync()] == [doc_id]
+
+
+def test_same_content_is_deduplicated(catalog):
+    first = store_upload(io.BytesIO(b"contenido"), "a.md", catalog, max_bytes=1024)
+    again = store_upload(io.BytesIO(b"contenido"), "copia.md", catalog, max_bytes=1024)
+    assert again.duplicate and again.doc_id == first.doc_id
+    assert again.stored_filename == first.stored_filename
+    assert again.original_filename == "copia.md"
+
+    other = store_upload(io.BytesIO(b"otro contenido"), "a.md", catalog, max_bytes=1024)
+    assert not other.duplicate and other.doc_id != first.doc_id
+    names = [p.name for p in list_uploads(catalog.uploads_dir)]
+    assert names == sorted([first.stored_filename, other.stored_filename])
+
+
+def test_oversized_upload_is_rejected_and_partial_file_removed(catalog, monkeypatch):
+    monkeypatch.setattr(uploads, "COPY_BLOCK", 4)  # aborta a mitad de la copia
+    with pytest.raises(UploadTooLarge):
+        store_upload(io.BytesIO(b"x" * 20), "grande.md", catalog, max_bytes=10)
+    assert list(catalog.uploads_dir.iterdir()) == []
+    assert catalog.sync() == []
+
+    stored = store_upload(io.BytesIO(b"x" * 10), "justo.md", catalog, max_bytes=10)
+    assert stored.size_bytes == 10
+
+
+def _store_in_worker(catalog, name, barrier, out):
+    barrier.wait()
+    out.put(store_upload(io.BytesIO(b"mismo contenido"), name, catalog, max_bytes=1024))
+
+
+def test_workers_storing_the_same_file_keep_one_copy(catalog):
+    # procesos distintos, como los workers de ``doc_rag.serve``: no comparten el lock de hilos
+    ctx = multiprocessing.get_context("fork")
+    barrier, out = ctx.Barrier(4), ctx.Queue()
+    procs = [
+        ctx.Process(target=_store_in_worker, args=(catalog, f"{i}.md", barrier, out))
+        for i in range(4)
+    ]
+    for p in procs:
+        p.start()
+    stored = [out.get(timeout=10) for _ in procs]
+    for p in procs:
+        p.join(timeout=10)
+    assert sorted(s.duplicate for s in stored) == [False, True, True, True]
+    assert len(list_uploads(catalog.uploads_dir)) == 1
+    assert len(catalog.sync()) == 1